@@ -2,3 +2,4 @@ from .base import BaseBloomFilterHashBackend
 from .fnv_backend import FNVBloomFilterBackend
 from .mmh3_backend import MMH3BloomFilterBackend
 from .token_backend import TokenBackend
+from .splitmix_backend import SplitMixBloomFilterBackend
@@ -1,8 +1,11 @@
 import abc
+import hashlib
 import struct
 import typing
+import numpy as np
 
 from ..exceptions import InvalidImplementation
+from ..utils import bloom_bits
 
 
 class BaseBloomFilterHashBackend(abc.ABC):
@@ -37,6 +40,74 @@ class BaseBloomFilterHashBackend(abc.ABC):
         data_bytes = struct.pack('f', data)
         return self.run_hash_function(data_bytes)
 
+    def hash_array(self, data: np.ndarray) -> typing.List[int]:
+        """
+        Hashes every value of the given array, producing the same hash codes as hashing each value individually. The
+        values are cast to 32-bit floats once, and hashed straight from the resulting buffer.
+
+        :param data: The data to hash.
+        :returns: The hash code of each value, in (flattened) array order.
+        """
+        float_data = np.ascontiguousarray(data, dtype=np.float32)
+        implementation = type(self)
+        customized = (implementation.hash_data is not BaseBloomFilterHashBackend.hash_data or
+                      implementation.__call__ is not BaseBloomFilterHashBackend.__call__)
+        if customized:
+            # Implementations customizing how individual values are hashed must be hashed one value at a time.
+            return [self(float(value)) for value in float_data.reshape(-1)]
+        data_buffer = float_data.tobytes()
+        value_size = float_data.itemsize
+        return [
+            self.run_hash_function(data_buffer[i:i + value_size])
+            for i in range(0, len(data_buffer), value_size)
+        ]
+
+    def hash_code_array(self, data: np.ndarray) -> np.ndarray:
+        """
+        Hashes every value of the given array, producing the hash codes as an array of unsigned 64-bit integer pairs
+        (the low and high 64 bits of each signed 128-bit hash code). Implementations able to hash whole arrays natively
+        should override this method, which is used for vectorized Bloom Filter operations.
+
+        :param data: The data to hash.
+        :returns: An array of shape (n, 2), holding the low and high bits of the hash code of each value, in (flattened)
+                  array order.
+        """
+        return bloom_bits.hash_codes_to_array(self.hash_array(data))
+
+    @property
+    def hashes_arrays_natively(self) -> bool:
+        """
+        Flag indicating whether the backend overrides hash_code_array to hash whole arrays natively. Otherwise, values
+        are hashed one by one, and inserting them into Bloom Filters through rbloom is cheaper than computing their
+        hash codes up front.
+
+        :returns: The flag.
+        """
+        return type(self).hash_code_array is not BaseBloomFilterHashBackend.hash_code_array
+
+    @property
+    def serialized_parameters(self) -> typing.Dict[str, typing.Any]:
+        """
+        The parameters of the backend which are stored with serialized templates, and passed back to the backend when
+        templates are deserialized (e.g., the version of an algorithm). Secrets such as tokens must not be included.
+
+        :returns: The parameters, as JSON serializable keyword arguments of the backend.
+        """
+        return {}
+
+    @property
+    def identity(self) -> str:
+        """
+        A string identifying the hash function computed by the backend, made up of the implementation key and a
+        fingerprint of the backend's attributes (e.g., a seed or token). Backends with the same identity produce the
+        same hash codes, so hash codes computed by one can be reused for another.
+
+        :returns: The identity of the backend.
+        """
+        attributes = repr(sorted(vars(self).items()))
+        fingerprint = hashlib.sha256(attributes.encode('utf-8')).hexdigest()[:32]
+        return f'{self.get_implementation_key(type(self))}:{fingerprint}'
+
     @classmethod
     def get_implementation(cls, implementation_key: str) -> typing.Type['BaseBloomFilterHashBackend']:
         """
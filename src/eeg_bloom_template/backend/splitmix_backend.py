@@ -0,0 +1,76 @@
+import typing
+import numpy as np
+
+from .base import BaseBloomFilterHashBackend
+from ..utils.number_values import convert_unsigned_128_to_signed
+
+
+class SplitMixBloomFilterBackend(BaseBloomFilterHashBackend):
+    """
+    A Bloom Filter hash backend built for vectorized execution, which computes hash codes using the SplitMix64 mixing
+    function in NumPy 64-bit unsigned integer arithmetic. Data is hashed as a sequence of 32-bit words (i.e., one word
+    per 32-bit float), in two independent lanes keyed by the seed of the backend, which make up the low and high 64 bits
+    of the 128-bit hash code. Whole arrays of values are hashed at once, without going through Python integers.
+    """
+    GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+    MIX_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+    MIX_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+
+    def __init__(self, seed: int = 0):
+        super().__init__()
+        self._seed = seed
+
+    def run_hash_function(self, data: bytes) -> int:
+        padded_data = data + bytes(-len(data) % 4)
+        words = np.frombuffer(padded_data, dtype=np.uint32).astype(np.uint64)
+        lanes = self._get_initial_lanes(len(data))
+        for word in words:
+            lanes = self.mix(lanes ^ word)
+        low, high = (int(lane) for lane in lanes)
+        return convert_unsigned_128_to_signed(low | (high << 64))
+
+    def hash_code_array(self, data: np.ndarray) -> np.ndarray:
+        float_data = np.ascontiguousarray(data, dtype=np.float32).reshape(-1)
+        words = float_data.view(np.uint32).astype(np.uint64)
+        low_start, high_start = self._get_initial_lanes(float_data.itemsize)
+        hash_codes = np.empty((len(words), 2), dtype=np.uint64)
+        hash_codes[:, 0] = self.mix(words ^ low_start)
+        hash_codes[:, 1] = self.mix(words ^ high_start)
+        return hash_codes
+
+    def hash_array(self, data: np.ndarray) -> typing.List[int]:
+        hash_codes = self.hash_code_array(data)
+        return [
+            convert_unsigned_128_to_signed(int(low) | (int(high) << 64))
+            for low, high in hash_codes.tolist()
+        ]
+
+    @classmethod
+    def mix(cls, values: np.ndarray) -> np.ndarray:
+        """
+        Applies the SplitMix64 finalizer to every value of the given array (wrapping modulo 2^64).
+
+        :param values: The 64-bit unsigned integer values to mix.
+        :returns: The mixed values.
+        """
+        values = np.asarray(values, dtype=np.uint64)
+        values = (values ^ (values >> np.uint64(30))) * cls.MIX_MULTIPLIER_1
+        values = (values ^ (values >> np.uint64(27))) * cls.MIX_MULTIPLIER_2
+        return values ^ (values >> np.uint64(31))
+
+    def _get_initial_lanes(self, number_of_bytes: int) -> np.ndarray:
+        """
+        Helper method which computes the initial state of both hash lanes, from the seed of the backend and the
+        length of the hashed data.
+
+        :param number_of_bytes: The number of bytes of hashed data.
+        :returns: The initial state of the low and high lanes.
+        """
+        keys = np.array([
+            (self._seed + self.GOLDEN_GAMMA * lane) & 0xFFFFFFFFFFFFFFFF for lane in (1, 2)
+        ], dtype=np.uint64)
+        return self.mix(self.mix(keys) ^ np.uint64(number_of_bytes))
+
+    @property
+    def hash_function_name(self) -> str:
+        return 'SplitMix'
@@ -7,22 +7,37 @@ from ..utils import number_values, orthonormalization
 
 class TokenBackend(BaseBloomFilterHashBackend):
     """
-    Bloom filter backend which uses a token to orthonormalize data and compute pseudo-hash values.
+    Bloom filter backend which uses a token to orthonormalize data and compute pseudo-hash values. The version of the
+    token matrix generator (see orthonormalization.TokenDataGenerator) is recorded when templates are serialized, so
+    that templates created with the legacy generator keep using it.
     """
-    def __init__(self, token: typing.Union[int, str, float], use_cache=True):
+    def __init__(self,
+                 token: typing.Union[int, str, float],
+                 use_cache=True,
+                 generator_version: int = orthonormalization.LEGACY_GENERATOR_VERSION):
+        if generator_version not in orthonormalization.GENERATOR_VERSIONS:
+            raise ValueError(
+                f'Unknown token matrix generator version {generator_version} '
+                f'(expected one of {orthonormalization.GENERATOR_VERSIONS}).'
+            )
         self._token = token
         self._use_cache = use_cache
+        self._generator_version = generator_version
         super().__init__()
 
     def run_hash_function(self, data: bytes) -> int:
         data_vector = np.array([b for b in data])
         if self._use_cache:
-            normalized_vector = orthonormalization.normalize_cached(self._token, data_vector)
+            normalized_vector = orthonormalization.normalize_cached(self._token, data_vector, self._generator_version)
         else:
-            generator = orthonormalization.TokenDataGenerator(self._token)
+            generator = orthonormalization.TokenDataGenerator(self._token, self._generator_version)
             normalizer = orthonormalization.TokenMatrixNormalization(generator)
             normalized_vector = normalizer.normalize(data_vector)
         data_sum = np.sum(normalized_vector)
         clamped_sum = number_values.clamp_value(data_sum, -2**127, 2**127)
         # Ensure an int is returned
         return round(clamped_sum)
+
+    @property
+    def serialized_parameters(self) -> typing.Dict[str, typing.Any]:
+        return {'generator_version': self._generator_version}
@@ -1,6 +1,9 @@
 import abc
 import rbloom
 import typing
+import numpy as np
+
+from .utils import bloom_bits
 
 
 class BaseEEGTemplateData(abc.ABC):
@@ -10,10 +13,33 @@ class BaseEEGTemplateData(abc.ABC):
     bloom_filters: typing.List[rbloom.Bloom]
     segment_ratio: float
     row_wise: bool
+    signature: typing.Optional[np.ndarray]
 
-    def __init__(self, bloom_filters: typing.List[rbloom.Bloom], segment_ratio: float, row_wise=True):
+    def __init__(self,
+                 bloom_filters: typing.List[rbloom.Bloom],
+                 segment_ratio: float,
+                 row_wise=True,
+                 signature: typing.Optional[np.ndarray] = None):
         if not 0 < segment_ratio <= 1:
             raise ValueError(f'Segment ratio must be between 0 and 1, but got {segment_ratio}.')
         self.bloom_filters = bloom_filters
         self.segment_ratio = segment_ratio
         self.row_wise = row_wise
+        self.signature = signature
+        self._filter_bits: typing.Dict[int, typing.Tuple[rbloom.Bloom, int, np.ndarray]] = {}
+
+    def get_filter_bits(self, filter_idx: int) -> typing.Tuple[int, np.ndarray]:
+        """
+        Retrieves the number of hash functions and the bit array of the Bloom Filter at the given index. The bits are
+        read from the filter once and cached, so filters must not be modified once the template has been compared
+        (filters which are replaced are read again).
+
+        :param filter_idx: The index of the Bloom Filter.
+        :returns: The number of hash functions and the bit array of the filter (as an array of unsigned bytes).
+        """
+        bloom_filter = self.bloom_filters[filter_idx]
+        cached = self._filter_bits.get(filter_idx, None)
+        if cached is None or cached[0] is not bloom_filter:
+            cached = (bloom_filter, *bloom_bits.split_filter_bytes(bloom_filter.save_bytes()))
+            self._filter_bits[filter_idx] = cached
+        return cached[1], cached[2]
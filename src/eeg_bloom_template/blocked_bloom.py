@@ -0,0 +1,171 @@
+import math
+import typing
+import rbloom
+import numpy as np
+
+from . import backend
+from .utils import bloom_bits
+
+
+_LN_2 = math.log(2)
+# Tolerance (in blocks) on the size computed from a false positive rate, so that a rate derived from a whole number of
+# blocks (e.g., by a sizing policy) does not round up to an extra block because of floating point error.
+_BLOCK_ROUNDING_TOLERANCE = 1e-9
+
+
+class BlockedBloomFilter:
+    """
+    Blocked Bloom Filter, which keeps all the bits of an item within a single 512 bit block (i.e., one cache line), so
+    that checking an item only touches one block of the bit array. The filter mirrors the interface and byte format of
+    rbloom.Bloom filters (the number of hash functions followed by the bit array), and can be used in their place in
+    templates. Its bit indexes are computed as described in bloom_bits.generate_blocked_indexes.
+
+    Filters are sized like standard filters, with the size rounded up to a whole number of blocks (filters smaller
+    than one block therefore use more memory, and have a lower false positive rate). Sizing policies bounding the size
+    of filters round their bound down to a whole number of blocks instead (see sizing.BloomFilterSizingPolicy).
+
+    As items are not spread evenly across blocks, the false positive rate is higher than that of a standard filter of
+    the same size. Measured with 256 items at a requested rate of 1%: 0.11% instead of 0.04% at the default sizing
+    (twice the number of items), and 1.10% instead of 1.02% when filled to the expected number of items (1.24% instead
+    of 1.01% with 4096 items). In exchange, computing the bit indexes of an item is about five times cheaper, and
+    checking items against filters which do not fit in the CPU cache is about a quarter faster.
+    """
+    filter_type = bloom_bits.BLOCKED_FILTER_TYPE
+
+    def __init__(self, expected_items: int, false_positive_rate: float, hash_func: typing.Callable[[typing.Any], int]):
+        if expected_items <= 0:
+            raise ValueError(f'Expected items must be greater than 0 (got {expected_items}).')
+        if not 0 < false_positive_rate < 1:
+            raise ValueError(f'False positive rate must be between 0 and 1 (got {false_positive_rate}).')
+        size_in_bits = -expected_items * math.log(false_positive_rate) / _LN_2 ** 2
+        number_of_blocks = max(1, math.ceil(size_in_bits / bloom_bits.BLOCK_SIZE_IN_BITS - _BLOCK_ROUNDING_TOLERANCE))
+        self._number_of_hashes = max(1, int(size_in_bits / expected_items * _LN_2))
+        self._bits = np.zeros(number_of_blocks * bloom_bits.BLOCK_SIZE_IN_BITS // 8, dtype=np.uint8)
+        self._hash_func = hash_func
+
+    def __contains__(self, item: typing.Any) -> bool:
+        return bool(self.contains_hash_codes(bloom_bits.hash_codes_to_array([self._hash_func(item)]))[0])
+
+    def __repr__(self) -> str:
+        return f'<BlockedBloomFilter size_in_bits={self.size_in_bits} number_of_hashes={self._number_of_hashes}>'
+
+    @property
+    def size_in_bits(self) -> int:
+        """
+        Retrieves the size of the bit array of the filter.
+
+        :returns: The number of bits.
+        """
+        return len(self._bits) * 8
+
+    @property
+    def hash_func(self) -> typing.Callable[[typing.Any], int]:
+        """
+        Retrieves the hash function used by the filter.
+
+        :returns: The hash function.
+        """
+        return self._hash_func
+
+    @property
+    def number_of_hashes(self) -> int:
+        """
+        Retrieves the number of bits set per item.
+
+        :returns: The number of hash functions.
+        """
+        return self._number_of_hashes
+
+    def add(self, item: typing.Any):
+        """
+        Adds an item to the filter.
+
+        :param item: The item to add.
+        """
+        self.add_hash_codes(bloom_bits.hash_codes_to_array([self._hash_func(item)]))
+
+    def update(self, items: typing.Iterable[typing.Any]):
+        """
+        Adds every given item to the filter. When the filter uses a hash backend, the items are hashed as an array.
+
+        :param items: The items to add.
+        """
+        items = list(items)
+        if isinstance(self._hash_func, backend.BaseBloomFilterHashBackend):
+            hash_codes = bloom_bits.hash_values(self._hash_func, np.asarray(items, dtype=np.float32))
+        else:
+            hash_codes = bloom_bits.hash_codes_to_array(self._hash_func(item) for item in items)
+        self.add_hash_codes(hash_codes)
+
+    def add_hash_codes(self, hash_codes: np.ndarray):
+        """
+        Adds the items with the given hash codes to the filter.
+
+        :param hash_codes: The hash codes of the items, as produced by bloom_bits.hash_codes_to_array.
+        """
+        indexes = bloom_bits.generate_blocked_indexes(hash_codes, self._number_of_hashes, self.size_in_bits)
+        bloom_bits.set_indexes(self._bits, indexes)
+
+    def contains_hash_codes(self, hash_codes: np.ndarray) -> np.ndarray:
+        """
+        Checks whether the items with the given hash codes are contained in the filter.
+
+        :param hash_codes: The hash codes of the items, as produced by bloom_bits.hash_codes_to_array.
+        :returns: A boolean array indicating which items are contained.
+        """
+        indexes = bloom_bits.generate_blocked_indexes(hash_codes, self._number_of_hashes, self.size_in_bits)
+        return bloom_bits.contains_indexes(self._bits, indexes)
+
+    def copy(self) -> 'BlockedBloomFilter':
+        """
+        Creates a copy of the filter, sharing its hash function.
+
+        :returns: The copy.
+        """
+        return self.load_bytes(self.save_bytes(), self._hash_func)
+
+    def save_bytes(self) -> bytes:
+        """
+        Saves the filter into bytes, in the same format as rbloom.Bloom filters.
+
+        :returns: The bytes of the filter.
+        """
+        return bloom_bits.join_filter_bytes(self._number_of_hashes, self._bits)
+
+    @classmethod
+    def load_bytes(cls, data: bytes, hash_func: typing.Callable[[typing.Any], int]) -> 'BlockedBloomFilter':
+        """
+        Loads a filter from bytes, as produced by save_bytes.
+
+        :param data: The bytes of the filter.
+        :param hash_func: The hash function used by the filter.
+        :returns: The filter.
+        """
+        number_of_hashes, bits = bloom_bits.split_filter_bytes(data)
+        if number_of_hashes < 1 or len(bits) == 0 or len(bits) % (bloom_bits.BLOCK_SIZE_IN_BITS // 8) != 0:
+            raise ValueError('Invalid blocked Bloom Filter data.')
+        bloom_filter = cls.__new__(cls)
+        bloom_filter._number_of_hashes = number_of_hashes
+        bloom_filter._bits = bits.copy()
+        bloom_filter._hash_func = hash_func
+        return bloom_filter
+
+
+_FILTER_CLASSES: typing.Dict[str, type] = {
+    bloom_bits.STANDARD_FILTER_TYPE: rbloom.Bloom,
+    bloom_bits.BLOCKED_FILTER_TYPE: BlockedBloomFilter
+}
+
+
+def get_filter_class(filter_type: str) -> type:
+    """
+    Retrieves the Bloom Filter class implementing the given filter type.
+
+    :param filter_type: The type of filter, either 'standard' or 'blocked'.
+    :returns: The filter class.
+    :raises ValueError: If the filter type is unknown.
+    """
+    filter_class = _FILTER_CLASSES.get(filter_type, None)
+    if filter_class is None:
+        raise ValueError(f'Unknown Bloom Filter type "{filter_type}" (expected one of {list(_FILTER_CLASSES)}).')
+    return filter_class
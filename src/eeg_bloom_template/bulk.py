@@ -0,0 +1,320 @@
+import abc
+import concurrent.futures
+import functools
+import itertools
+import json
+import struct
+import typing
+
+from . import base, exceptions, serialization, template
+
+
+TemplateRecord = typing.Tuple[typing.Hashable, base.BaseEEGTemplateData]
+SerializedRecord = typing.Tuple[typing.Hashable, str]
+
+
+class BaseTemplateWriter(abc.ABC):
+    """
+    Abstract base class defining the interface for bulk writers of template collections. Templates are written along
+    with their IDs (which must be JSON serializable, e.g. strings or integers), one chunk of templates at a time, so
+    that only a chunk of templates is held in memory at once. Optionally, an executor (thread or process pool) can be
+    given to serialize the templates of each chunk concurrently, in batches.
+
+    Writing to a file which already contains templates (i.e., opened in append mode) resumes the collection.
+    """
+    def __init__(self,
+                 file: typing.IO,
+                 compress=False,
+                 executor: typing.Optional[concurrent.futures.Executor] = None,
+                 chunk_size: int = 1000,
+                 batch_size: int = 64):
+        if chunk_size < 1 or batch_size < 1:
+            raise ValueError(f'Chunk and batch sizes must be at least 1 (got {chunk_size} and {batch_size}).')
+        self.file = file
+        self.compress = compress
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def write(self, templates: typing.Iterable[TemplateRecord]) -> int:
+        """
+        Writes the given templates to the file.
+
+        :param templates: The templates to write, as (template ID, template) pairs.
+        :returns: The number of templates written.
+        """
+        self._write_header()
+        written = 0
+        template_iterator = iter(templates)
+        while True:
+            chunk = list(itertools.islice(template_iterator, self.chunk_size))
+            if not chunk:
+                break
+            encode = functools.partial(_serialize_records, compress=self.compress)
+            self._write_records(_map_batches(encode, chunk, self.executor, self.batch_size))
+            written += len(chunk)
+        return written
+
+    def _write_header(self):
+        """
+        Writes the header of the format, if the file does not contain any templates yet.
+        """
+        pass
+
+    @abc.abstractmethod
+    def _write_records(self, records: typing.List[SerializedRecord]):
+        """
+        Writes a chunk of serialized templates to the file.
+
+        :param records: The serialized templates, as (template ID, serialized template) pairs.
+        """
+        pass
+
+
+class BaseTemplateReader(abc.ABC):
+    """
+    Abstract base class defining the interface for bulk readers of template collections, as written by the matching
+    writers. Templates are read one chunk at a time, and yielded as they are deserialized, so that only a chunk of
+    templates is held in memory at once. Optionally, an executor (thread or process pool) can be given to deserialize
+    the templates of each chunk concurrently, in batches.
+    """
+    def __init__(self,
+                 file: typing.IO,
+                 constructor: typing.Type[base.BaseEEGTemplateData] = template.EEGTemplate,
+                 backend_kwargs: dict = None,
+                 executor: typing.Optional[concurrent.futures.Executor] = None,
+                 chunk_size: int = 1000,
+                 batch_size: int = 64):
+        if chunk_size < 1 or batch_size < 1:
+            raise ValueError(f'Chunk and batch sizes must be at least 1 (got {chunk_size} and {batch_size}).')
+        self.file = file
+        self.constructor = constructor
+        self.backend_kwargs = backend_kwargs
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def read(self, offset: int = 0) -> typing.Iterator[TemplateRecord]:
+        """
+        Reads the templates of the file, in order.
+
+        :param offset: The number of templates to skip, e.g. to resume reading after an interruption.
+        :returns: An iterator over the templates, as (template ID, template) pairs.
+        :raises InvalidSerializationFormat: If the file is not in the expected format.
+        """
+        if offset < 0:
+            raise ValueError(f'Offset must be at least 0 (got {offset}).')
+        decode = functools.partial(
+            _deserialize_records,
+            serializer=serialization.EEGTemplateDataSerializer(self.constructor),
+            decode_record=self._decode_record,
+            backend_kwargs=self.backend_kwargs
+        )
+        raw_records = self._iter_raw_records(offset)
+        while True:
+            chunk = list(itertools.islice(raw_records, self.chunk_size))
+            if not chunk:
+                break
+            yield from _map_batches(decode, chunk, self.executor, self.batch_size)
+
+    @abc.abstractmethod
+    def _iter_raw_records(self, offset: int) -> typing.Iterator[typing.Any]:
+        """
+        Iterates over the raw (undecoded) records of the file, skipping the given number of records as cheaply as
+        the format allows.
+
+        :param offset: The number of records to skip.
+        :returns: An iterator over the raw records.
+        """
+        pass
+
+    @staticmethod
+    @abc.abstractmethod
+    def _decode_record(raw_record: typing.Any) -> SerializedRecord:
+        """
+        Decodes a raw record into a template ID and serialized template.
+
+        :param raw_record: The raw record.
+        :returns: The template ID and serialized template.
+        """
+        pass
+
+
+class JsonLinesTemplateWriter(BaseTemplateWriter):
+    """
+    Bulk writer storing templates in JSON Lines format: one JSON object per line, holding the ID of the template and
+    the template in its serialized string format.
+    """
+    ID_KEY = 'id'
+    TEMPLATE_KEY = 'template'
+
+    def _write_records(self, records: typing.List[SerializedRecord]):
+        self.file.writelines(
+            json.dumps({self.ID_KEY: template_id, self.TEMPLATE_KEY: serialized}) + '\n'
+            for template_id, serialized in records
+        )
+
+
+class JsonLinesTemplateReader(BaseTemplateReader):
+    """
+    Bulk reader for templates stored in JSON Lines format, as written by JsonLinesTemplateWriter. Blank lines are
+    ignored. Skipped lines are not parsed.
+    """
+    def _iter_raw_records(self, offset: int) -> typing.Iterator[str]:
+        lines = (line for line in self.file if line.strip())
+        return itertools.islice(lines, offset, None)
+
+    @staticmethod
+    def _decode_record(raw_record: str) -> SerializedRecord:
+        try:
+            record = json.loads(raw_record)
+            return record[JsonLinesTemplateWriter.ID_KEY], record[JsonLinesTemplateWriter.TEMPLATE_KEY]
+        except (ValueError, KeyError, TypeError) as e:
+            raise exceptions.InvalidSerializationFormat(f'Invalid template record: {e}') from e
+
+
+class BinaryTemplateWriter(BaseTemplateWriter):
+    """
+    Bulk writer storing templates in a chunked binary container. The container starts with a magic string, followed
+    by one block per chunk of templates: a header holding the number of records and the size of the block, then each
+    record as the length-prefixed JSON encoded ID and UTF-8 encoded serialized template. Block headers allow readers
+    to skip whole blocks without reading them when resuming from an offset.
+    """
+    MAGIC = b'EEGTPLB1'
+    BLOCK_HEADER = struct.Struct('<IQ')
+    LENGTH_PREFIX = struct.Struct('<I')
+
+    def _write_header(self):
+        if self.file.tell() == 0:
+            self.file.write(self.MAGIC)
+
+    def _write_records(self, records: typing.List[SerializedRecord]):
+        block = bytearray()
+        for template_id, serialized in records:
+            for field in (json.dumps(template_id).encode('utf-8'), serialized.encode('utf-8')):
+                block += self.LENGTH_PREFIX.pack(len(field))
+                block += field
+        self.file.write(self.BLOCK_HEADER.pack(len(records), len(block)))
+        self.file.write(block)
+
+
+class BinaryTemplateReader(BaseTemplateReader):
+    """
+    Bulk reader for templates stored in a chunked binary container, as written by BinaryTemplateWriter.
+    """
+    def _iter_raw_records(self, offset: int) -> typing.Iterator[typing.Tuple[bytes, bytes]]:
+        if self._read_exactly(len(BinaryTemplateWriter.MAGIC)) != BinaryTemplateWriter.MAGIC:
+            raise exceptions.InvalidSerializationFormat('Invalid binary template container (bad magic string).')
+        while True:
+            header = self.file.read(BinaryTemplateWriter.BLOCK_HEADER.size)
+            if not header:
+                return
+            if len(header) != BinaryTemplateWriter.BLOCK_HEADER.size:
+                raise exceptions.InvalidSerializationFormat('Truncated binary template container.')
+            number_of_records, block_size = BinaryTemplateWriter.BLOCK_HEADER.unpack(header)
+            if offset >= number_of_records:
+                self._skip(block_size)
+                offset -= number_of_records
+                continue
+            block = memoryview(self._read_exactly(block_size))
+            position = 0
+            for record_idx in range(number_of_records):
+                fields = []
+                for _ in range(2):
+                    if position + BinaryTemplateWriter.LENGTH_PREFIX.size > len(block):
+                        raise exceptions.InvalidSerializationFormat('Truncated binary template record.')
+                    length, = BinaryTemplateWriter.LENGTH_PREFIX.unpack_from(block, position)
+                    position += BinaryTemplateWriter.LENGTH_PREFIX.size
+                    fields.append(bytes(block[position:position + length]))
+                    position += length
+                if record_idx >= offset:
+                    yield fields[0], fields[1]
+            offset = 0
+
+    @staticmethod
+    def _decode_record(raw_record: typing.Tuple[bytes, bytes]) -> SerializedRecord:
+        id_bytes, template_bytes = raw_record
+        try:
+            return json.loads(id_bytes), template_bytes.decode('utf-8')
+        except ValueError as e:
+            raise exceptions.InvalidSerializationFormat(f'Invalid template record: {e}') from e
+
+    def _read_exactly(self, size: int) -> bytes:
+        """
+        Helper method which reads the given number of bytes from the file.
+
+        :param size: The number of bytes to read.
+        :returns: The bytes read.
+        :raises InvalidSerializationFormat: If the file ends before the given number of bytes.
+        """
+        data = self.file.read(size)
+        if len(data) != size:
+            raise exceptions.InvalidSerializationFormat('Truncated binary template container.')
+        return data
+
+    def _skip(self, size: int):
+        """
+        Helper method which skips the given number of bytes of the file, seeking if the file allows it.
+
+        :param size: The number of bytes to skip.
+        """
+        if self.file.seekable():
+            self.file.seek(size, 1)
+        else:
+            self._read_exactly(size)
+
+
+def _map_batches(function: typing.Callable[[list], list],
+                 items: list,
+                 executor: typing.Optional[concurrent.futures.Executor],
+                 batch_size: int) -> list:
+    """
+    Applies the given function to batches of the given items, using the executor if one is given.
+
+    :param function: The function, which maps a batch of items to a batch of results.
+    :param items: The items.
+    :param executor: Optional executor used to process the batches concurrently.
+    :param batch_size: The number of items per batch.
+    :returns: The results, in the order of the items.
+    """
+    if executor is None:
+        return function(items)
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    return [result for batch_results in executor.map(function, batches) for result in batch_results]
+
+
+def _serialize_records(records: typing.List[TemplateRecord], compress: bool) -> typing.List[SerializedRecord]:
+    """
+    Serializes a batch of templates. This is a module level function, so that it can be used by process pools as well
+    as thread pools.
+
+    :param records: The templates, as (template ID, template) pairs.
+    :param compress: Flag indicating whether to compress the Bloom Filter data of the templates.
+    :returns: The serialized templates, as (template ID, serialized template) pairs.
+    """
+    serialized_records = []
+    for template_id, eeg_template in records:
+        serializer = serialization.EEGTemplateDataSerializer(type(eeg_template), compress=compress)
+        serialized_records.append((template_id, serializer.serialize(eeg_template)))
+    return serialized_records
+
+
+def _deserialize_records(raw_records: list,
+                         serializer: serialization.EEGTemplateDataSerializer,
+                         decode_record: typing.Callable[[typing.Any], SerializedRecord],
+                         backend_kwargs: typing.Optional[dict]) -> typing.List[TemplateRecord]:
+    """
+    Decodes and deserializes a batch of raw records. This is a module level function, so that it can be used by
+    process pools as well as thread pools.
+
+    :param raw_records: The raw records.
+    :param serializer: The serializer used to deserialize the templates.
+    :param decode_record: The function decoding a raw record into a template ID and serialized template.
+    :param backend_kwargs: Additional keyword arguments to pass down to the hashing backends of the templates.
+    :returns: The templates, as (template ID, template) pairs.
+    """
+    records = []
+    for raw_record in raw_records:
+        template_id, serialized = decode_record(raw_record)
+        records.append((template_id, serializer.deserialize(serialized, backend_kwargs)))
+    return records
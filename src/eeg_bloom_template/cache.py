@@ -0,0 +1,253 @@
+import collections
+import dataclasses
+import hashlib
+import threading
+import time
+import typing
+
+from . import base, template
+
+
+T = typing.TypeVar('T', bound=base.BaseEEGTemplateData)
+TemplateLoader = typing.Callable[[typing.Hashable], typing.Optional[base.BaseEEGTemplateData]]
+
+
+@dataclasses.dataclass
+class TemplateCacheStatistics:
+    """
+    Simple container for template cache metrics.
+    """
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Calculates the ratio of lookups which were served from the cache.
+
+        :returns: The hit ratio, or 0 if there have not been any lookups.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+
+@dataclasses.dataclass
+class _TemplateCacheEntry:
+    """
+    Internal container for a cached template and its bookkeeping data.
+    """
+    template: base.BaseEEGTemplateData
+    size: int
+    expires_at: typing.Optional[float]
+
+
+class TemplateCache:
+    """
+    Thread-safe, least recently used cache of deserialized EEG templates. Templates may be keyed by any hashable value
+    (e.g., a template ID), or by the digest of their serialized content. The cache can be bounded by the total number
+    of bytes used by the Bloom Filters of the cached templates, and entries can optionally expire after a given time to
+    live. When a loader callback is given, it is used to retrieve templates which are not present in the cache.
+
+    Note that the loader is called without holding the cache lock, so concurrent misses for the same key may each call
+    the loader.
+    """
+    def __init__(self,
+                 max_bytes: typing.Optional[int] = None,
+                 ttl: typing.Optional[float] = None,
+                 loader: TemplateLoader = None,
+                 clock: typing.Callable[[], float] = time.monotonic):
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError(f'Maximum cache size must be greater than 0 (got {max_bytes}).')
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f'Time to live must be greater than 0 (got {ttl}).')
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._loader = loader
+        self._clock = clock
+        self._entries: typing.OrderedDict[typing.Hashable, _TemplateCacheEntry] = collections.OrderedDict()
+        self._current_bytes = 0
+        self._statistics = TemplateCacheStatistics()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            return entry is not None and not self._is_expired(entry)
+
+    @property
+    def current_bytes(self) -> int:
+        """
+        Retrieves the total number of Bloom Filter bytes used by the templates in the cache.
+
+        :returns: The number of bytes.
+        """
+        with self._lock:
+            return self._current_bytes
+
+    @property
+    def statistics(self) -> TemplateCacheStatistics:
+        """
+        Retrieves a snapshot of the cache metrics.
+
+        :returns: The cache metrics.
+        """
+        with self._lock:
+            return dataclasses.replace(self._statistics)
+
+    def get(self, key: typing.Hashable, loader: TemplateLoader = None) -> typing.Optional[base.BaseEEGTemplateData]:
+        """
+        Retrieves the template stored under the given key. On a miss, the given loader (or the loader of the cache,
+        if none is given) is used to retrieve the template, which is then stored in the cache.
+
+        :param key: The key of the template.
+        :param loader: Optional loader to use on a miss, in place of the loader of the cache.
+        :returns: The template, or None if it is not cached and could not be loaded.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self._statistics.hits += 1
+                return entry.template
+            self._statistics.misses += 1
+        if loader is None:
+            loader = self._loader
+        if loader is None:
+            return None
+        loaded_template = loader(key)
+        if loaded_template is None:
+            return None
+        with self._lock:
+            self._statistics.loads += 1
+        self.put(key, loaded_template)
+        return loaded_template
+
+    def get_serialized(self, serialized: str, constructor: typing.Type[T] = template.EEGTemplate) -> T:
+        """
+        Retrieves the template corresponding to the given serialized template data, keyed by the digest of the
+        data. The data is only deserialized on a miss.
+
+        :param serialized: The serialized template data.
+        :param constructor: The template type to deserialize the data into.
+        :returns: The template.
+        """
+        key = self.get_content_key(serialized)
+        return self.get(key, loader=lambda _: constructor.deserialize(serialized))
+
+    def put(self, key: typing.Hashable, cached_template: base.BaseEEGTemplateData):
+        """
+        Stores the given template under the given key, evicting the least recently used templates as needed to stay
+        within the maximum size of the cache. Templates which are larger than the cache on their own are not stored.
+
+        :param key: The key to store the template under.
+        :param cached_template: The template to store.
+        """
+        size = self.get_template_size(cached_template)
+        expires_at = None
+        if self._ttl is not None:
+            expires_at = self._clock() + self._ttl
+        with self._lock:
+            self._remove(key)
+            if self._max_bytes is not None and size > self._max_bytes:
+                return
+            self._entries[key] = _TemplateCacheEntry(template=cached_template, size=size, expires_at=expires_at)
+            self._current_bytes += size
+            self._evict()
+
+    def invalidate(self, key: typing.Hashable) -> bool:
+        """
+        Removes the template stored under the given key from the cache.
+
+        :param key: The key of the template.
+        :returns: A flag indicating whether a template was removed.
+        """
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self):
+        """
+        Removes all templates from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+    @staticmethod
+    def get_content_key(serialized: str) -> str:
+        """
+        Calculates the key used to cache a template by its serialized content.
+
+        :param serialized: The serialized template data.
+        :returns: The content digest of the data.
+        """
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_template_size(cached_template: base.BaseEEGTemplateData) -> int:
+        """
+        Calculates the number of bytes used by the Bloom Filters of the given template.
+
+        :param cached_template: The template.
+        :returns: The number of bytes.
+        """
+        return sum(bloom_filter.size_in_bits // 8 for bloom_filter in cached_template.bloom_filters)
+
+    def _lookup(self, key: typing.Hashable) -> typing.Optional[_TemplateCacheEntry]:
+        """
+        Helper method which retrieves a cache entry, marking it as most recently used. Expired entries are removed.
+        Must be called while holding the cache lock.
+
+        :param key: The key of the entry.
+        :returns: The entry, or None if it is not present.
+        """
+        entry = self._entries.get(key, None)
+        if entry is None:
+            return None
+        if self._is_expired(entry):
+            self._remove(key)
+            self._statistics.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: typing.Hashable) -> bool:
+        """
+        Helper method which removes a cache entry. Must be called while holding the cache lock.
+
+        :param key: The key of the entry.
+        :returns: A flag indicating whether an entry was removed.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._current_bytes -= entry.size
+        return True
+
+    def _evict(self):
+        """
+        Helper method which evicts the least recently used entries until the cache is within its maximum size. Must be
+        called while holding the cache lock.
+        """
+        if self._max_bytes is None:
+            return
+        while self._current_bytes > self._max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._current_bytes -= entry.size
+            self._statistics.evictions += 1
+
+    def _is_expired(self, entry: _TemplateCacheEntry) -> bool:
+        """
+        Helper method which checks whether the given entry has outlived the time to live of the cache.
+
+        :param entry: The entry to check.
+        :returns: A flag indicating whether the entry has expired.
+        """
+        return entry.expires_at is not None and self._clock() >= entry.expires_at
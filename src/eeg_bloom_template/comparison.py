@@ -1,9 +1,13 @@
+import concurrent.futures
 import dataclasses
+import os
 import typing
 import rbloom
 import numpy as np
 
+from . import backend, hash_cache
 from .base import BaseEEGTemplateData
+from .utils import bloom_bits
 from .utils.iteration import iter_ratio_slices
 from .utils.logging_helpers import get_logger
 
@@ -38,56 +42,311 @@ class ComparisonResult:
         return 1 - self.hit_ratio
 
 
+class PreparedProbe:
+    """
+    EEG feature data prepared for comparison against one or more templates. The data is converted into a matrix once,
+    and its segmentation as well as the hash codes and Bloom Filter bit indexes of its elements are cached (keyed by
+    hash backend identity, e.g. including the seed or token of the backend). Comparing the same probe against several
+    templates then only pays for the membership tests. Elements are hashed as 32-bit floats, and their bit indexes are
+    stored as 32-bit integers whenever the filter size allows it. Optionally, hash codes can be read from (and stored
+    into) an on-disk cache, so that probes which are prepared again and again (e.g., by repeated evaluations) are only
+    hashed once.
+    """
+    def __init__(self,
+                 eeg_data: typing.List[np.ndarray],
+                 hash_code_cache: typing.Optional[hash_cache.HashCodeDiskCache] = None):
+        try:
+            matrix = np.asarray(eeg_data)
+        except ValueError:
+            matrix = None
+        if matrix is not None and matrix.ndim != 2:
+            matrix = None
+        self._matrix = matrix
+        self._float_matrix: typing.Optional[np.ndarray] = None
+        self._hash_code_cache = hash_code_cache
+        self._segments: typing.Dict[typing.Tuple[float, bool], typing.List[range]] = {}
+        self._hash_codes: typing.Dict[str, np.ndarray] = {}
+        self._indexes: typing.Dict[tuple, np.ndarray] = {}
+
+    @property
+    def is_valid(self) -> bool:
+        """
+        Flag indicating whether the probe data is a 2D matrix, which can be compared against templates.
+
+        :returns: True if the probe can be compared.
+        """
+        return self._matrix is not None
+
+    @property
+    def elements_total(self) -> int:
+        """
+        Retrieves the number of elements in the probe data.
+
+        :returns: The number of elements, or 0 if the probe data is not a 2D matrix.
+        """
+        if self._matrix is None:
+            return 0
+        return self._matrix.size
+
+    def get_matrix(self, row_wise=True) -> np.ndarray:
+        """
+        Retrieves the probe data as a matrix, oriented for the given type of analysis.
+
+        :param row_wise: Flag indicating whether to orient the matrix for row wise or column wise analysis.
+        :returns: The matrix (transposed for column wise analysis).
+        """
+        if self._matrix is None:
+            raise ValueError('Probe data is not a 2D matrix.')
+        if row_wise:
+            return self._matrix
+        return self._matrix.transpose()
+
+    def get_float_matrix(self, row_wise=True) -> np.ndarray:
+        """
+        Retrieves the probe data as a matrix of 32-bit floats (the precision used by the hash backends), oriented for
+        the given type of analysis. The data is only cast once, and kept in its original precision as well, for Bloom
+        Filters which do not use a hash backend (and hash the original values).
+
+        :param row_wise: Flag indicating whether to orient the matrix for row wise or column wise analysis.
+        :returns: The matrix (transposed for column wise analysis).
+        """
+        if self._float_matrix is None:
+            self._float_matrix = np.asarray(self.get_matrix(), dtype=np.float32)
+        if row_wise:
+            return self._float_matrix
+        return self._float_matrix.transpose()
+
+    def get_segments(self, segment_ratio: float, row_wise=True) -> typing.List[range]:
+        """
+        Retrieves the ranges of (oriented) rows making up each segment of the probe, for the given segment ratio.
+
+        :param segment_ratio: The segment ratio of the template the probe is compared against.
+        :param row_wise: Flag indicating whether the template uses row wise or column wise analysis.
+        :returns: The row range of each segment.
+        """
+        key = (segment_ratio, row_wise)
+        if key not in self._segments:
+            number_of_rows = len(self.get_matrix(row_wise))
+            self._segments[key] = list(iter_ratio_slices(range(number_of_rows), segment_ratio))
+        return self._segments[key]
+
+    def get_hash_codes(self, hash_backend: backend.BaseBloomFilterHashBackend) -> np.ndarray:
+        """
+        Retrieves the hash codes of every element of the probe, computed using the given hash backend.
+
+        :param hash_backend: The hash backend.
+        :returns: The hash codes, with the shape of the (row wise) probe matrix plus a trailing dimension of 2.
+        """
+        identity = hash_backend.identity
+        if identity not in self._hash_codes:
+            if self._hash_code_cache is None:
+                self._hash_codes[identity] = bloom_bits.hash_values(hash_backend, self.get_float_matrix())
+            else:
+                self._hash_codes[identity] = self._hash_code_cache.get_hash_codes(hash_backend, self.get_float_matrix())
+        return self._hash_codes[identity]
+
+    def get_indexes(self,
+                    hash_backend: backend.BaseBloomFilterHashBackend,
+                    number_of_hashes: int,
+                    size_in_bits: int,
+                    row_wise=True,
+                    filter_type: str = bloom_bits.STANDARD_FILTER_TYPE) -> np.ndarray:
+        """
+        Retrieves the Bloom Filter bit indexes of every element of the probe, for filters of the given size.
+
+        :param hash_backend: The hash backend used by the filters.
+        :param number_of_hashes: The number of hash functions used by the filters.
+        :param size_in_bits: The size of the filters in bits.
+        :param row_wise: Flag indicating whether the filters are used for row wise or column wise analysis.
+        :param filter_type: The type of the filters, either 'standard' or 'blocked'.
+        :returns: The bit indexes, with the shape of the oriented probe matrix plus a trailing dimension holding the
+                  indexes of each element.
+        """
+        key = (hash_backend.identity, filter_type, number_of_hashes, size_in_bits, row_wise)
+        if key not in self._indexes:
+            hash_codes = self.get_hash_codes(hash_backend)
+            if not row_wise:
+                hash_codes = hash_codes.transpose((1, 0, 2))
+            self._indexes[key] = bloom_bits.generate_filter_indexes(
+                filter_type, hash_codes, number_of_hashes, size_in_bits
+            )
+        return self._indexes[key]
+
+    def count_hits(self,
+                   bloom_filter: rbloom.Bloom,
+                   segment: range,
+                   row_wise=True,
+                   filter_bits: typing.Optional[typing.Tuple[int, np.ndarray]] = None) -> int:
+        """
+        Counts the number of elements in the given segment of the probe which are found in the given Bloom Filter.
+
+        :param bloom_filter: The Bloom Filter.
+        :param segment: The row range of the segment.
+        :param row_wise: Flag indicating whether the filter is used for row wise or column wise analysis.
+        :param filter_bits: The number of hash functions and the bit array of the filter, if already known (see
+                            BaseEEGTemplateData.get_filter_bits). By default, they are read from the filter.
+        :returns: The number of matching elements.
+        """
+        hash_backend = bloom_filter.hash_func
+        if not isinstance(hash_backend, backend.BaseBloomFilterHashBackend):
+            # Filters using other hash functions can only be checked one element at a time.
+            data_segment = self.get_matrix(row_wise)[segment.start:segment.stop]
+            return EEGTemplateDataChecker._check_segment_against_filter(list(data_segment), bloom_filter)
+        if filter_bits is None:
+            filter_bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+        number_of_hashes, bits = filter_bits
+        filter_type = bloom_bits.get_filter_type(bloom_filter)
+        indexes = self.get_indexes(hash_backend, number_of_hashes, bloom_filter.size_in_bits, row_wise, filter_type)
+        return int(bloom_bits.contains_indexes(bits, indexes[segment.start:segment.stop]).sum())
+
+
 class EEGTemplateDataChecker:
     """
     Class which implements comparison operations for EEG templates against EEG feature data vectors. A tolerance
     value is used to indicate at which point the EEG data is to be considered a non-match for the template.
+
+    Optionally, an executor (thread or process pool) can be given, in which case comparisons covering at least a
+    minimum number of segments are split into chunks of segments (one per worker of the executor, each covering at
+    least that minimum number of segments), which are checked concurrently by the executor. The number of workers of
+    the executor should be given as well, as it is otherwise assumed to be the number of CPUs. The workers hash the
+    data of their chunks, unless a prepared probe is checked, in which case they are given its cached hash codes.
     """
-    def __init__(self, template: BaseEEGTemplateData):
+    def __init__(self,
+                 template: BaseEEGTemplateData,
+                 executor: typing.Optional[concurrent.futures.Executor] = None,
+                 min_parallel_segments: int = 8,
+                 max_workers: typing.Optional[int] = None):
+        if min_parallel_segments < 1:
+            raise ValueError(f'Minimum number of parallel segments must be at least 1 (got {min_parallel_segments}).')
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f'Maximum number of workers must be at least 1 (got {max_workers}).')
         self.template = template
+        self.executor = executor
+        self.min_parallel_segments = min_parallel_segments
+        self.max_workers = max_workers
 
-    def check(self, eeg_data: typing.List[np.ndarray]) -> ComparisonResult:
+    def check(self, eeg_data: typing.Union[typing.List[np.ndarray], PreparedProbe]) -> ComparisonResult:
         """
         Checks the given EEG feature data vectors to see if they are approximately a match for the template data.
 
-        :param eeg_data: A list of EEG feature data vectors to check.
+        :param eeg_data: A list of EEG feature data vectors to check, or a probe prepared from them.
         :returns: A flag indicating whether the EEG feature data vectors are approximately a match.
         """
-        try:
-            elements_total = self._get_number_of_elements(eeg_data)
-        except ValueError:
+        probe = eeg_data
+        if not isinstance(probe, PreparedProbe):
+            probe = PreparedProbe(eeg_data)
+        if not probe.is_valid:
             _logger.warning('EEG data passed to comparison checker was not 2D matrix.')
             return ComparisonResult(hits=0, elements_total=0)
-        hits = 0
-        iterations = 0
-        filter_idx = 0
         max_filter_idx = len(self.template.bloom_filters) - 1
-        data_to_check = eeg_data
-        if not self.template.row_wise:
-            transposed_data = np.array(data_to_check).transpose()
-            data_to_check = list(transposed_data)
+        segments = probe.get_segments(self.template.segment_ratio, self.template.row_wise)
+        filter_indexes = [min(segment_idx, max_filter_idx) for segment_idx in range(len(segments))]
+        segment_filters = [self.template.bloom_filters[filter_idx] for filter_idx in filter_indexes]
 
-        for segment in iter_ratio_slices(data_to_check, self.template.segment_ratio):
-            new_hits = self._check_segment_against_filter(segment, self.template.bloom_filters[filter_idx])
-            hits += new_hits
-            filter_idx = min(filter_idx + 1, max_filter_idx)
-            iterations += 1
+        if self._use_executor(segment_filters):
+            hits = self._count_hits_in_executor(probe, segments, filter_indexes, prepared=probe is eeg_data)
+        else:
+            hits = 0
+            for segment, filter_idx, bloom_filter in zip(segments, filter_indexes, segment_filters):
+                if self._checks_elements_one_by_one(bloom_filter, prepared=probe is eeg_data):
+                    data_segment = probe.get_matrix(self.template.row_wise)[segment.start:segment.stop]
+                    hits += self._check_segment_against_filter(list(data_segment), bloom_filter)
+                else:
+                    hits += probe.count_hits(
+                        bloom_filter, segment, self.template.row_wise, self.template.get_filter_bits(filter_idx)
+                    )
 
-        return ComparisonResult(elements_total=elements_total, hits=hits)
+        return ComparisonResult(elements_total=probe.elements_total, hits=hits)
 
     @staticmethod
-    def _get_number_of_elements(data: typing.List[np.ndarray]) -> int:
+    def _checks_elements_one_by_one(bloom_filter: rbloom.Bloom, prepared: bool) -> bool:
+        """
+        Helper method which decides whether a Bloom Filter is checked one element at a time through the filter itself,
+        rather than by computing the bit indexes of the elements up front. Filters which do not use a hash backend can
+        only be checked one element at a time. Data which was not prepared is only checked once, so standard (rbloom)
+        filters are cheaper to check one element at a time as well, unless their backend hashes whole arrays natively.
+
+        :param bloom_filter: The Bloom Filter.
+        :param prepared: Flag indicating whether the data was given as a prepared probe.
+        :returns: A flag indicating whether to check the elements one at a time.
         """
-        Calculates the number of elements in the given data matrix to be checked.
+        hash_func = bloom_filter.hash_func
+        if not isinstance(hash_func, backend.BaseBloomFilterHashBackend):
+            return True
+        if prepared or hash_func.hashes_arrays_natively:
+            return False
+        return bloom_bits.get_filter_type(bloom_filter) == bloom_bits.STANDARD_FILTER_TYPE
 
-        :param data: A data matrix (i.e., a series of rows of EEG feature data to be checked).
-        :returns: The total number of elements.
+    def _use_executor(self, segment_filters: typing.List[rbloom.Bloom]) -> bool:
         """
-        matrix = np.array(data)
-        shape = matrix.shape
-        if len(shape) != 2:
-            raise ValueError(f'Expected 2D matrix of element data, got {len(shape)} dimensions.')
-        return shape[0] * shape[1]
+        Helper method which decides whether a comparison is split across the executor of the checker, i.e., whether
+        there is an executor, the comparison covers enough segments, and the filters use the same hash backend
+        (which can be shared with the executor's workers). Filters which were deserialized each hold their own
+        instance of the backend, so backends are compared by identity.
+
+        :param segment_filters: The Bloom Filter used for each segment of the comparison.
+        :returns: A flag indicating whether to use the executor.
+        """
+        if self.executor is None or len(segment_filters) < self.min_parallel_segments:
+            return False
+        hash_functions = list({id(bloom_filter.hash_func): bloom_filter.hash_func
+                               for bloom_filter in segment_filters}.values())
+        if not all(isinstance(hash_func, backend.BaseBloomFilterHashBackend) for hash_func in hash_functions):
+            return False
+        return len({hash_func.identity for hash_func in hash_functions}) == 1
+
+    def _count_hits_in_executor(self,
+                                probe: PreparedProbe,
+                                segments: typing.List[range],
+                                filter_indexes: typing.List[int],
+                                prepared: bool) -> int:
+        """
+        Helper method which counts the hits of every segment of a probe, checking chunks of segments concurrently
+        using the executor of the checker. The segments are split into one chunk per worker of the executor, unless
+        this would make chunks smaller than the minimum number of parallel segments. Prepared probes give the workers
+        their (cached) hash codes, while other probes are hashed by the workers.
+
+        :param probe: The probe to check.
+        :param segments: The row range of each segment of the probe.
+        :param filter_indexes: The index of the Bloom Filter used for each segment.
+        :param prepared: Flag indicating whether the probe was given as a prepared probe.
+        :returns: The total number of hits.
+        """
+        hash_backend = self.template.bloom_filters[filter_indexes[0]].hash_func
+        if prepared:
+            chunk_hash_backend = None
+            data = probe.get_hash_codes(hash_backend)
+            if not self.template.row_wise:
+                data = data.transpose((1, 0, 2))
+        else:
+            chunk_hash_backend = hash_backend
+            data = probe.get_float_matrix(self.template.row_wise)
+        number_of_workers = self.max_workers or os.cpu_count() or 1
+        number_of_chunks = max(1, min(number_of_workers, len(segments) // self.min_parallel_segments))
+        futures = []
+        for chunk in np.array_split(np.arange(len(segments)), number_of_chunks):
+            chunk_segments = [segments[segment_idx] for segment_idx in chunk]
+            chunk_data = data[chunk_segments[0].start:chunk_segments[-1].stop]
+            chunk_offset = chunk_segments[0].start
+            futures.append(self.executor.submit(
+                _count_chunk_hits,
+                chunk_data,
+                [range(segment.start - chunk_offset, segment.stop - chunk_offset) for segment in chunk_segments],
+                [self._get_filter_data(filter_indexes[segment_idx]) for segment_idx in chunk],
+                chunk_hash_backend
+            ))
+        return sum(future.result() for future in futures)
+
+    def _get_filter_data(self, filter_idx: int) -> typing.Tuple[int, np.ndarray, int, str]:
+        """
+        Helper method which gathers the data needed to check a Bloom Filter of the template in another process.
+
+        :param filter_idx: The index of the Bloom Filter.
+        :returns: The number of hash functions, bit array, size in bits and type of the filter.
+        """
+        bloom_filter = self.template.bloom_filters[filter_idx]
+        number_of_hashes, bits = self.template.get_filter_bits(filter_idx)
+        return number_of_hashes, bits, bloom_filter.size_in_bits, bloom_bits.get_filter_type(bloom_filter)
 
     @classmethod
     def _check_segment_against_filter(cls, data_segment: typing.List[np.ndarray], bloom_filter: rbloom.Bloom) -> int:
@@ -120,3 +379,32 @@ class EEGTemplateDataChecker:
             if element in bloom_filter:
                 hits += 1
         return hits
+
+
+def _count_chunk_hits(chunk_data: np.ndarray,
+                      segments: typing.List[range],
+                      filter_data: typing.List[typing.Tuple[int, np.ndarray, int, str]],
+                      hash_backend: typing.Optional[backend.BaseBloomFilterHashBackend] = None) -> int:
+    """
+    Counts the hits of a chunk of consecutive probe segments against their Bloom Filters. This is a module level
+    function, so that it can be used by process pools as well as thread pools.
+
+    :param chunk_data: The (oriented) probe rows covered by the chunk, or their hash codes if no hash backend is given.
+    :param segments: The row range of each segment, relative to the start of the chunk.
+    :param filter_data: The number of hash functions, bit array, size in bits and type of the Bloom Filter of each
+                        segment.
+    :param hash_backend: The hash backend used by the Bloom Filters, used to hash the probe rows of the chunk. If None,
+                         the chunk data holds the hash codes of the rows already.
+    :returns: The number of hits in the chunk.
+    """
+    if hash_backend is None:
+        hash_codes = chunk_data
+    else:
+        hash_codes = bloom_bits.hash_values(hash_backend, chunk_data)
+    hits = 0
+    for segment, (number_of_hashes, bits, size_in_bits, filter_type) in zip(segments, filter_data):
+        indexes = bloom_bits.generate_filter_indexes(
+            filter_type, hash_codes[segment.start:segment.stop], number_of_hashes, size_in_bits
+        )
+        hits += int(bloom_bits.contains_indexes(bits, indexes).sum())
+    return hits
@@ -0,0 +1,182 @@
+import abc
+import typing
+import zlib
+import numpy as np
+
+from .exceptions import InvalidImplementation
+
+
+class BaseFilterCodec(abc.ABC):
+    """
+    Abstract base class defining the interface for a codec used to compress the bytes of serialized Bloom Filters.
+    """
+    _implementations: typing.Dict[str, typing.Type['BaseFilterCodec']] = {}
+    codec_key: str
+
+    @abc.abstractmethod
+    def encode(self, data: bytes) -> bytes:
+        """
+        Encodes (i.e., compresses) the given Bloom Filter bytes.
+
+        :param data: The bytes to encode.
+        :returns: The encoded bytes.
+        """
+        pass
+
+    @abc.abstractmethod
+    def decode(self, data: bytes) -> bytes:
+        """
+        Decodes the given encoded Bloom Filter bytes, recovering the original bytes.
+
+        :param data: The encoded bytes.
+        :returns: The decoded bytes.
+        :raises ValueError: If the data could not be decoded.
+        """
+        pass
+
+    @classmethod
+    def get_implementation(cls, implementation_key: str) -> typing.Type['BaseFilterCodec']:
+        """
+        Retrieves a codec implementation from the given implementation key.
+
+        :param implementation_key: The key to use to retrieve the implementation.
+        :returns: The implementation.
+        """
+        implementation = cls._implementations.get(implementation_key.lower(), None)
+        if implementation is None:
+            raise InvalidImplementation(f'No registered codec for "{implementation_key}"')
+        return implementation
+
+    @classmethod
+    def __init_subclass__(cls, **kwargs):
+        # Register new subclasses
+        super().__init_subclass__(**kwargs)
+        BaseFilterCodec._implementations[cls.get_implementation_key(cls)] = cls
+
+    @classmethod
+    def get_implementation_key(cls, implementation: typing.Type['BaseFilterCodec']) -> str:
+        """
+        Retrieves the key to use for retrieving the given implementation type at runtime from the subclass registry.
+
+        :param implementation: The implementation (i.e., the type) to retrieve the implementation key from.
+        :returns: The implementation key.
+        """
+        return implementation.codec_key.lower()
+
+    @classmethod
+    def encode_smallest(cls, data: bytes) -> typing.Tuple[str, bytes]:
+        """
+        Encodes the given data with every registered codec, keeping whichever produces the smallest output. The raw
+        codec is preferred when no codec reduces the size of the data.
+
+        :param data: The bytes to encode.
+        :returns: The key of the codec used and the encoded bytes.
+        """
+        best_key = RawFilterCodec.codec_key
+        best_data = data
+        for implementation_key, implementation in cls._implementations.items():
+            encoded = implementation().encode(data)
+            if len(encoded) < len(best_data):
+                best_key = implementation_key
+                best_data = encoded
+        return best_key, best_data
+
+
+class RawFilterCodec(BaseFilterCodec):
+    """
+    Codec which leaves the bytes of the filter as they are.
+    """
+    codec_key = 'raw'
+
+    def encode(self, data: bytes) -> bytes:
+        return data
+
+    def decode(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibFilterCodec(BaseFilterCodec):
+    """
+    Codec which compresses the bytes of the filter using zlib (DEFLATE).
+    """
+    codec_key = 'zlib'
+
+    def encode(self, data: bytes) -> bytes:
+        return zlib.compress(data, 9)
+
+    def decode(self, data: bytes) -> bytes:
+        try:
+            return zlib.decompress(data)
+        except zlib.error as e:
+            raise ValueError(f'Invalid zlib filter data: {e}') from e
+
+
+class SparseFilterCodec(BaseFilterCodec):
+    """
+    Codec which stores only the non-zero bytes of the filter, along with the gap since the previous non-zero byte.
+    Bloom Filters holding only a few items are mostly zero bits, which this encoding takes advantage of. All integers
+    are stored as unsigned LEB128 variable length integers.
+    """
+    codec_key = 'sparse'
+
+    def encode(self, data: bytes) -> bytes:
+        byte_array = np.frombuffer(data, dtype=np.uint8)
+        encoded = bytearray(self._encode_varint(len(data)))
+        previous_index = -1
+        for index in np.flatnonzero(byte_array).tolist():
+            encoded += self._encode_varint(index - previous_index - 1)
+            encoded.append(data[index])
+            previous_index = index
+        return bytes(encoded)
+
+    def decode(self, data: bytes) -> bytes:
+        length, position = self._decode_varint(data, 0)
+        decoded = bytearray(length)
+        index = -1
+        while position < len(data):
+            gap, position = self._decode_varint(data, position)
+            index += gap + 1
+            if index >= length or position >= len(data):
+                raise ValueError('Invalid sparse filter data: value out of range.')
+            decoded[index] = data[position]
+            position += 1
+        return bytes(decoded)
+
+    @staticmethod
+    def _encode_varint(value: int) -> bytes:
+        """
+        Helper method which encodes a non-negative integer as an unsigned LEB128 variable length integer.
+
+        :param value: The value to encode.
+        :returns: The encoded bytes.
+        """
+        encoded = bytearray()
+        while True:
+            byte_value = value & 0x7F
+            value >>= 7
+            if value:
+                encoded.append(byte_value | 0x80)
+            else:
+                encoded.append(byte_value)
+                return bytes(encoded)
+
+    @staticmethod
+    def _decode_varint(data: bytes, position: int) -> typing.Tuple[int, int]:
+        """
+        Helper method which decodes an unsigned LEB128 variable length integer at the given position.
+
+        :param data: The data to decode from.
+        :param position: The position of the first byte of the integer.
+        :returns: The decoded integer and the position following it.
+        """
+        value = 0
+        shift = 0
+        while True:
+            if position >= len(data):
+                raise ValueError('Invalid sparse filter data: truncated integer.')
+            byte_value = data[position]
+            position += 1
+            value |= (byte_value & 0x7F) << shift
+            shift += 7
+            if not byte_value & 0x80:
+                return value, position
@@ -0,0 +1,227 @@
+import typing
+import rbloom
+import numpy as np
+
+from . import backend
+from .base import BaseEEGTemplateData
+from .comparison import ComparisonResult, EEGTemplateDataChecker
+from .utils import bloom_bits
+from .utils.iteration import iter_ratio_slices
+
+
+class SlidingWindowScorer:
+    """
+    Scores overlapping windows of a live feed of EEG feature data rows against a template, for continuous
+    authentication. Every window of the given number of rows (one starting every step rows) gets the same result as
+    checking its rows with an EEGTemplateDataChecker, but each incoming row is only hashed and checked once.
+
+    The hit count of every row is kept for each Bloom Filter the row can be checked against (i.e., for each segment
+    position of row wise templates, or summed over the column segments of column wise templates). Window scores are
+    kept as per segment sums, which are updated as rows enter and leave the segments, so that moving to the next window
+    costs O(step) rather than O(window). The template must not be modified while it is being scored.
+    """
+    def __init__(self, template: BaseEEGTemplateData, window: int, step: int = 1):
+        if window < 1:
+            raise ValueError(f'Window must contain at least 1 row (got {window}).')
+        if step < 1:
+            raise ValueError(f'Step must be at least 1 row (got {step}).')
+        if not template.bloom_filters:
+            raise ValueError('Template must contain at least one Bloom Filter.')
+        self.template = template
+        self.window = window
+        self.step = step
+        self._filter_data = [
+            bloom_bits.split_filter_bytes(bloom_filter.save_bytes()) for bloom_filter in template.bloom_filters
+        ]
+        self.reset()
+
+    @property
+    def rows_seen(self) -> int:
+        """
+        Retrieves the number of rows received since the scorer was created or reset.
+
+        :returns: The number of rows.
+        """
+        return self._rows_seen
+
+    def reset(self):
+        """
+        Forgets every row received, so that the next row starts a new feed.
+        """
+        self._number_of_columns: typing.Optional[int] = None
+        self._segments: typing.List[typing.Tuple[int, int, int]] = []
+        self._row_filters: typing.List[int] = []
+        self._column_filters: typing.List[typing.Tuple[range, int]] = []
+        self._row_hits = np.zeros((0, 0), dtype=np.int64)
+        self._buffer_start = 0
+        self._rows_seen = 0
+        self._window_start = 0
+        self._segment_hits: typing.Optional[np.ndarray] = None
+
+    def update(self, eeg_data: typing.Union[np.ndarray, typing.List[np.ndarray]]) -> typing.List[ComparisonResult]:
+        """
+        Adds the given rows of EEG feature data to the feed, and scores every window completed by them.
+
+        :param eeg_data: The incoming rows (or a single row) of EEG feature data.
+        :returns: The comparison result of each completed window, in order (possibly none).
+        :raises ValueError: If the rows are not a 2D matrix, or have a different number of columns than earlier rows.
+        """
+        rows = np.asarray(eeg_data)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        if rows.ndim != 2:
+            raise ValueError(f'Expected 2D matrix of element data, got {rows.ndim} dimensions.')
+        if self._number_of_columns is None:
+            self._initialize_layout(rows.shape[1])
+        elif rows.shape[1] != self._number_of_columns:
+            raise ValueError(f'Expected rows of {self._number_of_columns} elements, got {rows.shape[1]}.')
+        if len(rows) > 0:
+            self._append_row_hits(self._count_row_hits(rows))
+
+        results = []
+        while True:
+            if self._segment_hits is None:
+                if self._rows_seen < self._window_start + self.window:
+                    break
+                self._segment_hits = self._sum_segments(self._window_start)
+            else:
+                next_start = self._window_start + self.step
+                if self._rows_seen < next_start + self.window:
+                    break
+                if self.step < self.window:
+                    self._segment_hits += self._shift_segments(self._window_start, next_start)
+                else:
+                    self._segment_hits = self._sum_segments(next_start)
+                self._window_start = next_start
+            results.append(ComparisonResult(
+                elements_total=self.window * self._number_of_columns, hits=int(self._segment_hits.sum())
+            ))
+        return results
+
+    def _initialize_layout(self, number_of_columns: int):
+        """
+        Helper method which determines how rows are checked, once the number of columns of the feed is known. Row wise
+        templates split each window into segments of rows, while column wise templates split every row into segments
+        of columns, which do not depend on the position of the row in the window.
+
+        :param number_of_columns: The number of columns of the feed.
+        """
+        self._number_of_columns = number_of_columns
+        max_filter_idx = len(self.template.bloom_filters) - 1
+        if self.template.row_wise:
+            window_segments = list(iter_ratio_slices(range(self.window), self.template.segment_ratio))
+            segment_filters = [min(segment_idx, max_filter_idx) for segment_idx in range(len(window_segments))]
+            self._row_filters = sorted(set(segment_filters))
+            self._segments = [
+                (segment.start, segment.stop, self._row_filters.index(filter_idx))
+                for segment, filter_idx in zip(window_segments, segment_filters)
+            ]
+        else:
+            column_segments = list(iter_ratio_slices(range(number_of_columns), self.template.segment_ratio))
+            self._column_filters = [
+                (segment, min(segment_idx, max_filter_idx)) for segment_idx, segment in enumerate(column_segments)
+            ]
+            self._segments = [(0, self.window, 0)]
+        self._row_hits = np.zeros((self.window + self.step, len(self._row_filters) or 1), dtype=np.int64)
+
+    def _count_row_hits(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Helper method which checks the given incoming rows, hashing each of them once, and generating their bit indexes
+        once per layout of Bloom Filter (i.e., hash backend, type, number of hashes and size).
+
+        :param rows: The incoming rows.
+        :returns: The hit counts of each row, with a column per Bloom Filter a row can be checked against for row wise
+                  templates, or a single column holding the total hits of each row for column wise templates.
+        """
+        row_data: typing.Dict[typing.Hashable, np.ndarray] = {}
+        if self.template.row_wise:
+            return np.stack([
+                self._count_filter_hits(filter_idx, rows, row_data) for filter_idx in self._row_filters
+            ], axis=1)
+        row_hits = np.zeros(len(rows), dtype=np.int64)
+        for segment, filter_idx in self._column_filters:
+            row_hits += self._count_filter_hits(filter_idx, rows, row_data, slice(segment.start, segment.stop))
+        return row_hits.reshape(-1, 1)
+
+    def _count_filter_hits(self,
+                           filter_idx: int,
+                           rows: np.ndarray,
+                           row_data: typing.Dict[typing.Hashable, np.ndarray],
+                           columns: slice = slice(None)) -> np.ndarray:
+        """
+        Helper method which counts the elements of each of the given rows found in a Bloom Filter of the template.
+
+        :param filter_idx: The index of the Bloom Filter.
+        :param rows: The rows to check.
+        :param row_data: The hash codes (keyed by hash backend identity) and bit indexes (keyed by filter layout) of the
+                         rows computed so far.
+        :param columns: The columns of the rows to check.
+        :returns: The number of hits of each row.
+        """
+        bloom_filter: rbloom.Bloom = self.template.bloom_filters[filter_idx]
+        hash_backend = bloom_filter.hash_func
+        if not isinstance(hash_backend, backend.BaseBloomFilterHashBackend):
+            # Filters using other hash functions can only be checked one element at a time.
+            return np.array([
+                EEGTemplateDataChecker._check_vector_against_filter(row, bloom_filter) for row in rows[:, columns]
+            ], dtype=np.int64)
+        identity = hash_backend.identity
+        if identity not in row_data:
+            row_data[identity] = bloom_bits.hash_values(hash_backend, rows)
+        number_of_hashes, bits = self._filter_data[filter_idx]
+        filter_type = bloom_bits.get_filter_type(bloom_filter)
+        layout = (identity, filter_type, number_of_hashes, bloom_filter.size_in_bits)
+        if layout not in row_data:
+            row_data[layout] = bloom_bits.generate_filter_indexes(
+                filter_type, row_data[identity], number_of_hashes, bloom_filter.size_in_bits
+            )
+        return bloom_bits.contains_indexes(bits, row_data[layout][:, columns]).sum(axis=1)
+
+    def _append_row_hits(self, row_hits: np.ndarray):
+        """
+        Helper method which keeps the hit counts of incoming rows. Rows before the current window are only dropped
+        when the buffer is full, so that appending rows costs amortized O(step).
+
+        :param row_hits: The hit counts of the incoming rows.
+        """
+        used = self._rows_seen - self._buffer_start
+        if used + len(row_hits) > len(self._row_hits):
+            kept = self._row_hits[self._window_start - self._buffer_start:used]
+            capacity = max(2 * (len(kept) + len(row_hits)), self.window + self.step)
+            buffer = np.zeros((capacity, self._row_hits.shape[1]), dtype=np.int64)
+            buffer[:len(kept)] = kept
+            self._row_hits = buffer
+            self._buffer_start = self._window_start
+            used = len(kept)
+        self._row_hits[used:used + len(row_hits)] = row_hits
+        self._rows_seen += len(row_hits)
+
+    def _sum_segments(self, window_start: int) -> np.ndarray:
+        """
+        Helper method which sums the hits of the rows of each segment of a window.
+
+        :param window_start: The row of the feed starting the window.
+        :returns: The hits of each segment.
+        """
+        offset = window_start - self._buffer_start
+        return np.array([
+            self._row_hits[offset + segment_start:offset + segment_stop, column].sum()
+            for segment_start, segment_stop, column in self._segments
+        ], dtype=np.int64)
+
+    def _shift_segments(self, window_start: int, next_start: int) -> np.ndarray:
+        """
+        Helper method which computes how the hits of each segment change when moving to a later window which overlaps
+        the current one, i.e., the hits of the rows entering the segment minus the hits of the rows leaving it.
+
+        :param window_start: The row of the feed starting the current window.
+        :param next_start: The row of the feed starting the next window.
+        :returns: The change in hits of each segment.
+        """
+        offset = window_start - self._buffer_start
+        next_offset = next_start - self._buffer_start
+        return np.array([
+            self._row_hits[offset + segment_stop:next_offset + segment_stop, column].sum() -
+            self._row_hits[offset + segment_start:next_offset + segment_start, column].sum()
+            for segment_start, segment_stop, column in self._segments
+        ], dtype=np.int64)
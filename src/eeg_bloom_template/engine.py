@@ -2,7 +2,10 @@ import rbloom
 import typing
 import numpy as np
 
+from . import blocked_bloom
 from .backend import BaseBloomFilterHashBackend
+from .sizing import BloomFilterSizingPolicy
+from .utils import bloom_bits
 from .utils.iteration import iter_ratio_slices
 
 
@@ -12,10 +15,20 @@ class EEGBloomFilterTemplateEngine:
     """
     _encoding = 'utf-8'
 
-    def __init__(self, backend: BaseBloomFilterHashBackend, segment_ratio: float, false_positive_rate: float):
+    def __init__(self,
+                 backend: BaseBloomFilterHashBackend,
+                 segment_ratio: float,
+                 false_positive_rate: float,
+                 sizing_policy: BloomFilterSizingPolicy = None,
+                 filter_type: str = bloom_bits.STANDARD_FILTER_TYPE):
+        if sizing_policy is None:
+            sizing_policy = BloomFilterSizingPolicy()
+        self._filter_class = blocked_bloom.get_filter_class(filter_type)
+        self._filter_type = filter_type
         self._backend = backend
         self._segment_ratio = segment_ratio
         self._false_positive_rate = false_positive_rate
+        self._sizing_policy = sizing_policy
 
     def create_template_data(self, data: typing.List[np.ndarray], row_wise=True) -> typing.List[rbloom.Bloom]:
         """
@@ -26,34 +39,137 @@ class EEGBloomFilterTemplateEngine:
         :param row_wise: A boolean indicating whether to process the data row-wise or column-wise.
         :returns: The list of Bloom Filters to be used for a template.
         """
+        segment_means = self.compute_segment_means(data, row_wise)
         filters = []
-        array_to_process = data
-        if not row_wise:
-            transposed_data = np.array(array_to_process).transpose()
-            array_to_process = list(transposed_data)
-
-        for segment in iter_ratio_slices(array_to_process, self._segment_ratio):
-            filters.append(self._generate_bloom_filter(segment))
-
+        for segment_mean in segment_means:
+            bloom_filter = self._sizing_policy.make_filter(
+                len(segment_mean), len(segment_means), self._false_positive_rate, self._backend, self._filter_type
+            )
+            bloom_filter.update(segment_mean.tolist())
+            filters.append(bloom_filter)
         return filters
 
-    def _generate_bloom_filter(self, segment: typing.List[np.ndarray]) -> rbloom.Bloom:
+    def compute_segment_means(self, data: typing.List[np.ndarray], row_wise=True) -> typing.List[np.ndarray]:
         """
-        Helper method used to generate a Bloom Filter from a given data segment (i.e., a subsection of EEG feature
-        data from a broader collection). The segment will be averaged column-wise in order to normalize it for
-        use with the Bloom Filter.
+        Computes the column-wise average of each data segment, i.e., the values which are added to each of the Bloom
+        Filters of a template. This allows for the averaged values to be reused when generating several templates
+        from the same data. Averages are computed in the precision of the given data, then cast to 32-bit floats
+        (the precision used by the hash backends).
 
-        :param segment: The segment of data to use to generate the Bloom Filter.
-        :returns: The Bloom Filter.
+        :param data: The list of EEG data feature vectors to use to generate template data.
+        :param row_wise: A boolean indicating whether to process the data row-wise or column-wise.
+        :returns: The averaged values of each segment.
         """
-        matrix = np.array(segment)
+        matrix = np.asarray(data)
         if matrix.ndim != 2:
             raise ValueError(f'Expected data segment to be a 2D array, got {matrix.ndim} dimensions.')
-        number_of_items = matrix.shape[1]
-        bloom_filter = rbloom.Bloom(number_of_items * 2, self._false_positive_rate, self._backend)
-        normalized_segment = matrix.mean(axis=0)
+        if not row_wise:
+            matrix = matrix.transpose()
+
+        return [
+            matrix[segment.start:segment.stop].mean(axis=0).astype(np.float32)
+            for segment in iter_ratio_slices(range(len(matrix)), self._segment_ratio)
+        ]
+
+    def create_template_data_from_hash_codes(self, hash_codes: typing.List[np.ndarray]) -> typing.List[rbloom.Bloom]:
+        """
+        Creates the Bloom Filters of a template from the hash codes of the averaged values of each segment, as computed
+        by the hash backend of the engine. The resulting filters are the same as the ones created from the original
+        data, but the (potentially expensive) hashing of the averaged values can be shared between templates which
+        only differ by their false positive rate or sizing policy.
+
+        :param hash_codes: The hash codes of the averaged values of each segment (see bloom_bits.hash_values).
+        :returns: The list of Bloom Filters to be used for a template.
+        """
+        return self._create_filters_from_hash_codes(hash_codes, len(hash_codes))
+
+    def create_multichannel_template_data(self,
+                                          data: np.ndarray,
+                                          row_wise=True) -> typing.List[typing.List[rbloom.Bloom]]:
+        """
+        Creates the data of a template per channel from multi-channel EEG feature data, in a single pass: the segment
+        averages of every channel are computed together, hashed at once, and the bit indexes of all the filters sharing
+        the same layout are generated together. The resulting filters are the same as the ones created from the data
+        of each channel.
+
+        :param data: The EEG feature data, as a 3D array of channels x feature vectors x features.
+        :param row_wise: A boolean indicating whether to process the data of each channel row-wise or column-wise.
+        :returns: The list of Bloom Filters of each channel.
+        """
+        segment_means = self.compute_multichannel_segment_means(data, row_wise)
+        hash_codes = bloom_bits.hash_values(self._backend, segment_means)
+        return self.create_multichannel_template_data_from_hash_codes(hash_codes)
+
+    def create_multichannel_template_data_from_hash_codes(
+            self, hash_codes: np.ndarray) -> typing.List[typing.List[rbloom.Bloom]]:
+        """
+        Creates the data of a template per channel from the hash codes of the segment averages of every channel (see
+        create_multichannel_template_data), so that the hash codes can be reused (e.g., for the signatures of the
+        templates).
+
+        :param hash_codes: The hash codes of the averaged values, as an array of channels x segments x values x 2.
+        :returns: The list of Bloom Filters of each channel.
+        """
+        number_of_channels, number_of_segments = hash_codes.shape[:2]
+        filters = self._create_filters_from_hash_codes(
+            list(hash_codes.reshape((-1,) + hash_codes.shape[2:])), number_of_segments
+        )
+        return [
+            filters[channel_idx * number_of_segments:(channel_idx + 1) * number_of_segments]
+            for channel_idx in range(number_of_channels)
+        ]
+
+    def compute_multichannel_segment_means(self, data: np.ndarray, row_wise=True) -> np.ndarray:
+        """
+        Computes the segment averages of every channel of multi-channel EEG feature data (see compute_segment_means).
+
+        :param data: The EEG feature data, as a 3D array of channels x feature vectors x features.
+        :param row_wise: A boolean indicating whether to process the data of each channel row-wise or column-wise.
+        :returns: The averaged values, as a 3D array of channels x segments x values.
+        """
+        tensor = np.asarray(data)
+        if tensor.ndim != 3:
+            raise ValueError(f'Expected multi-channel data to be a 3D array, got {tensor.ndim} dimensions.')
+        if not row_wise:
+            tensor = tensor.transpose((0, 2, 1))
+
+        return np.stack([
+            tensor[:, segment.start:segment.stop].mean(axis=1).astype(np.float32)
+            for segment in iter_ratio_slices(range(tensor.shape[1]), self._segment_ratio)
+        ], axis=1)
+
+    def _create_filters_from_hash_codes(self,
+                                        hash_codes: typing.List[np.ndarray],
+                                        number_of_filters: int) -> typing.List[rbloom.Bloom]:
+        """
+        Helper method which creates Bloom Filters from the hash codes of the items of each filter.
+
+        :param hash_codes: The hash codes of the items of each filter.
+        :param number_of_filters: The number of filters per template, used to size the filters.
+        :returns: The Bloom Filters.
+        """
+        filter_bits = []
+        filter_layouts: typing.Dict[typing.Tuple[int, int], typing.List[int]] = {}
+        for filter_idx, segment_codes in enumerate(hash_codes):
+            bloom_filter = self._sizing_policy.make_filter(
+                len(segment_codes), number_of_filters, self._false_positive_rate, self._backend, self._filter_type
+            )
+            number_of_hashes, bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+            filter_bits.append((number_of_hashes, bits.copy()))
+            filter_layouts.setdefault((number_of_hashes, bloom_filter.size_in_bits), []).append(filter_idx)
 
-        for item in normalized_segment:
-            bloom_filter.add(item)
+        # Indexes are generated once for all filters sharing the same layout, as the cost is mostly fixed overhead
+        # for the few items of a single segment.
+        for (number_of_hashes, size_in_bits), filter_indexes in filter_layouts.items():
+            layout_codes = np.concatenate([hash_codes[filter_idx] for filter_idx in filter_indexes])
+            layout_indexes = bloom_bits.generate_filter_indexes(
+                self._filter_type, layout_codes, number_of_hashes, size_in_bits
+            )
+            split_points = np.cumsum([len(hash_codes[filter_idx]) for filter_idx in filter_indexes])[:-1]
+            for filter_idx, indexes in zip(filter_indexes, np.split(layout_indexes, split_points)):
+                bloom_bits.set_indexes(filter_bits[filter_idx][1], indexes)
 
-        return bloom_filter
+        return [
+            self._filter_class.load_bytes(bloom_bits.join_filter_bytes(number_of_hashes, bits), self._backend)
+            for number_of_hashes, bits in filter_bits
+        ]
@@ -0,0 +1,435 @@
+import concurrent.futures
+import dataclasses
+import statistics
+import typing
+import numpy as np
+
+from . import base, backend, comparison
+from .utils import bloom_bits
+from .utils.logging_helpers import get_logger
+
+
+_logger = get_logger()
+# Upper bound on the number of filter bytes gathered at once while scoring, to bound peak memory use.
+_MAX_GATHERED_BYTES = 2**24
+
+
+@dataclasses.dataclass
+class _FilterStack:
+    """
+    Internal container for the bit arrays of the filters at the same position in a group of templates.
+    """
+    backend_identity: str
+    filter_type: str
+    number_of_hashes: int
+    size_in_bits: int
+    bits: np.ndarray
+
+
+@dataclasses.dataclass
+class _TemplateGroup:
+    """
+    Internal container for a group of templates sharing the same layout (i.e., segment ratio, orientation, filter
+    types, sizes and hash backends), which can be scored together.
+    """
+    template_indexes: np.ndarray
+    segment_ratio: float
+    row_wise: bool
+    filters: typing.List[_FilterStack]
+
+
+class TemplateGallery:
+    """
+    Collection of EEG templates which can be scored against EEG feature data all at once. Each probe is hashed only
+    once per hash backend, and the resulting Bloom Filter bit indexes are checked against the filters of every
+    template using vectorized operations, rather than through a membership test per element and template.
+
+    Templates using Bloom Filters without a registered hash backend cannot be scored this way, and fall back to using
+    the EEG template data checker.
+    """
+    def __init__(self, templates: typing.Sequence[base.BaseEEGTemplateData]):
+        self._number_of_templates = len(templates)
+        self._backends: typing.Dict[str, backend.BaseBloomFilterHashBackend] = {}
+        self._groups: typing.List[_TemplateGroup] = []
+        self._fallback_templates: typing.List[typing.Tuple[int, base.BaseEEGTemplateData]] = []
+        grouped_filters = {}
+
+        for template_idx, template in enumerate(templates):
+            layout = self._get_template_layout(template)
+            if layout is None:
+                self._fallback_templates.append((template_idx, template))
+                continue
+            layout_key, filter_bits = layout
+            template_indexes, filter_bit_lists = grouped_filters.setdefault(
+                layout_key, ([], [[] for _ in filter_bits])
+            )
+            template_indexes.append(template_idx)
+            for bit_list, bits in zip(filter_bit_lists, filter_bits):
+                bit_list.append(bits)
+
+        for layout_key, (template_indexes, filter_bit_lists) in grouped_filters.items():
+            segment_ratio, row_wise, filter_layouts = layout_key
+            filters = [
+                _FilterStack(
+                    backend_identity=identity,
+                    filter_type=filter_type,
+                    number_of_hashes=number_of_hashes,
+                    size_in_bits=size_in_bits,
+                    bits=np.stack(bit_list)
+                )
+                for (identity, filter_type, number_of_hashes, size_in_bits), bit_list
+                in zip(filter_layouts, filter_bit_lists)
+            ]
+            self._groups.append(_TemplateGroup(
+                template_indexes=np.array(template_indexes, dtype=np.intp),
+                segment_ratio=segment_ratio,
+                row_wise=row_wise,
+                filters=filters
+            ))
+
+    def __len__(self) -> int:
+        return self._number_of_templates
+
+    @property
+    def is_vectorized(self) -> bool:
+        """
+        Flag indicating whether every template in the gallery can be scored using vectorized operations.
+
+        :returns: True if no template falls back to the EEG template data checker.
+        """
+        return not self._fallback_templates
+
+    def compare(self,
+                eeg_data: typing.Union[typing.List[np.ndarray], comparison.PreparedProbe]
+                ) -> typing.List[comparison.ComparisonResult]:
+        """
+        Compares every template in the gallery against the given EEG feature data.
+
+        :param eeg_data: The EEG feature data vectors to compare the templates against, or a probe prepared from them.
+                         Hash codes cached by a prepared probe are reused, and new ones are added to it.
+        :returns: The comparison result for each template, in the order the templates were given.
+        """
+        probe = eeg_data
+        if not isinstance(probe, comparison.PreparedProbe):
+            probe = comparison.PreparedProbe(eeg_data)
+        results = [None] * self._number_of_templates
+        for template_idx, template in self._fallback_templates:
+            results[template_idx] = comparison.EEGTemplateDataChecker(template).check(probe)
+        if not self._groups:
+            return results
+
+        if not probe.is_valid:
+            _logger.warning('EEG data passed to template gallery was not 2D matrix.')
+            for group in self._groups:
+                for template_idx in group.template_indexes:
+                    results[template_idx] = comparison.ComparisonResult(hits=0, elements_total=0)
+            return results
+
+        for group in self._groups:
+            group_hits = self._count_group_hits(group, probe)
+            for template_idx, hits in zip(group.template_indexes, group_hits):
+                results[template_idx] = comparison.ComparisonResult(
+                    elements_total=probe.elements_total, hits=int(hits)
+                )
+        return results
+
+    def score(self, eeg_data: typing.Union[typing.List[np.ndarray], comparison.PreparedProbe]) -> np.ndarray:
+        """
+        Scores every template in the gallery against the given EEG feature data, using the hit ratio of each
+        comparison. Data which cannot be compared is given a score of 0.
+
+        :param eeg_data: The EEG feature data vectors to score the templates against, or a probe prepared from them.
+        :returns: An array holding the score of each template.
+        """
+        return np.array([
+            result.hit_ratio if result.elements_total else 0.0
+            for result in self.compare(eeg_data)
+        ], dtype=np.float64)
+
+    def score_matrix(self, probes: typing.Sequence[typing.List[np.ndarray]]) -> np.ndarray:
+        """
+        Scores every template in the gallery against each of the given probes.
+
+        :param probes: The probes (i.e., matrices of EEG feature data, or prepared probes) to score the templates
+                       against.
+        :returns: A matrix of scores, with a row per template and a column per probe.
+        """
+        scores = np.zeros((self._number_of_templates, len(probes)), dtype=np.float64)
+        for probe_idx, probe in enumerate(probes):
+            scores[:, probe_idx] = self.score(probe)
+        return scores
+
+    def _count_group_hits(self, group: _TemplateGroup, probe: comparison.PreparedProbe) -> np.ndarray:
+        """
+        Helper method which counts the number of matching elements for each template in the given group.
+
+        :param group: The group of templates.
+        :param probe: The prepared probe.
+        :returns: The number of matching elements for each template of the group.
+        """
+        hits = np.zeros(len(group.template_indexes), dtype=np.int64)
+        max_filter_idx = len(group.filters) - 1
+
+        for filter_idx, segment in enumerate(probe.get_segments(group.segment_ratio, group.row_wise)):
+            filter_stack = group.filters[min(filter_idx, max_filter_idx)]
+            indexes = probe.get_indexes(
+                self._backends[filter_stack.backend_identity],
+                filter_stack.number_of_hashes,
+                filter_stack.size_in_bits,
+                group.row_wise,
+                filter_stack.filter_type
+            )
+            segment_indexes = indexes[segment.start:segment.stop].reshape(-1, filter_stack.number_of_hashes)
+            chunk_size = max(1, _MAX_GATHERED_BYTES // (len(hits) * max(1, filter_stack.number_of_hashes)))
+            for chunk_start in range(0, len(segment_indexes), chunk_size):
+                chunk_indexes = segment_indexes[chunk_start:chunk_start + chunk_size]
+                hits += bloom_bits.contains_indexes(filter_stack.bits, chunk_indexes).sum(axis=-1)
+        return hits
+
+    def _get_template_layout(self, template: base.BaseEEGTemplateData) -> typing.Optional[tuple]:
+        """
+        Helper method which determines the layout of the given template, used to group templates which can be scored
+        together, along with the bit arrays of its filters.
+
+        :param template: The template.
+        :returns: The layout of the template and the bit arrays of its filters, or None if the template cannot be
+                  scored using vectorized operations.
+        """
+        if not template.bloom_filters:
+            return None
+        filter_layouts = []
+        filter_bits = []
+        for bloom_filter in template.bloom_filters:
+            hash_backend = bloom_filter.hash_func
+            if not isinstance(hash_backend, backend.BaseBloomFilterHashBackend):
+                return None
+            number_of_hashes, bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+            identity = hash_backend.identity
+            self._backends.setdefault(identity, hash_backend)
+            filter_type = bloom_bits.get_filter_type(bloom_filter)
+            filter_layouts.append((identity, filter_type, number_of_hashes, bloom_filter.size_in_bits))
+            filter_bits.append(bits)
+        layout_key = (template.segment_ratio, template.row_wise, tuple(filter_layouts))
+        return layout_key, filter_bits
+
+
+@dataclasses.dataclass
+class ErrorRateCurve:
+    """
+    Container for the false accept and false reject rates of a verification system, over a range of decision
+    thresholds. A probe is accepted when its score is greater than or equal to the threshold.
+    """
+    thresholds: np.ndarray
+    false_accept_rates: np.ndarray
+    false_reject_rates: np.ndarray
+
+    @property
+    def true_accept_rates(self) -> np.ndarray:
+        """
+        Calculates the true accept rate at each threshold (i.e., the complement of the false reject rate).
+
+        :returns: The true accept rates.
+        """
+        return 1 - self.false_reject_rates
+
+    @property
+    def roc_curve(self) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """
+        Retrieves the receiver operating characteristic (ROC) curve, as false accept rates and true accept rates.
+
+        :returns: The false accept rates and true accept rates.
+        """
+        return self.false_accept_rates, self.true_accept_rates
+
+    @property
+    def det_curve(self) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """
+        Retrieves the detection error tradeoff (DET) curve, as the normal deviates of the false accept rates and false
+        reject rates. Rates of exactly 0 or 1 are clipped slightly, in order to remain finite.
+
+        :returns: The normal deviates of the false accept rates and false reject rates.
+        """
+        normal = statistics.NormalDist()
+        epsilon = 1e-6
+
+        def to_deviates(rates: np.ndarray) -> np.ndarray:
+            clipped_rates = np.clip(rates, epsilon, 1 - epsilon)
+            return np.array([normal.inv_cdf(rate) for rate in clipped_rates], dtype=np.float64)
+
+        return to_deviates(self.false_accept_rates), to_deviates(self.false_reject_rates)
+
+    @property
+    def equal_error_rate(self) -> float:
+        """
+        Calculates the equal error rate (EER), i.e., the rate at which the false accept rate and false reject rate are
+        equal. The rate is linearly interpolated between the two thresholds where the rates cross.
+
+        :returns: The equal error rate.
+        """
+        differences = self.false_accept_rates - self.false_reject_rates
+        crossings = np.flatnonzero((differences[:-1] >= 0) & (differences[1:] <= 0))
+        if len(crossings) == 0:
+            return float(np.min(np.maximum(self.false_accept_rates, self.false_reject_rates)))
+        idx = crossings[0]
+        if differences[idx] == differences[idx + 1]:
+            return float(self.false_accept_rates[idx])
+        interpolation = differences[idx] / (differences[idx] - differences[idx + 1])
+        start = self.false_accept_rates[idx]
+        end = self.false_accept_rates[idx + 1]
+        return float(start + interpolation * (end - start))
+
+    @property
+    def equal_error_threshold(self) -> float:
+        """
+        Retrieves the threshold at which the false accept rate and false reject rate are closest to each other.
+
+        :returns: The threshold.
+        """
+        differences = np.abs(self.false_accept_rates - self.false_reject_rates)
+        return float(self.thresholds[np.argmin(differences)])
+
+
+@dataclasses.dataclass
+class EvaluationResult:
+    """
+    Container for the results of evaluating a set of templates against a set of probes.
+    """
+    score_matrix: np.ndarray
+    template_labels: typing.List[typing.Hashable]
+    probe_labels: typing.List[typing.Hashable]
+    error_rates: ErrorRateCurve
+
+    @property
+    def equal_error_rate(self) -> float:
+        """
+        Retrieves the equal error rate of the evaluation.
+
+        :returns: The equal error rate.
+        """
+        return self.error_rates.equal_error_rate
+
+
+def compute_error_rates(genuine_scores: np.ndarray, impostor_scores: np.ndarray) -> ErrorRateCurve:
+    """
+    Calculates the false accept and false reject rates at every distinct score threshold, given the scores of genuine
+    comparisons (template and probe from the same subject) and impostor comparisons (from different subjects).
+
+    :param genuine_scores: The scores of genuine comparisons.
+    :param impostor_scores: The scores of impostor comparisons.
+    :returns: The error rate curve.
+    """
+    genuine_scores = np.sort(np.asarray(genuine_scores, dtype=np.float64).reshape(-1))
+    impostor_scores = np.sort(np.asarray(impostor_scores, dtype=np.float64).reshape(-1))
+    if len(genuine_scores) == 0 or len(impostor_scores) == 0:
+        raise ValueError('Both genuine and impostor scores are required to compute error rates.')
+    thresholds = np.append(np.unique(np.concatenate((genuine_scores, impostor_scores))), np.inf)
+    false_accepts = len(impostor_scores) - np.searchsorted(impostor_scores, thresholds, side='left')
+    false_rejects = np.searchsorted(genuine_scores, thresholds, side='left')
+    return ErrorRateCurve(
+        thresholds=thresholds,
+        false_accept_rates=false_accepts / len(impostor_scores),
+        false_reject_rates=false_rejects / len(genuine_scores)
+    )
+
+
+def split_scores(score_matrix: np.ndarray,
+                 template_labels: typing.Sequence[typing.Hashable],
+                 probe_labels: typing.Sequence[typing.Hashable]) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Splits a score matrix into genuine and impostor scores, based on the subject labels of the templates and probes.
+
+    :param score_matrix: The score matrix, with a row per template and a column per probe.
+    :param template_labels: The subject label of each template.
+    :param probe_labels: The subject label of each probe.
+    :returns: The genuine scores and the impostor scores.
+    """
+    if score_matrix.shape != (len(template_labels), len(probe_labels)):
+        raise ValueError(
+            f'Expected score matrix of shape {(len(template_labels), len(probe_labels))}, got {score_matrix.shape}.'
+        )
+    label_codes = {}
+    template_codes = np.array([label_codes.setdefault(label, len(label_codes)) for label in template_labels])
+    probe_codes = np.array([label_codes.setdefault(label, len(label_codes)) for label in probe_labels])
+    genuine_mask = template_codes.reshape(-1, 1) == probe_codes.reshape(1, -1)
+    return score_matrix[genuine_mask], score_matrix[~genuine_mask]
+
+
+def compute_score_matrix(templates: typing.Sequence[base.BaseEEGTemplateData],
+                         probes: typing.Sequence[typing.List[np.ndarray]],
+                         processes: typing.Optional[int] = None,
+                         chunk_size: typing.Optional[int] = None) -> np.ndarray:
+    """
+    Scores every template against every probe. Optionally, the probes can be sharded across a pool of worker
+    processes, each of which receives the template gallery once.
+
+    :param templates: The templates to score.
+    :param probes: The probes (i.e., matrices of EEG feature data) to score the templates against.
+    :param processes: The number of worker processes to use. By default, the scores are computed in this process.
+    :param chunk_size: The number of probes sent to a worker process at once. By default, the probes are split evenly
+                       among the processes.
+    :returns: A matrix of scores, with a row per template and a column per probe.
+    """
+    gallery = TemplateGallery(templates)
+    if processes is None or processes <= 1 or len(probes) <= 1:
+        return gallery.score_matrix(probes)
+    if not gallery.is_vectorized:
+        raise ValueError('Scoring across processes requires every template to use a registered hash backend.')
+    if chunk_size is None:
+        chunk_size = -(-len(probes) // processes)
+    chunks = [probes[i:i + chunk_size] for i in range(0, len(probes), chunk_size)]
+    with concurrent.futures.ProcessPoolExecutor(processes, initializer=_initialize_worker, initargs=(gallery,)) as pool:
+        columns = list(pool.map(_score_probe_chunk, chunks))
+    return np.concatenate(columns, axis=1)
+
+
+def evaluate(templates: typing.Sequence[base.BaseEEGTemplateData],
+             template_labels: typing.Sequence[typing.Hashable],
+             probes: typing.Sequence[typing.List[np.ndarray]],
+             probe_labels: typing.Sequence[typing.Hashable],
+             processes: typing.Optional[int] = None) -> EvaluationResult:
+    """
+    Evaluates a set of enrolled templates against a set of probe sessions, computing the full score matrix and the
+    resulting error rates (FAR, FRR, EER).
+
+    :param templates: The enrolled templates.
+    :param template_labels: The subject label of each template.
+    :param probes: The probe sessions (i.e., matrices of EEG feature data).
+    :param probe_labels: The subject label of each probe.
+    :param processes: The number of worker processes to use when computing the score matrix.
+    :returns: The evaluation result.
+    """
+    if len(templates) != len(template_labels):
+        raise ValueError(f'Expected {len(templates)} template labels, got {len(template_labels)}.')
+    if len(probes) != len(probe_labels):
+        raise ValueError(f'Expected {len(probes)} probe labels, got {len(probe_labels)}.')
+    scores = compute_score_matrix(templates, probes, processes=processes)
+    genuine_scores, impostor_scores = split_scores(scores, template_labels, probe_labels)
+    return EvaluationResult(
+        score_matrix=scores,
+        template_labels=list(template_labels),
+        probe_labels=list(probe_labels),
+        error_rates=compute_error_rates(genuine_scores, impostor_scores)
+    )
+
+
+_worker_gallery: typing.Optional[TemplateGallery] = None
+
+
+def _initialize_worker(gallery: TemplateGallery):
+    """
+    Initializes a worker process with the template gallery to score probes against.
+
+    :param gallery: The template gallery.
+    """
+    global _worker_gallery
+    _worker_gallery = gallery
+
+
+def _score_probe_chunk(probes: typing.Sequence[typing.List[np.ndarray]]) -> np.ndarray:
+    """
+    Scores the template gallery of the worker process against a chunk of probes.
+
+    :param probes: The chunk of probes.
+    :returns: The score matrix of the chunk.
+    """
+    return _worker_gallery.score_matrix(probes)
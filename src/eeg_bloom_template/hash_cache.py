@@ -0,0 +1,253 @@
+import dataclasses
+import hashlib
+import hmac
+import os
+import tempfile
+import threading
+import typing
+import numpy as np
+
+from . import backend
+from .utils import bloom_bits
+
+
+@dataclasses.dataclass
+class HashCodeCacheStatistics:
+    """
+    Simple container for hash code cache metrics.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Calculates the ratio of lookups which were served from the cache.
+
+        :returns: The hit ratio, or 0 if there have not been any lookups.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+
+class HashCodeDiskCache:
+    """
+    Persistent, on-disk cache of the hash codes of arrays of feature values (as computed by bloom_bits.hash_values),
+    so that recordings which are hashed again and again (e.g., when re-enrolling templates or re-running evaluations)
+    are only hashed once. Each array of hash codes is stored as a .npy file, keyed by the digest of the hashed values
+    (as 32-bit floats, along with their shape) and the identity of the hash backend (i.e., its implementation, seed,
+    token fingerprint, etc.), and is memory-mapped when read back. The digest is an HMAC keyed with a random secret
+    stored in the cache directory, so file names do not reveal anything about the backend (e.g., its token), short of
+    reading the secret.
+
+    The cache can be bounded by the total size of its files, in which case the least recently used files are evicted
+    once the cache may exceed its maximum size. The size of the cache is tracked by adding the size of every file
+    written to the size found by the last scan of the directory, which is only scanned again (to evict files) when the
+    tracked size exceeds the maximum. Files are written atomically, so the same directory can be shared by several
+    processes (e.g., the workers of a process pool), although files written by other processes are only accounted for
+    by the next scan (i.e., each process may grow the cache by up to its maximum size between scans). Hits are recorded
+    by touching the modification time of the files, which is used as the recency of each file.
+    """
+    FILE_PREFIX = 'hash-codes-v2'
+    FILE_EXTENSION = '.npy'
+    KEY_FILE_NAME = '.hash-codes-key'
+    KEY_SIZE = 32
+
+    def __init__(self, directory: typing.Union[str, os.PathLike], max_bytes: typing.Optional[int] = None):
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError(f'Maximum cache size must be greater than 0 (got {max_bytes}).')
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._key = self._load_key()
+        self._statistics = HashCodeCacheStatistics()
+        self._lock = threading.Lock()
+        self._tracked_bytes = 0
+        if max_bytes is not None:
+            self._tracked_bytes = self.current_bytes
+
+    def __getstate__(self) -> dict:
+        # Locks cannot be pickled, and the metrics of a copy of the cache (e.g., in a worker process) start over.
+        return {'directory': self.directory, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state: dict):
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return len(self._list_files())
+
+    @property
+    def current_bytes(self) -> int:
+        """
+        Retrieves the total size of the files of the cache.
+
+        :returns: The number of bytes.
+        """
+        return sum(size for _, size, _ in self._list_files())
+
+    @property
+    def statistics(self) -> HashCodeCacheStatistics:
+        """
+        Retrieves a snapshot of the cache metrics (of the current process).
+
+        :returns: The cache metrics.
+        """
+        with self._lock:
+            return dataclasses.replace(self._statistics)
+
+    def get_hash_codes(self, hash_backend: backend.BaseBloomFilterHashBackend, values: np.ndarray) -> np.ndarray:
+        """
+        Retrieves the hash codes of the given values, computed using the given hash backend. On a miss, the values are
+        hashed, and their hash codes are stored in the cache.
+
+        :param hash_backend: The hash backend.
+        :param values: The array of values to hash.
+        :returns: An array with the shape of the values, plus a trailing dimension of 2 holding the hash codes. Hash
+                  codes read from the cache are memory-mapped, and read-only.
+        """
+        float_values = np.ascontiguousarray(values, dtype=np.float32)
+        if not float_values.size:
+            # Empty arrays cannot be memory-mapped, and are not worth caching.
+            return bloom_bits.hash_values(hash_backend, float_values)
+        path = os.path.join(self.directory, self.get_file_name(hash_backend, float_values))
+        try:
+            hash_codes = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # Missing files, as well as files which were evicted or truncated while being read, are hashed again.
+            hash_codes = None
+        if hash_codes is not None and hash_codes.shape == float_values.shape + (2,):
+            with self._lock:
+                self._statistics.hits += 1
+            return hash_codes
+
+        with self._lock:
+            self._statistics.misses += 1
+        hash_codes = bloom_bits.hash_values(hash_backend, float_values)
+        written_bytes = self._write(path, hash_codes)
+        with self._lock:
+            self._tracked_bytes += written_bytes
+            over_limit = self.max_bytes is not None and self._tracked_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+        return hash_codes
+
+    def clear(self):
+        """
+        Removes every file of the cache.
+        """
+        for path, _, _ in self._list_files():
+            self._remove(path)
+        with self._lock:
+            self._tracked_bytes = 0
+
+    def get_file_name(self, hash_backend: backend.BaseBloomFilterHashBackend, values: np.ndarray) -> str:
+        """
+        Calculates the name of the file storing the hash codes of the given values.
+
+        :param hash_backend: The hash backend used to hash the values.
+        :param values: The values, as a contiguous array of 32-bit floats.
+        :returns: The file name.
+        """
+        digest = hmac.new(self._key, hash_backend.identity.encode('utf-8'), hashlib.sha256)
+        digest.update(repr(values.shape).encode('utf-8'))
+        digest.update(values.tobytes())
+        return f'{self.FILE_PREFIX}-{digest.hexdigest()}{self.FILE_EXTENSION}'
+
+    def _load_key(self) -> bytes:
+        """
+        Helper method which reads the secret key of the cache directory, creating it if it does not exist. The key is
+        written to a temporary file which is then linked into place, so processes sharing the directory all end up
+        with the key of whichever process created it first.
+
+        :returns: The key.
+        """
+        path = os.path.join(self.directory, self.KEY_FILE_NAME)
+        try:
+            with open(path, 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            pass
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                file.write(os.urandom(self.KEY_SIZE))
+            os.link(temporary_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            self._remove(temporary_path)
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def _write(self, path: str, hash_codes: np.ndarray) -> int:
+        """
+        Helper method which atomically writes hash codes to the given path, through a temporary file.
+
+        :param path: The path of the file.
+        :param hash_codes: The hash codes.
+        :returns: The size of the file.
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                np.save(file, hash_codes)
+                written_bytes = file.tell()
+            os.replace(temporary_path, path)
+            return written_bytes
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+
+    def _evict(self):
+        """
+        Helper method which scans the cache directory, and evicts the least recently used files until the cache is
+        within its maximum size. The size of the remaining files becomes the tracked size of the cache.
+        """
+        files = self._list_files()
+        current_bytes = sum(size for _, size, _ in files)
+        for path, size, _ in sorted(files, key=lambda file: file[2]):
+            if current_bytes <= self.max_bytes:
+                break
+            if self._remove(path):
+                current_bytes -= size
+                with self._lock:
+                    self._statistics.evictions += 1
+        with self._lock:
+            self._tracked_bytes = current_bytes
+
+    def _list_files(self) -> typing.List[typing.Tuple[str, int, float]]:
+        """
+        Helper method which lists the files of the cache.
+
+        :returns: The path, size and modification time of each file.
+        """
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not (entry.name.startswith(self.FILE_PREFIX) and entry.name.endswith(self.FILE_EXTENSION)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        """
+        Helper method which removes a file, if it can be removed (e.g., it was not removed by another process, and is
+        not memory-mapped on a platform which prevents it).
+
+        :param path: The path of the file.
+        :returns: A flag indicating whether the file was removed.
+        """
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
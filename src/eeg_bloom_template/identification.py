@@ -0,0 +1,514 @@
+import abc
+import concurrent.futures
+import dataclasses
+import heapq
+import pickle
+import typing
+import numpy as np
+
+from . import backend, base, comparison, evaluation, signature, template
+from .utils.logging_helpers import get_logger
+
+
+_logger = get_logger()
+
+
+@dataclasses.dataclass
+class IdentificationMatch:
+    """
+    Simple container for a candidate returned by an identification search.
+    """
+    template_id: typing.Hashable
+    result: comparison.ComparisonResult
+
+    @property
+    def score(self) -> float:
+        """
+        Retrieves the score of the candidate, i.e., the hit ratio of its comparison result.
+
+        :returns: The score.
+        """
+        return self.result.hit_ratio
+
+
+class TemplateShard:
+    """
+    A subset of the enrolled templates, which is searched as a unit. Templates are received pickled (so that shards can
+    live in other processes), which keeps the parameters of their hash backends (e.g., a seed or token), unlike
+    serialized templates. As pickled data can run arbitrary code when loaded, it must only come from the service
+    owning the shard. Templates are scored together using a template gallery, which produces the same comparison
+    results as the EEG template data checker.
+    """
+    def __init__(self):
+        self._templates: typing.Dict[typing.Hashable, template.EEGTemplate] = {}
+        self._gallery: typing.Optional[evaluation.TemplateGallery] = None
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def add_templates(self, pickled_templates: typing.Mapping[typing.Hashable, bytes]):
+        """
+        Adds (or replaces) templates in the shard.
+
+        :param pickled_templates: The pickled templates to add, keyed by template ID.
+        """
+        for template_id, pickled in pickled_templates.items():
+            self._templates[template_id] = pickle.loads(pickled)
+        self._gallery = None
+
+    def remove_templates(self, template_ids: typing.Iterable[typing.Hashable]):
+        """
+        Removes templates from the shard. Unknown template IDs are ignored.
+
+        :param template_ids: The IDs of the templates to remove.
+        """
+        for template_id in template_ids:
+            self._templates.pop(template_id, None)
+        self._gallery = None
+
+    def search(self, eeg_data: np.ndarray, top_k: int) -> typing.List[IdentificationMatch]:
+        """
+        Compares every template of the shard against the given EEG feature data, keeping the best candidates.
+
+        :param eeg_data: The EEG feature data matrix to search for.
+        :param top_k: The maximum number of candidates to return.
+        :returns: The best candidates of the shard, best first.
+        """
+        if not self._templates:
+            return []
+        if self._gallery is None:
+            self._gallery = evaluation.TemplateGallery(list(self._templates.values()))
+        results = self._gallery.compare(eeg_data)
+        matches = [
+            IdentificationMatch(template_id=template_id, result=result)
+            for template_id, result in zip(self._templates, results)
+        ]
+        return heapq.nlargest(top_k, matches, key=lambda match: match.score)
+
+
+class SignatureIndex:
+    """
+    Coarse index over the signatures of enrolled templates (see signature.compute_signature), which cheaply shortlists
+    the likely candidates of a 1:N search, so that only the shortlist is compared against the probe. The values of
+    every signature are kept in a single sorted array per hash backend, so that a probe is matched against every
+    signature through one lookup per distinct value of the probe, rather than through a comparison per template.
+
+    The score of a template is the fraction of its signature found among the values of the probe, i.e., an estimate of
+    the fraction of the template values found in the probe. Pruning is tuned through the maximum number of candidates
+    and the minimum score of a candidate: the fewer candidates, the faster the search, but the more likely a matching
+    template is pruned. Templates without a signature cannot be scored, and are always part of the shortlist, so
+    templates to be indexed should be enrolled with a signature (see the signature_size of EEGTemplate.make_template).
+    """
+    def __init__(self, templates: typing.Mapping[typing.Hashable, base.BaseEEGTemplateData]):
+        self._template_ids = list(templates)
+        self._templates = list(templates.values())
+        self._signature_sizes = np.zeros(len(self._templates), dtype=np.int64)
+        self._backends: typing.Dict[str, backend.BaseBloomFilterHashBackend] = {}
+        self._signature_values: typing.Dict[str, np.ndarray] = {}
+        self._signature_owners: typing.Dict[str, np.ndarray] = {}
+        unscored_indexes = []
+        grouped_signatures: typing.Dict[str, typing.List[typing.Tuple[int, np.ndarray]]] = {}
+
+        for template_idx, indexed_template in enumerate(self._templates):
+            hash_backend = self._get_template_backend(indexed_template)
+            if hash_backend is None or indexed_template.signature is None or not len(indexed_template.signature):
+                unscored_indexes.append(template_idx)
+                continue
+            self._backends.setdefault(hash_backend.identity, hash_backend)
+            grouped_signatures.setdefault(hash_backend.identity, []).append((template_idx, indexed_template.signature))
+            self._signature_sizes[template_idx] = len(indexed_template.signature)
+        self._unscored_indexes = np.array(unscored_indexes, dtype=np.int64)
+
+        for identity, signatures in grouped_signatures.items():
+            values = np.concatenate([template_signature for _, template_signature in signatures])
+            owners = np.repeat(
+                [template_idx for template_idx, _ in signatures],
+                [len(template_signature) for _, template_signature in signatures]
+            )
+            order = np.argsort(values, kind='stable')
+            self._signature_values[identity] = values[order]
+            self._signature_owners[identity] = owners[order]
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def score(self, probe: comparison.PreparedProbe) -> np.ndarray:
+        """
+        Estimates the fraction of the values of each template found in the given probe.
+
+        :param probe: The prepared probe. The hash codes of the probe are cached, and reused by later comparisons.
+        :returns: The estimated score of each template, in index order. Templates without a signature get a score of
+                  NaN.
+        """
+        matches = np.zeros(len(self._templates), dtype=np.int64)
+        for identity, hash_backend in self._backends.items():
+            probe_values = signature.hash_codes_to_signature_values(probe.get_hash_codes(hash_backend))
+            signature_values = self._signature_values[identity]
+            starts = np.searchsorted(signature_values, probe_values, side='left')
+            lengths = np.searchsorted(signature_values, probe_values, side='right') - starts
+            # Gathers the positions of every signature value found in the probe, range by range.
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            positions = np.repeat(starts, lengths) + offsets
+            matches += np.bincount(self._signature_owners[identity][positions], minlength=len(self._templates))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = matches / self._signature_sizes
+        scores[self._unscored_indexes] = np.nan
+        return scores
+
+    def shortlist(self,
+                  probe: comparison.PreparedProbe,
+                  max_candidates: typing.Optional[int] = None,
+                  min_score: float = 0.0) -> typing.List[typing.Hashable]:
+        """
+        Shortlists the templates most likely to match the given probe.
+
+        :param probe: The prepared probe.
+        :param max_candidates: The maximum number of scored templates in the shortlist (by default, no maximum).
+        :param min_score: The score a template must exceed to be part of the shortlist. By default, templates are only
+                          pruned when none of their signature is found in the probe.
+        :returns: The IDs of the shortlisted templates, by decreasing score, followed by the templates without a
+                  signature.
+        """
+        if max_candidates is not None and max_candidates < 0:
+            raise ValueError(f'Maximum number of candidates must be at least 0 (got {max_candidates}).')
+        scores = self.score(probe)
+        candidates = np.flatnonzero(scores > min_score)
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')][:max_candidates]
+        shortlisted_indexes = np.concatenate([candidates, self._unscored_indexes])
+        return [self._template_ids[template_idx] for template_idx in shortlisted_indexes]
+
+    def search(self,
+               eeg_data: typing.List[np.ndarray],
+               top_k: int = 1,
+               max_candidates: typing.Optional[int] = None,
+               min_score: float = 0.0) -> typing.List[IdentificationMatch]:
+        """
+        Searches for the templates best matching the given EEG feature data: templates are shortlisted using their
+        signatures, and only the shortlisted templates are compared against the data, using the EEG template data
+        checker.
+
+        :param eeg_data: The EEG feature data vectors to search for.
+        :param top_k: The maximum number of candidates to return.
+        :param max_candidates: The maximum number of scored templates to compare (see shortlist).
+        :param min_score: The score a template must exceed to be compared (see shortlist).
+        :returns: The best candidates among the shortlist, best first.
+        """
+        if top_k < 1:
+            raise ValueError(f'Number of candidates must be at least 1 (got {top_k}).')
+        probe = comparison.PreparedProbe(eeg_data)
+        if not probe.is_valid:
+            _logger.warning('EEG data passed to signature index was not 2D matrix.')
+            return []
+        templates = dict(zip(self._template_ids, self._templates))
+        matches = [
+            IdentificationMatch(
+                template_id=template_id, result=comparison.EEGTemplateDataChecker(templates[template_id]).check(probe)
+            )
+            for template_id in self.shortlist(probe, max_candidates, min_score)
+        ]
+        return heapq.nlargest(top_k, matches, key=lambda match: match.score)
+
+    @staticmethod
+    def _get_template_backend(
+            indexed_template: base.BaseEEGTemplateData) -> typing.Optional[backend.BaseBloomFilterHashBackend]:
+        """
+        Helper method which retrieves the hash backend the signature of a template was computed with, i.e., the
+        backend shared by its Bloom Filters.
+
+        :param indexed_template: The template.
+        :returns: The hash backend, or None if the filters of the template do not share a registered hash backend.
+        """
+        hash_functions = [bloom_filter.hash_func for bloom_filter in indexed_template.bloom_filters]
+        if not hash_functions or not all(
+                isinstance(hash_function, backend.BaseBloomFilterHashBackend) for hash_function in hash_functions):
+            return None
+        if len({hash_function.identity for hash_function in hash_functions}) > 1:
+            return None
+        return hash_functions[0]
+
+
+class BaseShardTransport(abc.ABC):
+    """
+    Abstract base class defining the interface used by the sharded identification service to reach its shards, e.g.
+    shards living in local worker processes or on other nodes.
+    """
+    @property
+    @abc.abstractmethod
+    def number_of_shards(self) -> int:
+        """
+        Retrieves the number of shards reachable through the transport.
+
+        :returns: The number of shards.
+        """
+        pass
+
+    @abc.abstractmethod
+    def add_templates(self, shard_idx: int, pickled_templates: typing.Mapping[typing.Hashable, bytes]):
+        """
+        Adds templates to the given shard.
+
+        :param shard_idx: The index of the shard.
+        :param pickled_templates: The pickled templates to add, keyed by template ID.
+        """
+        pass
+
+    @abc.abstractmethod
+    def remove_templates(self, shard_idx: int, template_ids: typing.Sequence[typing.Hashable]):
+        """
+        Removes templates from the given shard.
+
+        :param shard_idx: The index of the shard.
+        :param template_ids: The IDs of the templates to remove.
+        """
+        pass
+
+    @abc.abstractmethod
+    def search(self, eeg_data: np.ndarray, top_k: int) -> typing.List[typing.List[IdentificationMatch]]:
+        """
+        Broadcasts a search to every shard, and gathers their candidates.
+
+        :param eeg_data: The EEG feature data matrix to search for.
+        :param top_k: The maximum number of candidates to return per shard.
+        :returns: The candidates of each shard, best first.
+        """
+        pass
+
+    def close(self):
+        """
+        Releases the resources used by the transport.
+        """
+        pass
+
+
+class InProcessShardTransport(BaseShardTransport):
+    """
+    Transport keeping every shard in the current process, mostly useful for testing and small galleries.
+    """
+    def __init__(self, number_of_shards: int):
+        if number_of_shards < 1:
+            raise ValueError(f'Number of shards must be at least 1 (got {number_of_shards}).')
+        self._shards = [TemplateShard() for _ in range(number_of_shards)]
+
+    @property
+    def number_of_shards(self) -> int:
+        return len(self._shards)
+
+    def add_templates(self, shard_idx: int, pickled_templates: typing.Mapping[typing.Hashable, bytes]):
+        self._shards[shard_idx].add_templates(pickled_templates)
+
+    def remove_templates(self, shard_idx: int, template_ids: typing.Sequence[typing.Hashable]):
+        self._shards[shard_idx].remove_templates(template_ids)
+
+    def search(self, eeg_data: np.ndarray, top_k: int) -> typing.List[typing.List[IdentificationMatch]]:
+        return [shard.search(eeg_data, top_k) for shard in self._shards]
+
+
+class ProcessShardTransport(BaseShardTransport):
+    """
+    Transport keeping each shard in a dedicated local worker process. Searches are broadcast to every worker at once,
+    so that the shards are scored in parallel.
+    """
+    def __init__(self, number_of_shards: int):
+        if number_of_shards < 1:
+            raise ValueError(f'Number of shards must be at least 1 (got {number_of_shards}).')
+        self._workers = [
+            concurrent.futures.ProcessPoolExecutor(1, initializer=_initialize_worker)
+            for _ in range(number_of_shards)
+        ]
+
+    @property
+    def number_of_shards(self) -> int:
+        return len(self._workers)
+
+    def add_templates(self, shard_idx: int, pickled_templates: typing.Mapping[typing.Hashable, bytes]):
+        self._workers[shard_idx].submit(_add_templates, dict(pickled_templates)).result()
+
+    def remove_templates(self, shard_idx: int, template_ids: typing.Sequence[typing.Hashable]):
+        self._workers[shard_idx].submit(_remove_templates, list(template_ids)).result()
+
+    def search(self, eeg_data: np.ndarray, top_k: int) -> typing.List[typing.List[IdentificationMatch]]:
+        futures = [worker.submit(_search, eeg_data, top_k) for worker in self._workers]
+        return [future.result() for future in futures]
+
+    def close(self):
+        for worker in self._workers:
+            worker.shutdown()
+
+
+class ShardedIdentificationService:
+    """
+    1:N identification service, which partitions the enrolled templates across the shards of a transport. Probes are
+    broadcast to every shard, each shard scores its own templates, and the best candidates of each shard are merged
+    into the overall best candidates.
+
+    New templates are assigned to the least loaded shard, and removing templates rebalances the shards so that their
+    sizes differ by at most one template. The service keeps the pickled form of each template, so that templates can
+    be moved between shards. Templates are pickled rather than serialized, so that their hash backends keep their
+    parameters (e.g., a seed or token).
+    """
+    def __init__(self, transport: BaseShardTransport):
+        self._transport = transport
+        self._pickled: typing.Dict[typing.Hashable, bytes] = {}
+        self._assignments: typing.Dict[typing.Hashable, int] = {}
+        self._shard_sizes = [0] * transport.number_of_shards
+
+    def __len__(self) -> int:
+        return len(self._assignments)
+
+    def __enter__(self) -> 'ShardedIdentificationService':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def shard_sizes(self) -> typing.List[int]:
+        """
+        Retrieves the number of templates assigned to each shard.
+
+        :returns: The size of each shard.
+        """
+        return list(self._shard_sizes)
+
+    def add_templates(self, templates: typing.Mapping[typing.Hashable, template.EEGTemplate]):
+        """
+        Enrolls the given templates, replacing any templates already enrolled with the same IDs.
+
+        :param templates: The templates to enroll, keyed by template ID.
+        """
+        replaced_ids = [template_id for template_id in templates if template_id in self._assignments]
+        if replaced_ids:
+            self.remove_templates(replaced_ids, rebalance=False)
+        shard_templates: typing.Dict[int, typing.Dict[typing.Hashable, bytes]] = {}
+        for template_id, enrolled_template in templates.items():
+            shard_idx = int(np.argmin(self._shard_sizes))
+            pickled = pickle.dumps(enrolled_template, protocol=pickle.HIGHEST_PROTOCOL)
+            self._pickled[template_id] = pickled
+            self._assignments[template_id] = shard_idx
+            self._shard_sizes[shard_idx] += 1
+            shard_templates.setdefault(shard_idx, {})[template_id] = pickled
+        for shard_idx, pickled_templates in shard_templates.items():
+            self._transport.add_templates(shard_idx, pickled_templates)
+
+    def remove_templates(self, template_ids: typing.Iterable[typing.Hashable], rebalance=True):
+        """
+        Removes the given templates. Unknown template IDs are ignored.
+
+        :param template_ids: The IDs of the templates to remove.
+        :param rebalance: Flag indicating whether to rebalance the shards afterwards.
+        """
+        shard_template_ids: typing.Dict[int, typing.List[typing.Hashable]] = {}
+        for template_id in template_ids:
+            shard_idx = self._assignments.pop(template_id, None)
+            if shard_idx is None:
+                continue
+            del self._pickled[template_id]
+            self._shard_sizes[shard_idx] -= 1
+            shard_template_ids.setdefault(shard_idx, []).append(template_id)
+        for shard_idx, removed_ids in shard_template_ids.items():
+            self._transport.remove_templates(shard_idx, removed_ids)
+        if rebalance:
+            self.rebalance()
+
+    def rebalance(self) -> int:
+        """
+        Moves templates from the largest to the smallest shards, until shard sizes differ by at most one template.
+
+        :returns: The number of templates moved.
+        """
+        target_sizes = [len(self) // len(self._shard_sizes)] * len(self._shard_sizes)
+        for shard_idx in np.argsort(self._shard_sizes, kind='stable')[::-1][:len(self) % len(self._shard_sizes)]:
+            target_sizes[shard_idx] += 1
+
+        moved_ids = []
+        for shard_idx, (size, target_size) in enumerate(zip(self._shard_sizes, target_sizes)):
+            if size > target_size:
+                shard_ids = [
+                    template_id for template_id, assigned_idx in self._assignments.items() if assigned_idx == shard_idx
+                ]
+                moved_ids.extend(shard_ids[target_size:])
+        if not moved_ids:
+            return 0
+
+        moves: typing.Dict[typing.Tuple[int, int], typing.List[typing.Hashable]] = {}
+        for template_id in moved_ids:
+            source_idx = self._assignments[template_id]
+            destination_idx = next(
+                shard_idx for shard_idx, (size, target_size) in enumerate(zip(self._shard_sizes, target_sizes))
+                if size < target_size
+            )
+            self._assignments[template_id] = destination_idx
+            self._shard_sizes[source_idx] -= 1
+            self._shard_sizes[destination_idx] += 1
+            moves.setdefault((source_idx, destination_idx), []).append(template_id)
+        for (source_idx, destination_idx), template_ids in moves.items():
+            self._transport.add_templates(
+                destination_idx, {template_id: self._pickled[template_id] for template_id in template_ids}
+            )
+            self._transport.remove_templates(source_idx, template_ids)
+        return len(moved_ids)
+
+    def identify(self, eeg_data: typing.List[np.ndarray], top_k: int = 1) -> typing.List[IdentificationMatch]:
+        """
+        Searches every shard for the templates best matching the given EEG feature data.
+
+        :param eeg_data: The EEG feature data vectors to search for.
+        :param top_k: The maximum number of candidates to return.
+        :returns: The best candidates overall, best first.
+        """
+        if top_k < 1:
+            raise ValueError(f'Number of candidates must be at least 1 (got {top_k}).')
+        probe = comparison.PreparedProbe(eeg_data)
+        if not probe.is_valid:
+            _logger.warning('EEG data passed to identification service was not 2D matrix.')
+            return []
+        shard_matches = self._transport.search(probe.get_matrix(), top_k)
+        return heapq.nlargest(
+            top_k, (match for matches in shard_matches for match in matches), key=lambda match: match.score
+        )
+
+    def close(self):
+        """
+        Closes the transport of the service.
+        """
+        self._transport.close()
+
+
+_worker_shard: typing.Optional[TemplateShard] = None
+
+
+def _initialize_worker():
+    """
+    Initializes a shard worker process with an empty shard.
+    """
+    global _worker_shard
+    _worker_shard = TemplateShard()
+
+
+def _add_templates(pickled_templates: typing.Dict[typing.Hashable, bytes]):
+    """
+    Adds templates to the shard of the worker process.
+
+    :param pickled_templates: The pickled templates to add, keyed by template ID.
+    """
+    _worker_shard.add_templates(pickled_templates)
+
+
+def _remove_templates(template_ids: typing.List[typing.Hashable]):
+    """
+    Removes templates from the shard of the worker process.
+
+    :param template_ids: The IDs of the templates to remove.
+    """
+    _worker_shard.remove_templates(template_ids)
+
+
+def _search(eeg_data: np.ndarray, top_k: int) -> typing.List[IdentificationMatch]:
+    """
+    Searches the shard of the worker process.
+
+    :param eeg_data: The EEG feature data matrix to search for.
+    :param top_k: The maximum number of candidates to return.
+    :returns: The best candidates of the shard, best first.
+    """
+    return _worker_shard.search(eeg_data, top_k)
@@ -0,0 +1,469 @@
+import argparse
+import concurrent.futures
+import dataclasses
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+import numpy as np
+
+from . import backend, template
+
+try:
+    import resource
+except ImportError:
+    # The resource module is only available on Unix platforms.
+    resource = None
+
+
+ENROLL_OPERATION = 'enroll'
+VERIFY_OPERATION = 'verify'
+DESERIALIZE_OPERATION = 'deserialize'
+OPERATIONS = (ENROLL_OPERATION, VERIFY_OPERATION, DESERIALIZE_OPERATION)
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+@dataclasses.dataclass
+class LoadTestConfiguration:
+    """
+    Parameters of a load test: the offered traffic (request rate, duration and mix of operations), how the service
+    stand-in is run, and the data it is exercised with.
+    """
+    rate: float = 50.0
+    duration: float = 10.0
+    mix: typing.Dict[str, float] = dataclasses.field(
+        default_factory=lambda: {ENROLL_OPERATION: 1.0, VERIFY_OPERATION: 8.0, DESERIALIZE_OPERATION: 1.0}
+    )
+    concurrency: int = 4
+    subprocess: bool = False
+    hash_backend: backend.BaseBloomFilterHashBackend = dataclasses.field(
+        default_factory=backend.MMH3BloomFilterBackend
+    )
+    segment_ratio: float = 0.1
+    false_positive_ratio: float = 0.01
+    number_of_subjects: int = 16
+    feature_vectors: int = 64
+    features: int = 32
+    sample_interval: float = 1.0
+    trace_memory: bool = False
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.rate <= 0 or self.duration <= 0 or self.sample_interval <= 0:
+            raise ValueError('Rate, duration and sample interval must be positive.')
+        if self.concurrency < 1 or self.number_of_subjects < 1:
+            raise ValueError('Concurrency and number of subjects must be at least 1.')
+        unknown_operations = set(self.mix) - set(OPERATIONS)
+        if unknown_operations:
+            raise ValueError(f'Unknown operations in mix: {sorted(unknown_operations)} (expected {list(OPERATIONS)}).')
+        if any(weight < 0 for weight in self.mix.values()) or sum(self.mix.values()) <= 0:
+            raise ValueError('Mix weights must be non-negative, with a positive total.')
+
+
+@dataclasses.dataclass
+class OperationStatistics:
+    """
+    Simple container for the statistics of a single operation over a load test. Latencies are in seconds, measured
+    from the time each request was scheduled to be sent, so that they include any time spent queued.
+    """
+    operation: str
+    count: int
+    errors: int
+    throughput: float
+    mean_latency: float
+    latency_percentiles: typing.Dict[int, float]
+    max_latency: float
+
+
+@dataclasses.dataclass
+class LoadSample:
+    """
+    Simple container for the measurements of a single sampling interval of a load test. CPU use is the CPU time of
+    the driver and service processes over the interval, as a percentage of the interval (i.e., 100 is a full core).
+    RSS and peak RSS are the sums of the current and peak resident set sizes of the driver and service processes (zero
+    on platforms which do not report them; the current RSS falls back to the peak RSS on platforms other than Linux).
+    Traced memory is the memory traced by tracemalloc in the driver and service processes (zero if
+    memory is not traced, as tracing slows down every allocation, and so inflates latencies).
+    """
+    elapsed: float
+    completed: int
+    throughput: float
+    cpu_percent: float
+    rss_bytes: int
+    peak_rss_bytes: int
+    traced_memory_bytes: int
+    peak_traced_memory_bytes: int
+
+
+@dataclasses.dataclass
+class LoadTestReport:
+    """
+    Simple container for the results of a load test, including whether memory was traced with tracemalloc (which
+    inflates latencies).
+    """
+    offered_rate: float
+    elapsed: float
+    completed: int
+    throughput: float
+    memory_traced: bool
+    operations: typing.Dict[str, OperationStatistics]
+    samples: typing.List[LoadSample]
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Converts the report into a (JSON serializable) dictionary.
+
+        :returns: The report, as a dictionary.
+        """
+        return dataclasses.asdict(self)
+
+
+class TemplateServiceStandIn:
+    """
+    Stand-in for a template service, handling enrollment, verification and deserialization requests over synthetic
+    data. The data of every subject is generated up front (from the configured seed), so that handling a request only
+    involves the operation itself:
+
+    - enroll: makes a template from the enrollment data of the subject, and serializes it.
+    - verify: compares the enrolled template of the subject against a probe of the subject.
+    - deserialize: deserializes the enrolled template of the subject.
+    """
+    def __init__(self, configuration: LoadTestConfiguration):
+        self.configuration = configuration
+        rng = np.random.default_rng(configuration.seed)
+        shape = (configuration.number_of_subjects, configuration.feature_vectors, configuration.features)
+        self._enrollment_data = rng.random(shape)
+        self._probe_data = self._enrollment_data + rng.normal(scale=0.01, size=shape)
+        self._templates = [self._make_template(subject_idx) for subject_idx in range(len(self._enrollment_data))]
+        self._serialized_templates = [enrolled.serialize() for enrolled in self._templates]
+
+    def handle(self, operation: str, subject_idx: int):
+        """
+        Handles a single request.
+
+        :param operation: The operation requested.
+        :param subject_idx: The index of the subject of the request.
+        """
+        if operation == ENROLL_OPERATION:
+            self._make_template(subject_idx).serialize()
+        elif operation == VERIFY_OPERATION:
+            self._templates[subject_idx].compare(list(self._probe_data[subject_idx]))
+        elif operation == DESERIALIZE_OPERATION:
+            template.EEGTemplate.deserialize(self._serialized_templates[subject_idx])
+        else:
+            raise ValueError(f'Unknown operation "{operation}" (expected one of {list(OPERATIONS)}).')
+
+    def _make_template(self, subject_idx: int) -> template.EEGTemplate:
+        """
+        Helper method which makes a template from the enrollment data of a subject.
+
+        :param subject_idx: The index of the subject.
+        :returns: The template.
+        """
+        return template.EEGTemplate.make_template(
+            list(self._enrollment_data[subject_idx]),
+            self.configuration.hash_backend,
+            self.configuration.segment_ratio,
+            self.configuration.false_positive_ratio
+        )
+
+
+class LoadGenerator:
+    """
+    Drives a template service stand-in with an open-loop load: requests are sent at the configured rate, regardless of
+    how quickly previous requests complete, and each request is a random operation of the configured mix, for a random
+    subject. Requests are handled by a pool of threads in this process, or by a pool of worker processes (each with
+    its own service stand-in), in which case latencies include the cost of sending requests to the workers.
+
+    Throughput, CPU use and memory are sampled at the configured interval while the load test runs. CPU use and memory
+    of worker processes are reported by the workers along with each response, so they are as recent as their last
+    response.
+    """
+    def __init__(self, configuration: LoadTestConfiguration):
+        self.configuration = configuration
+        self._lock = threading.Lock()
+        self._latencies: typing.Dict[str, typing.List[float]] = {}
+        self._errors: typing.Dict[str, int] = {}
+        self._process_statistics: typing.Dict[int, typing.Tuple[float, int, int, int]] = {}
+        self._last_cpu_time = 0.0
+        self._handle_request: typing.Callable[[str, int], tuple] = _handle_request
+
+    def run(self) -> LoadTestReport:
+        """
+        Runs the load test. Once the configured duration has elapsed, no more requests are sent, and the load test
+        waits for the pending requests to complete.
+
+        :returns: The report of the load test.
+        """
+        configuration = self.configuration
+        self._latencies = {operation: [] for operation in configuration.mix}
+        self._errors = {operation: 0 for operation in configuration.mix}
+        self._process_statistics = {}
+        if configuration.trace_memory:
+            tracemalloc.start()
+        try:
+            with self._make_executor() as executor:
+                start, samples = self._send_requests(executor)
+            end = time.perf_counter()
+            samples.append(self._sample(start, end, samples))
+        finally:
+            if configuration.trace_memory:
+                tracemalloc.stop()
+
+        operations = {
+            operation: self._summarize(operation, latencies, end - start)
+            for operation, latencies in self._latencies.items()
+        }
+        completed = sum(len(latencies) for latencies in self._latencies.values())
+        return LoadTestReport(
+            offered_rate=configuration.rate,
+            elapsed=end - start,
+            completed=completed,
+            throughput=completed / (end - start),
+            memory_traced=configuration.trace_memory,
+            operations=operations,
+            samples=samples
+        )
+
+    def _make_executor(self) -> concurrent.futures.Executor:
+        """
+        Helper method which creates the pool handling the requests, along with its service stand-in(s).
+
+        :returns: The executor.
+        """
+        concurrency = self.configuration.concurrency
+        if self.configuration.subprocess:
+            self._handle_request = _handle_request
+            executor = concurrent.futures.ProcessPoolExecutor(
+                concurrency, initializer=_initialize_worker, initargs=(self.configuration,)
+            )
+            # Workers are started (and their service stand-ins created) before the load test starts.
+            list(executor.map(_handle_request, [None] * concurrency, [0] * concurrency))
+            return executor
+        self._handle_request = functools.partial(_handle_request, service=TemplateServiceStandIn(self.configuration))
+        return concurrent.futures.ThreadPoolExecutor(concurrency)
+
+    def _send_requests(self, executor: concurrent.futures.Executor) -> typing.Tuple[float, typing.List[LoadSample]]:
+        """
+        Helper method which sends requests to the executor at the configured rate, for the configured duration,
+        sampling measurements along the way.
+
+        :param executor: The executor handling the requests.
+        :returns: The start time of the load test, and the samples taken while sending requests.
+        """
+        configuration = self.configuration
+        rng = np.random.default_rng(configuration.seed)
+        operations = list(configuration.mix)
+        weights = np.array([configuration.mix[operation] for operation in operations], dtype=np.float64)
+        number_of_requests = int(configuration.rate * configuration.duration)
+        request_operations = rng.choice(len(operations), size=number_of_requests, p=weights / weights.sum())
+        request_subjects = rng.integers(configuration.number_of_subjects, size=number_of_requests)
+
+        samples: typing.List[LoadSample] = []
+        start = time.perf_counter()
+        samples.append(self._sample(start, start, samples))
+        next_sample = start + configuration.sample_interval
+        for request_idx in range(number_of_requests):
+            scheduled = start + request_idx / configuration.rate
+            while True:
+                now = time.perf_counter()
+                if now >= next_sample:
+                    samples.append(self._sample(start, now, samples))
+                    next_sample += configuration.sample_interval
+                if now >= scheduled:
+                    break
+                time.sleep(min(scheduled, next_sample) - now)
+            operation = operations[request_operations[request_idx]]
+            future = executor.submit(self._handle_request, operation, int(request_subjects[request_idx]))
+            future.add_done_callback(self._make_callback(operation, scheduled))
+        return start, samples
+
+    def _make_callback(self, operation: str, scheduled: float) -> typing.Callable[[concurrent.futures.Future], None]:
+        """
+        Helper method which creates the callback recording the completion of a request.
+
+        :param operation: The operation of the request.
+        :param scheduled: The time the request was scheduled to be sent.
+        :returns: The callback.
+        """
+        def record(future: concurrent.futures.Future):
+            completed = time.perf_counter()
+            with self._lock:
+                if future.exception() is not None:
+                    self._errors[operation] += 1
+                    return
+                self._latencies[operation].append(completed - scheduled)
+                process_id, *process_statistics = future.result()
+                self._process_statistics[process_id] = tuple(process_statistics)
+        return record
+
+    def _sample(self, start: float, now: float, samples: typing.List[LoadSample]) -> LoadSample:
+        """
+        Helper method which takes a sample of the measurements of the load test.
+
+        :param start: The start time of the load test.
+        :param now: The current time.
+        :param samples: The previous samples, used to compute rates over the interval since the last sample.
+        :returns: The sample.
+        """
+        with self._lock:
+            completed = sum(len(latencies) for latencies in self._latencies.values())
+            process_statistics = dict(self._process_statistics)
+        process_statistics[os.getpid()] = _get_process_statistics()[1:]
+        cpu_time = sum(statistics[0] for statistics in process_statistics.values())
+        sample = LoadSample(
+            elapsed=now - start,
+            completed=completed,
+            throughput=0.0,
+            cpu_percent=0.0,
+            rss_bytes=sum(statistics[1] for statistics in process_statistics.values()),
+            peak_rss_bytes=sum(statistics[2] for statistics in process_statistics.values()),
+            traced_memory_bytes=sum(statistics[3] for statistics in process_statistics.values()),
+            peak_traced_memory_bytes=sum(statistics[4] for statistics in process_statistics.values())
+        )
+        if not samples:
+            self._last_cpu_time = cpu_time
+            return sample
+        interval = sample.elapsed - samples[-1].elapsed
+        if interval > 0:
+            sample.throughput = (completed - samples[-1].completed) / interval
+            sample.cpu_percent = 100 * (cpu_time - self._last_cpu_time) / interval
+        self._last_cpu_time = cpu_time
+        return sample
+
+    def _summarize(self, operation: str, latencies: typing.List[float], elapsed: float) -> OperationStatistics:
+        """
+        Helper method which summarizes the latencies of an operation.
+
+        :param operation: The operation.
+        :param latencies: The latencies of the completed requests of the operation.
+        :param elapsed: The duration of the load test.
+        :returns: The statistics of the operation.
+        """
+        latency_array = np.array(latencies, dtype=np.float64)
+        if not len(latency_array):
+            latency_array = np.zeros(1, dtype=np.float64)
+        return OperationStatistics(
+            operation=operation,
+            count=len(latencies),
+            errors=self._errors[operation],
+            throughput=len(latencies) / elapsed,
+            mean_latency=float(latency_array.mean()),
+            latency_percentiles={
+                percentile: float(np.percentile(latency_array, percentile)) for percentile in LATENCY_PERCENTILES
+            },
+            max_latency=float(latency_array.max())
+        )
+
+
+_worker_service: typing.Optional[TemplateServiceStandIn] = None
+
+
+def _initialize_worker(configuration: LoadTestConfiguration):
+    """
+    Initializes a worker process with its own service stand-in.
+
+    :param configuration: The configuration of the load test.
+    """
+    global _worker_service
+    if configuration.trace_memory:
+        tracemalloc.start()
+    _worker_service = TemplateServiceStandIn(configuration)
+
+
+def _handle_request(operation: typing.Optional[str],
+                    subject_idx: int,
+                    service: typing.Optional[TemplateServiceStandIn] = None
+                    ) -> typing.Tuple[int, float, int, int, int, int]:
+    """
+    Handles a single request. This is a module level function, so that it can be used by process pools as well as
+    thread pools.
+
+    :param operation: The operation requested (if None, no operation is performed, e.g. to start a worker).
+    :param subject_idx: The index of the subject of the request.
+    :param service: The service stand-in handling the request (by default, the one of the current worker process).
+    :returns: The statistics of the process handling the request (see _get_process_statistics).
+    """
+    if operation is not None:
+        (service or _worker_service).handle(operation, subject_idx)
+    return _get_process_statistics()
+
+
+def _get_process_statistics() -> typing.Tuple[int, float, int, int, int, int]:
+    """
+    Retrieves the statistics of the current process.
+
+    :returns: The ID of the process, its CPU time, its current and peak RSS, and the current and peak memory traced by
+              tracemalloc.
+    """
+    traced_memory, peak_traced_memory = tracemalloc.get_traced_memory()
+    return os.getpid(), time.process_time(), _get_rss(), _get_peak_rss(), traced_memory, peak_traced_memory
+
+
+def _get_rss() -> int:
+    """
+    Retrieves the current resident set size of the current process, read from /proc/self/statm on Linux.
+
+    :returns: The RSS in bytes, or the peak RSS (see _get_peak_rss) if the platform does not report the current RSS.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, AttributeError, ValueError, IndexError):
+        return _get_peak_rss()
+
+
+def _get_peak_rss() -> int:
+    """
+    Retrieves the peak resident set size of the current process, which (unlike tracemalloc) does not slow down
+    allocations.
+
+    :returns: The peak RSS in bytes, or 0 if the platform does not report it.
+    """
+    if resource is None:
+        return 0
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # The peak RSS is reported in bytes on macOS, and in kilobytes on other platforms.
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def main(arguments: typing.Optional[typing.List[str]] = None):
+    """
+    Runs a load test from the command line, and prints its report as JSON.
+
+    :param arguments: The command line arguments (by default, the arguments of the current process).
+    """
+    parser = argparse.ArgumentParser(description='Runs a load test against a template service stand-in.')
+    parser.add_argument('--rate', type=float, default=50.0, help='Requests sent per second.')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to send requests for.')
+    parser.add_argument('--concurrency', type=int, default=4, help='Number of worker threads or processes.')
+    parser.add_argument('--subprocess', action='store_true', help='Handle requests in worker processes.')
+    parser.add_argument('--backend', default='mmh3bloomfilterbackend', help='Implementation key of the hash backend.')
+    for operation in OPERATIONS:
+        parser.add_argument(f'--{operation}-weight', type=float, default=LoadTestConfiguration().mix[operation],
+                            help=f'Relative frequency of {operation} requests.')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='Seconds between samples.')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Trace memory with tracemalloc (which inflates latencies).')
+    parsed = parser.parse_args(arguments)
+
+    configuration = LoadTestConfiguration(
+        rate=parsed.rate,
+        duration=parsed.duration,
+        mix={operation: getattr(parsed, f'{operation}_weight') for operation in OPERATIONS},
+        concurrency=parsed.concurrency,
+        subprocess=parsed.subprocess,
+        hash_backend=backend.BaseBloomFilterHashBackend.get_implementation(parsed.backend)(),
+        sample_interval=parsed.sample_interval,
+        trace_memory=parsed.trace_memory
+    )
+    print(json.dumps(LoadGenerator(configuration).run().as_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
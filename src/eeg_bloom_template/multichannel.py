@@ -0,0 +1,292 @@
+import dataclasses
+import json
+import typing
+import numpy as np
+
+from . import backend, engine, exceptions, signature, sizing, template
+from .comparison import ComparisonResult
+from .utils import bloom_bits
+from .utils.iteration import iter_ratio_slices
+
+
+# Upper bound on the number of elements checked at once while comparing, to keep their bit indexes in the CPU cache.
+_MAX_BLOCK_ELEMENTS = 2**15
+
+
+@dataclasses.dataclass
+class MultiChannelComparisonResult:
+    """
+    Simple container for the results of comparing multi-channel EEG feature data against a multi-channel template.
+    """
+    channel_results: typing.List[ComparisonResult]
+
+    @property
+    def fused(self) -> ComparisonResult:
+        """
+        Fuses the results of every channel into a single result, by pooling their hits and elements.
+
+        :returns: The fused comparison result.
+        """
+        return ComparisonResult(
+            elements_total=sum(result.elements_total for result in self.channel_results),
+            hits=sum(result.hits for result in self.channel_results)
+        )
+
+
+@dataclasses.dataclass
+class _ChannelFilterStack:
+    """
+    Internal container for the bit arrays of the filters at the same position in the template of every channel.
+    """
+    hash_backend: backend.BaseBloomFilterHashBackend
+    filter_type: str
+    number_of_hashes: int
+    size_in_bits: int
+    bits: np.ndarray
+
+
+class MultiChannelEEGTemplate:
+    """
+    EEG template for multi-channel feature data (i.e., channels x feature vectors x features), made up of a template
+    per channel. Templates of every channel are built in a single pass, and compared against all the channels of the
+    probe data together: when the channel templates share the same filter layouts (as templates built by
+    make_template do), elements of every channel are hashed at once, and checked against the filters of their own
+    channel using vectorized operations.
+    """
+    SERIALIZE_CHANNELS_KEY = 'channels'
+
+    def __init__(self, channel_templates: typing.List[template.EEGTemplate]):
+        if not channel_templates:
+            raise ValueError('Expected at least one channel template.')
+        first_template = channel_templates[0]
+        for channel_template in channel_templates[1:]:
+            if (channel_template.segment_ratio != first_template.segment_ratio or
+                    channel_template.row_wise != first_template.row_wise):
+                raise ValueError('Channel templates must share the same segment ratio and orientation.')
+        self.channel_templates = channel_templates
+        self._filter_stacks: typing.Optional[typing.List[_ChannelFilterStack]] = None
+        self._filter_stacks_built = False
+
+    def __len__(self) -> int:
+        return len(self.channel_templates)
+
+    def __str__(self):
+        return f'Multi-channel template: {len(self.channel_templates)} channels'
+
+    @property
+    def segment_ratio(self) -> float:
+        """
+        Retrieves the segment ratio shared by the channel templates.
+
+        :returns: The segment ratio.
+        """
+        return self.channel_templates[0].segment_ratio
+
+    @property
+    def row_wise(self) -> bool:
+        """
+        Retrieves the orientation shared by the channel templates.
+
+        :returns: True if the templates use row wise analysis.
+        """
+        return self.channel_templates[0].row_wise
+
+    @classmethod
+    def make_template(cls,
+                      feature_data: np.ndarray,
+                      hash_backend: backend.BaseBloomFilterHashBackend,
+                      segment_ratio: float,
+                      false_positive_ratio: float,
+                      row_wise=True,
+                      sizing_policy: sizing.BloomFilterSizingPolicy = None,
+                      filter_type: str = bloom_bits.STANDARD_FILTER_TYPE,
+                      signature_size: int = 0) -> 'MultiChannelEEGTemplate':
+        """
+        Generates a multi-channel EEG template from multi-channel feature data. The template of each channel (including
+        its signature) is the same as the one generated by EEGTemplate.make_template from the data of the channel.
+
+        :param feature_data: The processed feature data, as a 3D array of channels x feature vectors x features.
+        :param hash_backend: The hash backend to use for the Bloom Filters in the template.
+        :param segment_ratio: The segment ratio to use in the template.
+        :param false_positive_ratio: The false positive rate to use in the Bloom Filters.
+        :param row_wise: Flag indicating whether to use row wise or column wise analysis.
+        :param sizing_policy: The policy used to size the Bloom Filters in the template.
+        :param filter_type: The type of Bloom Filters to use, either 'standard' or 'blocked'.
+        :param signature_size: The size of the signature stored with the template of each channel. By default, no
+                               signature is stored.
+        :returns: The template instance.
+        """
+        if not 0 < false_positive_ratio < 1:
+            raise ValueError(f'False positive ratio must be between 0 and 1 (got {false_positive_ratio}).')
+        data_engine = engine.EEGBloomFilterTemplateEngine(
+            hash_backend, segment_ratio, false_positive_ratio, sizing_policy=sizing_policy, filter_type=filter_type
+        )
+        # The segment averages of every channel are hashed once, for both the Bloom Filters and the signatures.
+        segment_means = data_engine.compute_multichannel_segment_means(feature_data, row_wise)
+        hash_codes = bloom_bits.hash_values(hash_backend, segment_means)
+        channel_templates = []
+        for channel_codes, bloom_filters in zip(
+                hash_codes, data_engine.create_multichannel_template_data_from_hash_codes(hash_codes)):
+            channel_signature = None
+            if signature_size:
+                channel_signature = signature.compute_signature(channel_codes, signature_size)
+            channel_templates.append(template.EEGTemplate(
+                bloom_filters=bloom_filters, segment_ratio=segment_ratio, row_wise=row_wise,
+                signature=channel_signature
+            ))
+        return cls(channel_templates)
+
+    def compare(self, eeg_data: np.ndarray) -> MultiChannelComparisonResult:
+        """
+        Compares the template of each channel against the EEG feature data of the same channel.
+
+        :param eeg_data: The EEG feature data, as a 3D array of channels x feature vectors x features.
+        :returns: The comparison result of each channel, which can be fused into a single result.
+        :raises ValueError: If the data is not a 3D array with a matrix per channel of the template.
+        """
+        tensor = np.asarray(eeg_data)
+        if tensor.ndim != 3 or len(tensor) != len(self.channel_templates):
+            raise ValueError(
+                f'Expected a 3D array of {len(self.channel_templates)} channels, got an array of shape {tensor.shape}.'
+            )
+        filter_stacks = self._get_filter_stacks()
+        if filter_stacks is None:
+            return MultiChannelComparisonResult([
+                channel_template.compare(channel_data)
+                for channel_template, channel_data in zip(self.channel_templates, tensor)
+            ])
+
+        if not self.row_wise:
+            tensor = tensor.transpose((0, 2, 1))
+        segments = list(iter_ratio_slices(range(tensor.shape[1]), self.segment_ratio))
+        hits = np.zeros(len(tensor), dtype=np.int64)
+        # Channels are checked in blocks, so that the hash codes and bit indexes of a block stay small enough to be
+        # processed efficiently (i.e., within the CPU cache).
+        block_size = max(1, _MAX_BLOCK_ELEMENTS // max(1, tensor[0].size))
+        for block_start in range(0, len(tensor), block_size):
+            block = slice(block_start, block_start + block_size)
+            hits[block] = self._count_block_hits(tensor[block], segments, filter_stacks, block)
+
+        elements_total = tensor.shape[1] * tensor.shape[2]
+        return MultiChannelComparisonResult([
+            ComparisonResult(elements_total=elements_total, hits=int(channel_hits)) for channel_hits in hits
+        ])
+
+    @staticmethod
+    def _count_block_hits(tensor: np.ndarray,
+                          segments: typing.List[range],
+                          filter_stacks: typing.List[_ChannelFilterStack],
+                          block: slice) -> np.ndarray:
+        """
+        Helper method which counts the hits of a block of channels, each against the filters of its own channel. The
+        elements of the block are hashed once per hash backend, and their bit indexes generated once per filter layout.
+
+        :param tensor: The (oriented) EEG feature data of the channels of the block.
+        :param segments: The row range of each segment.
+        :param filter_stacks: The filter stack of each position.
+        :param block: The channels of the block.
+        :returns: The number of hits of each channel of the block.
+        """
+        hash_codes: typing.Dict[str, np.ndarray] = {}
+        indexes: typing.Dict[tuple, np.ndarray] = {}
+        hits = np.zeros(len(tensor), dtype=np.int64)
+        max_filter_idx = len(filter_stacks) - 1
+        for segment_idx, segment in enumerate(segments):
+            filter_stack = filter_stacks[min(segment_idx, max_filter_idx)]
+            identity = filter_stack.hash_backend.identity
+            if identity not in hash_codes:
+                hash_codes[identity] = bloom_bits.hash_values(filter_stack.hash_backend, tensor)
+            layout = (identity, filter_stack.filter_type, filter_stack.number_of_hashes, filter_stack.size_in_bits)
+            if layout not in indexes:
+                indexes[layout] = bloom_bits.generate_filter_indexes(
+                    filter_stack.filter_type, hash_codes[identity], filter_stack.number_of_hashes,
+                    filter_stack.size_in_bits
+                )
+            segment_hits = bloom_bits.contains_paired_indexes(
+                filter_stack.bits[block], indexes[layout][:, segment.start:segment.stop]
+            )
+            hits += segment_hits.reshape(len(tensor), -1).sum(axis=1)
+        return hits
+
+    def serialize(self, compress=False) -> str:
+        """
+        Serializes the template of every channel into a single string.
+
+        :param compress: Flag indicating whether to compress the Bloom Filter data in the serialized string.
+        :returns: The multi-channel template, as a string.
+        """
+        return json.dumps({
+            self.SERIALIZE_CHANNELS_KEY: [
+                channel_template.serialize(compress=compress) for channel_template in self.channel_templates
+            ]
+        })
+
+    @classmethod
+    def deserialize(cls, data: str) -> 'MultiChannelEEGTemplate':
+        """
+        Re-creates a multi-channel template from a serialized data string.
+
+        :param data: The data string containing the serialized multi-channel template.
+        :returns: The multi-channel template.
+        :raises InvalidSerializationFormat: If the data string is in the wrong format for deserialization.
+        """
+        parsed_data = json.loads(data)
+        if (not isinstance(parsed_data, dict) or
+                not isinstance(parsed_data.get(cls.SERIALIZE_CHANNELS_KEY), list) or
+                not parsed_data[cls.SERIALIZE_CHANNELS_KEY]):
+            raise exceptions.InvalidSerializationFormat(
+                f'Expected serialized data to be an object holding a non-empty list of '
+                f'{cls.SERIALIZE_CHANNELS_KEY}.'
+            )
+        return cls([
+            template.EEGTemplate.deserialize(serialized) for serialized in parsed_data[cls.SERIALIZE_CHANNELS_KEY]
+        ])
+
+    def _get_filter_stacks(self) -> typing.Optional[typing.List[_ChannelFilterStack]]:
+        """
+        Helper method which stacks the bit arrays of the filters at each position in the channel templates.
+
+        :returns: The filter stack of each position, or None if the channel templates do not share the same filter
+                  layouts (or use filters without a registered hash backend), in which case they are compared one
+                  channel at a time.
+        """
+        if not self._filter_stacks_built:
+            self._filter_stacks = self._stack_filters()
+            self._filter_stacks_built = True
+        return self._filter_stacks
+
+    def _stack_filters(self) -> typing.Optional[typing.List[_ChannelFilterStack]]:
+        """
+        Helper method which builds the filter stacks of the channel templates (see _get_filter_stacks).
+
+        :returns: The filter stack of each position, or None if the channel templates cannot be stacked.
+        """
+        filter_counts = {len(channel_template.bloom_filters) for channel_template in self.channel_templates}
+        if filter_counts != {len(self.channel_templates[0].bloom_filters)} or 0 in filter_counts:
+            return None
+        filter_stacks = []
+        for position_filters in zip(*(channel_template.bloom_filters for channel_template in self.channel_templates)):
+            filter_layouts = set()
+            filter_bits = []
+            for bloom_filter in position_filters:
+                if not isinstance(bloom_filter.hash_func, backend.BaseBloomFilterHashBackend):
+                    return None
+                number_of_hashes, bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+                filter_layouts.add((
+                    bloom_filter.hash_func.identity,
+                    bloom_bits.get_filter_type(bloom_filter),
+                    number_of_hashes,
+                    bloom_filter.size_in_bits
+                ))
+                filter_bits.append(bits)
+            if len(filter_layouts) > 1:
+                return None
+            (_, filter_type, number_of_hashes, size_in_bits), = filter_layouts
+            filter_stacks.append(_ChannelFilterStack(
+                hash_backend=position_filters[0].hash_func,
+                filter_type=filter_type,
+                number_of_hashes=number_of_hashes,
+                size_in_bits=size_in_bits,
+                bits=np.stack(filter_bits)
+            ))
+        return filter_stacks
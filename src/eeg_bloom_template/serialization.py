@@ -1,30 +1,76 @@
 import base64
+import dataclasses
+import hashlib
 import re
 import rbloom
 import numbers
 import typing
 import json
+import numpy as np
 
-from . import base, backend, exceptions
+from . import base, backend, blocked_bloom, compression, exceptions, signature
+from .utils import bloom_bits
 
 
 D = typing.TypeVar('D', bound=base.BaseEEGTemplateData)
 
 
+@dataclasses.dataclass
+class TemplateMetadata:
+    """
+    Simple container for the metadata of a serialized template, which can be read without decoding its filters.
+    """
+    hash_backends: typing.List[str]
+    segment_ratio: float
+    row_wise: bool
+    filter_sizes: typing.List[int]
+    number_of_hashes: typing.List[int]
+    content_digest: str
+    filter_type: str = bloom_bits.STANDARD_FILTER_TYPE
+    hash_backend_parameters: typing.Dict[str, typing.Any] = dataclasses.field(default_factory=dict)
+
+    @property
+    def filter_count(self) -> int:
+        """
+        Retrieves the number of Bloom Filters in the template.
+
+        :returns: The number of filters.
+        """
+        return len(self.filter_sizes)
+
+
 class EEGTemplateDataSerializer(typing.Generic[D]):
     """
     Serializer for EEG template data. Capable of storing the data in a string format, and then recovering the stored
-    data back into a template instance.
+    data back into a template instance. Optionally, the bytes of each filter can be compressed, in which case each
+    filter is stored with whichever registered codec produces the smallest output.
+
+    Serialized templates start with a metadata header (the first key of the JSON object), so that the metadata can be
+    peeked at without parsing or decoding the filters. Values shared by every filter (e.g., the hash backend, filter
+    size and number of hashes) are stored once in the header, and per-filter lists are only stored when the filters
+    differ. Templates serialized without the header are still supported.
+    The serialized parameters of the hash backend (if any) are stored as well, and used when deserializing, as is the
+    signature of the template (if any).
     """
     SERIALIZATION_ENCODING = 'utf-8'
+    SERIALIZE_METADATA_KEY = 'metadata'
     SERIALIZE_FILTER_KEY = 'filters'
     SERIALIZE_SEGMENT_RATIO_KEY = 'segment_ratio'
     SERIALIZE_ROW_WISE_KEY = 'row_wise'
-    SERIALIZED_FILTER_PATTERN = r'^(?P<filter_bytes>[^:]+):(?P<hash_backend>[a-z]+)$'
+    SERIALIZE_FILTER_TYPE_KEY = 'filter_type'
+    SERIALIZE_BACKEND_PARAMETERS_KEY = 'backend_parameters'
+    SERIALIZE_SIGNATURE_KEY = 'signature'
+    SERIALIZED_FILTER_PATTERN = r'^(?P<filter_bytes>[^:]+):(?P<hash_backend>[a-z0-9_]+)(?::(?P<codec>[a-z0-9_]+))?$'
+    METADATA_FILTER_COUNT_KEY = 'filter_count'
+    # Per-filter metadata fields, along with the header key used when the value is shared by every filter.
+    METADATA_SHARED_KEYS = {'hash_backends': 'hash_backend', 'filter_sizes': 'filter_size',
+                            'number_of_hashes': 'filter_hashes'}
+    CONTENT_DIGEST_SIZE = 16
 
-    def __init__(self, constructor: typing.Type[D]):
+    def __init__(self, constructor: typing.Type[D], compress=False):
         self._filter_data_regex = re.compile(self.SERIALIZED_FILTER_PATTERN)
         self._constructor = constructor
+        self._compress = compress
 
     def serialize(self, data: D) -> str:
         """
@@ -33,11 +79,21 @@ class EEGTemplateDataSerializer(typing.Generic[D]):
         :param data: The data to serialize.
         :returns: A serialized template data string.
         """
+        filter_bytes = [bloom_filter.save_bytes() for bloom_filter in data.bloom_filters]
         data_map = {
-            self.SERIALIZE_FILTER_KEY: self._serialize_filters(data.bloom_filters),
+            self.SERIALIZE_METADATA_KEY: self._serialize_metadata(self._make_metadata(data, filter_bytes)),
+            self.SERIALIZE_FILTER_KEY: self._serialize_filters(data.bloom_filters, filter_bytes),
             self.SERIALIZE_SEGMENT_RATIO_KEY: data.segment_ratio,
-            self.SERIALIZE_ROW_WISE_KEY: data.row_wise
+            self.SERIALIZE_ROW_WISE_KEY: data.row_wise,
+            self.SERIALIZE_FILTER_TYPE_KEY: self._get_filter_type(data.bloom_filters)
         }
+        backend_parameters = self._get_backend_parameters(data.bloom_filters)
+        if backend_parameters:
+            data_map[self.SERIALIZE_BACKEND_PARAMETERS_KEY] = backend_parameters
+        if data.signature is not None:
+            signature_bytes = np.asarray(data.signature, dtype=signature.SIGNATURE_DTYPE).tobytes()
+            serialized_signature = base64.b64encode(signature_bytes).decode(self.SERIALIZATION_ENCODING)
+            data_map[self.SERIALIZE_SIGNATURE_KEY] = serialized_signature
         return json.dumps(data_map)
 
     def deserialize(self, data: str,  backend_kwargs: dict = None) -> D:
@@ -45,17 +101,56 @@ class EEGTemplateDataSerializer(typing.Generic[D]):
         Recovers the given serialized template data string into a template data instance.
 
         :param data: The serialized template data string.
-        :param backend_kwargs: Additional keyword arguments to pass down to the hashing backend(s) that are initialized.
+        :param backend_kwargs: Additional keyword arguments to pass down to the hashing backend(s) that are initialized,
+                               which take precedence over the serialized parameters of the backend.
         :returns: The template data instance.
         """
-        if backend_kwargs is None:
-            backend_kwargs = {}
         parsed_data = json.loads(data)
         self.validate_serialized_data(parsed_data)
-        bloom_filters = self._deserialize_filters(parsed_data[self.SERIALIZE_FILTER_KEY], **backend_kwargs)
+        backend_kwargs = {**parsed_data.get(self.SERIALIZE_BACKEND_PARAMETERS_KEY, {}), **(backend_kwargs or {})}
+        filter_class = blocked_bloom.get_filter_class(self._get_serialized_filter_type(parsed_data))
+        bloom_filters = self._deserialize_filters(
+            parsed_data[self.SERIALIZE_FILTER_KEY], filter_class, **backend_kwargs
+        )
         segment_ratio = float(parsed_data[self.SERIALIZE_SEGMENT_RATIO_KEY])
         row_wise = bool(parsed_data[self.SERIALIZE_ROW_WISE_KEY])
-        return self._constructor(bloom_filters=bloom_filters, segment_ratio=segment_ratio, row_wise=row_wise)
+        return self._constructor(bloom_filters=bloom_filters, segment_ratio=segment_ratio, row_wise=row_wise,
+                                 signature=self._deserialize_signature(parsed_data))
+
+    def peek_metadata(self, data: str) -> TemplateMetadata:
+        """
+        Reads the metadata of the given serialized template data string, without decoding its Bloom Filters or
+        initializing any hashing backend. Only the metadata header is parsed, unless the data was serialized without
+        one, in which case the metadata is recovered from the raw filter data.
+
+        :param data: The serialized template data string.
+        :returns: The metadata of the template.
+        :raises InvalidSerializationFormat: If the data string is in the wrong format for deserialization.
+        """
+        header_prefix = json.dumps({self.SERIALIZE_METADATA_KEY: None})[:-len('null}')]
+        if data.startswith(header_prefix):
+            try:
+                metadata, _ = json.JSONDecoder().raw_decode(data, len(header_prefix))
+                return self._deserialize_metadata(metadata)
+            except (ValueError, TypeError, KeyError) as e:
+                raise exceptions.InvalidSerializationFormat(f'Invalid metadata header: {e}') from e
+
+        parsed_data = json.loads(data)
+        self.validate_serialized_data(parsed_data)
+        hash_backends = []
+        filter_bytes = []
+        for serialized_filter in parsed_data[self.SERIALIZE_FILTER_KEY]:
+            backend_key, bloom_bytes = self._decode_bloom_data(serialized_filter)
+            hash_backends.append(backend_key)
+            filter_bytes.append(bloom_bytes)
+        return self._make_filter_metadata(
+            hash_backends,
+            filter_bytes,
+            float(parsed_data[self.SERIALIZE_SEGMENT_RATIO_KEY]),
+            bool(parsed_data.get(self.SERIALIZE_ROW_WISE_KEY, True)),
+            self._get_serialized_filter_type(parsed_data),
+            parsed_data.get(self.SERIALIZE_BACKEND_PARAMETERS_KEY, {})
+        )
 
     def validate_serialized_data(self, serialization_data: str):
         """
@@ -82,29 +177,196 @@ class EEGTemplateDataSerializer(typing.Generic[D]):
             raise exceptions.InvalidSerializationFormat(
                 f'Expected segment ratio to a number, got {type(serialization_data[self.SERIALIZE_SEGMENT_RATIO_KEY])}.'
             )
+        filter_type = self._get_serialized_filter_type(serialization_data)
+        try:
+            blocked_bloom.get_filter_class(filter_type)
+        except ValueError as e:
+            raise exceptions.InvalidSerializationFormat(str(e)) from e
+        if not isinstance(serialization_data.get(self.SERIALIZE_BACKEND_PARAMETERS_KEY, {}), dict):
+            raise exceptions.InvalidSerializationFormat(
+                f'Expected backend parameters to be an object, '
+                f'got {type(serialization_data[self.SERIALIZE_BACKEND_PARAMETERS_KEY])}.'
+            )
+
+    def _deserialize_signature(self, serialization_data: dict) -> typing.Optional[np.ndarray]:
+        """
+        Helper method which decodes the signature of the given serialized data, if any.
+
+        :param serialization_data: The serialized data.
+        :returns: The signature, or None if the data was serialized without one.
+        :raises InvalidSerializationFormat: If the signature cannot be decoded.
+        """
+        serialized_signature = serialization_data.get(self.SERIALIZE_SIGNATURE_KEY)
+        if serialized_signature is None:
+            return None
+        try:
+            signature_bytes = base64.b64decode(serialized_signature, validate=True)
+            return np.frombuffer(signature_bytes, dtype=signature.SIGNATURE_DTYPE).copy()
+        except (TypeError, ValueError) as e:
+            raise exceptions.InvalidSerializationFormat(f'Invalid template signature: {e}') from e
 
-    def _serialize_filters(self, bloom_filters: typing.List[rbloom.Bloom]) -> typing.List[str]:
+    def _serialize_metadata(self, metadata: TemplateMetadata) -> typing.Dict[str, typing.Any]:
+        """
+        Helper method which converts template metadata into a metadata header. Per-filter values shared by every
+        filter are stored once, and fields holding their default value are left out.
+
+        :param metadata: The metadata.
+        :returns: The metadata header.
+        """
+        header = {self.METADATA_FILTER_COUNT_KEY: metadata.filter_count}
+        for field in dataclasses.fields(metadata):
+            value = getattr(metadata, field.name)
+            shared_key = self.METADATA_SHARED_KEYS.get(field.name)
+            default = field.default if field.default_factory is dataclasses.MISSING else field.default_factory()
+            if shared_key is not None and value and all(item == value[0] for item in value):
+                header[shared_key] = value[0]
+            elif value != default:
+                header[field.name] = value
+        return header
+
+    def _deserialize_metadata(self, header: typing.Dict[str, typing.Any]) -> TemplateMetadata:
+        """
+        Helper method which recovers template metadata from a metadata header. Headers written before shared values
+        were stored once (i.e., without a filter count) hold the metadata fields as they are.
+
+        :param header: The metadata header.
+        :returns: The metadata.
+        """
+        metadata = dict(header)
+        filter_count = metadata.pop(self.METADATA_FILTER_COUNT_KEY, None)
+        if filter_count is not None:
+            for field_name, shared_key in self.METADATA_SHARED_KEYS.items():
+                if shared_key in metadata:
+                    metadata[field_name] = [metadata.pop(shared_key)] * filter_count
+                metadata.setdefault(field_name, [])
+        return TemplateMetadata(**metadata)
+
+    def _make_metadata(self, data: D, filter_bytes: typing.List[bytes]) -> TemplateMetadata:
+        """
+        Helper method which gathers the metadata of the given template data.
+
+        :param data: The template data.
+        :param filter_bytes: The bytes of each filter of the template.
+        :returns: The metadata.
+        """
+        hash_backends = [
+            backend.BaseBloomFilterHashBackend.get_implementation_key(type(bloom_filter.hash_func))
+            for bloom_filter in data.bloom_filters
+        ]
+        return self._make_filter_metadata(
+            hash_backends,
+            filter_bytes,
+            data.segment_ratio,
+            data.row_wise,
+            self._get_filter_type(data.bloom_filters),
+            self._get_backend_parameters(data.bloom_filters)
+        )
+
+    @staticmethod
+    def _make_filter_metadata(hash_backends: typing.List[str],
+                              filter_bytes: typing.List[bytes],
+                              segment_ratio: float,
+                              row_wise: bool,
+                              filter_type: str,
+                              hash_backend_parameters: typing.Dict[str, typing.Any]) -> TemplateMetadata:
+        """
+        Helper method which gathers template metadata from the (uncompressed) bytes of its Bloom Filters. The content
+        digest covers the backend key and bytes of every filter, so that it does not depend on the compression used.
+
+        :param hash_backends: The key of the hash backend of each filter.
+        :param filter_bytes: The bytes of each filter.
+        :param segment_ratio: The segment ratio of the template.
+        :param row_wise: Flag indicating whether the template uses row wise or column wise analysis.
+        :param filter_type: The type of the filters of the template.
+        :param hash_backend_parameters: The serialized parameters of the hash backend of the filters.
+        :returns: The metadata.
+        """
+        digest = hashlib.blake2b(digest_size=EEGTemplateDataSerializer.CONTENT_DIGEST_SIZE)
+        for backend_key, bloom_bytes in zip(hash_backends, filter_bytes):
+            digest.update(f'{backend_key}:{len(bloom_bytes)}:'.encode(EEGTemplateDataSerializer.SERIALIZATION_ENCODING))
+            digest.update(bloom_bytes)
+        return TemplateMetadata(
+            hash_backends=hash_backends,
+            segment_ratio=segment_ratio,
+            row_wise=row_wise,
+            filter_sizes=[(len(bloom_bytes) - bloom_bits.K_PREFIX_SIZE) * 8 for bloom_bytes in filter_bytes],
+            number_of_hashes=[bloom_bits.split_filter_bytes(bloom_bytes)[0] for bloom_bytes in filter_bytes],
+            content_digest=digest.hexdigest(),
+            filter_type=filter_type,
+            hash_backend_parameters=hash_backend_parameters
+        )
+
+    @staticmethod
+    def _get_filter_type(bloom_filters: typing.List[rbloom.Bloom]) -> str:
+        """
+        Helper method which determines the type shared by the given Bloom Filters.
+
+        :param bloom_filters: The filters.
+        :returns: The type of the filters.
+        :raises ValueError: If the filters are of different types.
+        """
+        filter_types = {bloom_bits.get_filter_type(bloom_filter) for bloom_filter in bloom_filters}
+        if len(filter_types) > 1:
+            raise ValueError('Templates mixing Bloom Filter types are not supported for serialization.')
+        if not filter_types:
+            return bloom_bits.STANDARD_FILTER_TYPE
+        return filter_types.pop()
+
+    @staticmethod
+    def _get_backend_parameters(bloom_filters: typing.List[rbloom.Bloom]) -> typing.Dict[str, typing.Any]:
+        """
+        Helper method which determines the serialized parameters shared by the hash backends of the given Bloom Filters.
+
+        :param bloom_filters: The filters.
+        :returns: The parameters of the hash backends.
+        :raises ValueError: If the hash backends of the filters have different parameters.
+        """
+        backend_parameters = [
+            getattr(bloom_filter.hash_func, 'serialized_parameters', {}) for bloom_filter in bloom_filters
+        ]
+        if any(parameters != backend_parameters[0] for parameters in backend_parameters[1:]):
+            raise ValueError('Templates mixing hash backend parameters are not supported for serialization.')
+        return dict(backend_parameters[0]) if backend_parameters else {}
+
+    def _get_serialized_filter_type(self, serialization_data: dict) -> str:
+        """
+        Helper method which retrieves the type of the filters of the given serialized data. Data serialized before
+        filter types were recorded uses standard filters.
+
+        :param serialization_data: The serialized data.
+        :returns: The type of the filters.
+        """
+        return serialization_data.get(self.SERIALIZE_FILTER_TYPE_KEY, bloom_bits.STANDARD_FILTER_TYPE)
+
+    def _serialize_filters(self,
+                           bloom_filters: typing.List[rbloom.Bloom],
+                           filter_bytes: typing.List[bytes]) -> typing.List[str]:
         """
         Helper method which serializes the given list of Bloom Filters into a series of data strings.
 
         :param bloom_filters: The filters to serialize.
+        :param filter_bytes: The bytes of each filter.
         :returns: A series of data strings, representing the serialized Bloom Filters.
         """
         bloom_filter_data = []
-        for bloom_filter in bloom_filters:
-            bloom_filter_data.append(self._serialize_bloom_data(bloom_filter))
+        for bloom_filter, bloom_bytes in zip(bloom_filters, filter_bytes):
+            bloom_filter_data.append(self._serialize_bloom_data(bloom_filter, bloom_bytes))
         return bloom_filter_data
 
-    def _serialize_bloom_data(self, bloom_filter: rbloom.Bloom) -> str:
+    def _serialize_bloom_data(self, bloom_filter: rbloom.Bloom, filter_bytes: bytes) -> str:
         """
         Serializes the given Bloom Filter into a data string, which is: the base64 encoded bytes of the filter and
         the name of the hashing backend used for the filter. This allows for the Bloom Filter to be instantiated
-        with the same data as it originally had, including the hashing implementation used.
+        with the same data as it originally had, including the hashing implementation used. If the filter bytes are
+        compressed, the key of the codec used is appended to the data string.
 
         :param bloom_filter: The Bloom Filter to be serialized.
+        :param filter_bytes: The bytes of the Bloom Filter.
         :returns: The data string corresponding to the Bloom Filter.
         """
-        filter_bytes = bloom_filter.save_bytes()
+        codec_key = compression.RawFilterCodec.codec_key
+        if self._compress:
+            codec_key, filter_bytes = compression.BaseFilterCodec.encode_smallest(filter_bytes)
         bytes_b64 = base64.b64encode(filter_bytes)
         serialized_filter = bytes_b64.decode(self.SERIALIZATION_ENCODING)
         hash_backend = type(bloom_filter.hash_func)
@@ -114,34 +376,58 @@ class EEGTemplateDataSerializer(typing.Generic[D]):
                 f'are not supported for serialization.'
             )
         backend_implementation_key = backend.BaseBloomFilterHashBackend.get_implementation_key(hash_backend)
-        return f'{serialized_filter}:{backend_implementation_key}'
+        if codec_key == compression.RawFilterCodec.codec_key:
+            return f'{serialized_filter}:{backend_implementation_key}'
+        return f'{serialized_filter}:{backend_implementation_key}:{codec_key}'
 
-    def _deserialize_filters(self, bloom_filter_data: typing.List[str], **kwargs) -> typing.List[rbloom.Bloom]:
+    def _deserialize_filters(self,
+                             bloom_filter_data: typing.List[str],
+                             filter_class: type = rbloom.Bloom,
+                             **kwargs) -> typing.List[rbloom.Bloom]:
         """
         Re-creates a list of Bloom Filters from the given list of Bloom Filter data strings.
 
         :param bloom_filter_data: List of data strings representing the Bloom Filters to be instantiated.
+        :param filter_class: The class of the Bloom Filters to instantiate.
         :param kwargs: Additional keyword arguments to be passed to the Bloom Filter deserialization method.
         :returns: The list of Bloom Filters.
         """
         bloom_filters = []
         for serialized_filter in bloom_filter_data:
-            bloom_filters.append(self._deserialize_bloom_data(serialized_filter, **kwargs))
+            bloom_filters.append(self._deserialize_bloom_data(serialized_filter, filter_class, **kwargs))
         return bloom_filters
 
-    def _deserialize_bloom_data(self, serialized_data: str, **kwargs) -> rbloom.Bloom:
+    def _deserialize_bloom_data(self,
+                                serialized_data: str,
+                                filter_class: type = rbloom.Bloom,
+                                **kwargs) -> rbloom.Bloom:
         """
         Re-creates a Bloom Filter using the given data string.
 
         :param serialized_data: The data string to use to re-create the Bloom Filter.
+        :param filter_class: The class of the Bloom Filter to instantiate.
         :param kwargs: Additional keyword arguments to pass to the hash backend used in the Bloom Filter.
         :returns: The re-created Bloom Filter.
         """
+        backend_key, bloom_bytes = self._decode_bloom_data(serialized_data)
+        backend_cls = backend.BaseBloomFilterHashBackend.get_implementation(backend_key)
+        filter_backend = backend_cls(**kwargs)
+        return filter_class.load_bytes(bloom_bytes, filter_backend)
+
+    def _decode_bloom_data(self, serialized_data: str) -> typing.Tuple[str, bytes]:
+        """
+        Decodes the given Bloom Filter data string into the key of its hash backend and the (uncompressed) bytes of
+        the filter.
+
+        :param serialized_data: The data string to decode.
+        :returns: The key of the hash backend and the bytes of the filter.
+        """
         filter_data = self._filter_data_regex.match(str(serialized_data))
         if not filter_data:
             raise ValueError('Invalid filter data format.')
         bloom_bytes = base64.b64decode(filter_data.group('filter_bytes'))
-        backend_key = filter_data.group('hash_backend')
-        backend_cls = backend.BaseBloomFilterHashBackend.get_implementation(backend_key)
-        filter_backend = backend_cls(**kwargs)
-        return rbloom.Bloom.load_bytes(bloom_bytes, filter_backend)
+        codec_key = filter_data.group('codec')
+        if codec_key is not None:
+            codec = compression.BaseFilterCodec.get_implementation(codec_key)
+            bloom_bytes = codec().decode(bloom_bytes)
+        return filter_data.group('hash_backend'), bloom_bytes
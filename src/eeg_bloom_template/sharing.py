@@ -0,0 +1,176 @@
+import dataclasses
+import typing
+import rbloom
+import numpy as np
+from multiprocessing import shared_memory
+
+from . import base, blocked_bloom, signature
+from .utils import bloom_bits
+
+
+@dataclasses.dataclass
+class TemplateLayout:
+    """
+    Description of a template whose Bloom Filter bytes are stored separately, in a single buffer (i.e., everything but
+    the filter bytes). Layouts are small, and can be pickled cheaply: hash functions are pickled as they are, so hash
+    backends keep their parameters (e.g., a seed or token), unlike with serialized templates.
+    """
+    template_class: typing.Type[base.BaseEEGTemplateData]
+    segment_ratio: float
+    row_wise: bool
+    filter_types: typing.List[str]
+    hash_functions: typing.List[typing.Callable[[typing.Any], int]]
+    filter_lengths: typing.List[int]
+    signature_bytes: typing.Optional[bytes] = None
+
+    @property
+    def number_of_bytes(self) -> int:
+        """
+        Retrieves the size of the buffer holding the bytes of the Bloom Filters.
+
+        :returns: The number of bytes.
+        """
+        return sum(self.filter_lengths)
+
+    @classmethod
+    def from_template(cls, template: base.BaseEEGTemplateData) -> typing.Tuple['TemplateLayout', bytes]:
+        """
+        Splits the given template into its layout and the bytes of its Bloom Filters.
+
+        :param template: The template.
+        :returns: The layout of the template, and the concatenated bytes of its filters.
+        """
+        filter_bytes = [bloom_filter.save_bytes() for bloom_filter in template.bloom_filters]
+        layout = cls(
+            template_class=type(template),
+            segment_ratio=template.segment_ratio,
+            row_wise=template.row_wise,
+            filter_types=[bloom_bits.get_filter_type(bloom_filter) for bloom_filter in template.bloom_filters],
+            hash_functions=[bloom_filter.hash_func for bloom_filter in template.bloom_filters],
+            filter_lengths=[len(bloom_bytes) for bloom_bytes in filter_bytes],
+            signature_bytes=None if template.signature is None else template.signature.tobytes()
+        )
+        return layout, b''.join(filter_bytes)
+
+    def load(self, buffer: typing.Union[bytes, memoryview]) -> base.BaseEEGTemplateData:
+        """
+        Re-creates the template from the bytes of its Bloom Filters. The bytes are copied into the filters, so the
+        buffer can be released once the template is loaded.
+
+        :param buffer: A buffer holding the concatenated bytes of the filters.
+        :returns: The template.
+        :raises ValueError: If the buffer does not match the layout.
+        """
+        buffer = memoryview(buffer).cast('B')
+        if len(buffer) != self.number_of_bytes:
+            raise ValueError(f'Expected {self.number_of_bytes} bytes of Bloom Filter data, got {len(buffer)}.')
+        bloom_filters: typing.List[rbloom.Bloom] = []
+        offset = 0
+        for filter_type, hash_function, length in zip(self.filter_types, self.hash_functions, self.filter_lengths):
+            filter_class = blocked_bloom.get_filter_class(filter_type)
+            bloom_filters.append(filter_class.load_bytes(bytes(buffer[offset:offset + length]), hash_function))
+            offset += length
+        return self.template_class(
+            bloom_filters=bloom_filters, segment_ratio=self.segment_ratio, row_wise=self.row_wise,
+            signature=self._load_signature()
+        )
+
+    def _load_signature(self) -> typing.Optional[np.ndarray]:
+        """
+        Helper method which re-creates the signature of the template. Signatures are kept as bytes in layouts, so that
+        they are pickled along with the layout (rather than as a separate buffer).
+
+        :returns: The signature, or None if the template has no signature.
+        """
+        if self.signature_bytes is None:
+            return None
+        return np.frombuffer(self.signature_bytes, dtype=signature.SIGNATURE_DTYPE).copy()
+
+
+def load_template(layout: TemplateLayout, buffer: typing.Union[bytes, memoryview]) -> base.BaseEEGTemplateData:
+    """
+    Re-creates a template from its layout and the bytes of its Bloom Filters. This is a module level function, so that
+    it can be used to unpickle templates.
+
+    :param layout: The layout of the template.
+    :param buffer: A buffer holding the concatenated bytes of the filters.
+    :returns: The template.
+    """
+    return layout.load(buffer)
+
+
+@dataclasses.dataclass
+class SharedTemplateHandle:
+    """
+    Handle to a set of templates published in shared memory, which can be sent to worker processes instead of the
+    templates themselves. Only the layouts of the templates are pickled with the handle, the bytes of their Bloom
+    Filters are read from shared memory when the templates are loaded.
+    """
+    name: str
+    layouts: typing.List[TemplateLayout]
+    offsets: typing.List[int]
+
+    def __len__(self) -> int:
+        return len(self.layouts)
+
+    def load(self, indexes: typing.Optional[typing.Iterable[int]] = None) -> typing.List[base.BaseEEGTemplateData]:
+        """
+        Attaches to the shared memory of the templates, and loads the templates from it. The shared memory is detached
+        once the templates are loaded.
+
+        :param indexes: The indexes of the templates to load (all of the templates, by default).
+        :returns: The templates, in the order of the indexes.
+        """
+        if indexes is None:
+            indexes = range(len(self.layouts))
+        memory = shared_memory.SharedMemory(name=self.name)
+        try:
+            templates = []
+            for template_idx in indexes:
+                layout = self.layouts[template_idx]
+                offset = self.offsets[template_idx]
+                templates.append(layout.load(memory.buf[offset:offset + layout.number_of_bytes]))
+            return templates
+        finally:
+            memory.close()
+
+
+class SharedTemplateSet:
+    """
+    Publishes a set of templates into a single block of shared memory (see multiprocessing.shared_memory), so that
+    workers of a process pool can load them from a small handle, without pickling or deserializing their Bloom Filters.
+    The shared memory lives until the set is closed (or its context is exited), which must happen after the workers
+    are done loading templates. Workers should be started by the publishing process (e.g., a process pool), which
+    manages the shared memory.
+    """
+    def __init__(self, templates: typing.Sequence[base.BaseEEGTemplateData]):
+        layouts = []
+        buffers = []
+        offsets = []
+        offset = 0
+        for template in templates:
+            layout, buffer = TemplateLayout.from_template(template)
+            layouts.append(layout)
+            buffers.append(buffer)
+            offsets.append(offset)
+            offset += len(buffer)
+        # Shared memory blocks cannot be empty.
+        self._memory = shared_memory.SharedMemory(create=True, size=max(1, offset))
+        for buffer_offset, buffer in zip(offsets, buffers):
+            self._memory.buf[buffer_offset:buffer_offset + len(buffer)] = buffer
+        self.handle = SharedTemplateHandle(name=self._memory.name, layouts=layouts, offsets=offsets)
+
+    def __enter__(self) -> 'SharedTemplateSet':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Releases the shared memory of the templates. Handles to the templates can no longer be loaded afterwards.
+        """
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
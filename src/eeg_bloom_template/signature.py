@@ -0,0 +1,53 @@
+import typing
+import numpy as np
+
+
+DEFAULT_SIGNATURE_SIZE = 32
+SIGNATURE_DTYPE = np.dtype('<u4')
+_SIGNATURE_SHIFT = np.uint64(32)
+
+
+def hash_codes_to_signature_values(hash_codes: np.ndarray) -> np.ndarray:
+    """
+    Reduces hash codes (as computed by bloom_bits.hash_values) to the distinct 32-bit values used in signatures.
+
+    :param hash_codes: An array of hash codes, with a trailing dimension of 2.
+    :returns: The distinct signature values of the hash codes, sorted.
+    """
+    return np.unique((hash_codes[..., 0] >> _SIGNATURE_SHIFT).astype(SIGNATURE_DTYPE))
+
+
+def compute_signature(hash_codes: typing.Iterable[np.ndarray],
+                      signature_size: int = DEFAULT_SIGNATURE_SIZE) -> np.ndarray:
+    """
+    Computes the signature of a template from the hash codes of its segment averages. The signature is a bottom-k
+    sketch: the smallest (distinct) values among the hash codes, which are a uniform sample of the values of the
+    template. The fraction of the signature found among the hash codes of a probe estimates the fraction of the values
+    of the template found in the probe, for the cost of a lookup per signature value. As the values are hashed with the
+    hash backend of the template, signatures can only be matched by hashing data with the same backend (e.g., the same
+    seed or token), as is the case for the Bloom Filters.
+
+    :param hash_codes: The hash codes of the averaged values of each segment (see bloom_bits.hash_values).
+    :param signature_size: The maximum number of values in the signature. Larger signatures give better estimates.
+    :returns: The signature, as a sorted array of up to signature_size 32-bit values.
+    """
+    if signature_size < 1:
+        raise ValueError(f'Signature size must be at least 1 (got {signature_size}).')
+    # The values of every segment are reduced together, in a single pass.
+    segment_codes = [np.reshape(codes, (-1, 2)) for codes in hash_codes]
+    if not segment_codes:
+        return np.empty(0, dtype=SIGNATURE_DTYPE)
+    return hash_codes_to_signature_values(np.concatenate(segment_codes))[:signature_size]
+
+
+def merge_signatures(signatures: typing.Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Merges the signatures of templates into the signature of the union of their values (e.g., the signature of a
+    template merged in union mode). The smallest values of a union are among the smallest values of its parts, so the
+    merged signature is the same as if it was computed from the values of every template.
+
+    :param signatures: The signatures to merge, which should have been computed with the same signature size.
+    :returns: The merged signature, holding as many values as the largest of the signatures.
+    """
+    signature_size = max(len(signature) for signature in signatures)
+    return np.unique(np.concatenate(signatures))[:signature_size].astype(SIGNATURE_DTYPE)
@@ -0,0 +1,217 @@
+import dataclasses
+import math
+import typing
+import rbloom
+
+from . import blocked_bloom
+from .utils import bloom_bits
+
+
+_LN_2 = math.log(2)
+
+
+@dataclasses.dataclass(frozen=True)
+class BloomFilterSizingPolicy:
+    """
+    Policy controlling how the Bloom Filters of a template are sized. By default, each filter is sized to hold twice
+    the number of items it is given at the requested false positive rate. A target number of bits for the whole
+    template, and/or a maximum number of bytes per filter, can be given in order to bound template memory usage. When
+    the number of bits is bounded, the false positive rate of the filters is adjusted to fit the bits available.
+    Blocked filters are stored as whole blocks, so their number of bits is bounded to a whole number of blocks (and at
+    least one block, even if that exceeds the bound).
+    """
+    capacity_multiplier: float = 2
+    target_bits_per_template: typing.Optional[int] = None
+    max_bytes_per_filter: typing.Optional[int] = None
+
+    def __post_init__(self):
+        if self.capacity_multiplier <= 0:
+            raise ValueError(f'Capacity multiplier must be greater than 0 (got {self.capacity_multiplier}).')
+        if self.target_bits_per_template is not None and self.target_bits_per_template <= 0:
+            raise ValueError(f'Target bits per template must be greater than 0 (got {self.target_bits_per_template}).')
+        if self.max_bytes_per_filter is not None and self.max_bytes_per_filter <= 0:
+            raise ValueError(f'Maximum bytes per filter must be greater than 0 (got {self.max_bytes_per_filter}).')
+
+    def get_filter_parameters(self,
+                              number_of_items: int,
+                              number_of_filters: int,
+                              false_positive_rate: float,
+                              filter_type: str = bloom_bits.STANDARD_FILTER_TYPE) -> typing.Tuple[int, float]:
+        """
+        Calculates the parameters to use to instantiate a Bloom Filter, given the number of items the filter will hold.
+
+        :param number_of_items: The number of items that will be added to the filter.
+        :param number_of_filters: The total number of filters in the template the filter belongs to.
+        :param false_positive_rate: The requested false positive rate of the filter.
+        :param filter_type: The type of the filter, either 'standard' or 'blocked'.
+        :returns: The expected number of items and false positive rate to instantiate the filter with.
+        """
+        expected_items = max(1, math.ceil(number_of_items * self.capacity_multiplier))
+        bit_budget = self._get_bit_budget(number_of_filters, filter_type)
+        if bit_budget is None:
+            return expected_items, false_positive_rate
+        default_size = self.get_size_in_bits(expected_items, false_positive_rate)
+        if self.target_bits_per_template is None and default_size <= bit_budget:
+            # Only a maximum size was given, which the filter already fits in.
+            return expected_items, false_positive_rate
+        # The number of hash functions used by a filter is (bits / items) * ln(2), so the expected number of items is
+        # bounded to ensure at least one hash function is used.
+        expected_items = max(1, min(expected_items, math.floor(bit_budget * _LN_2)))
+        adjusted_rate = math.exp(-bit_budget * _LN_2 ** 2 / expected_items)
+        return expected_items, adjusted_rate
+
+    def make_filter(self,
+                    number_of_items: int,
+                    number_of_filters: int,
+                    false_positive_rate: float,
+                    hash_func: typing.Callable,
+                    filter_type: str = bloom_bits.STANDARD_FILTER_TYPE) -> rbloom.Bloom:
+        """
+        Instantiates an empty Bloom Filter sized according to the policy.
+
+        :param number_of_items: The number of items that will be added to the filter.
+        :param number_of_filters: The total number of filters in the template the filter belongs to.
+        :param false_positive_rate: The requested false positive rate of the filter.
+        :param hash_func: The hash function to use for the filter.
+        :param filter_type: The type of Bloom Filter to instantiate, either 'standard' or 'blocked'.
+        :returns: The Bloom Filter.
+        """
+        expected_items, filter_rate = self.get_filter_parameters(
+            number_of_items, number_of_filters, false_positive_rate, filter_type
+        )
+        filter_class = blocked_bloom.get_filter_class(filter_type)
+        return filter_class(expected_items, filter_rate, hash_func)
+
+    @staticmethod
+    def get_size_in_bits(expected_items: int, false_positive_rate: float) -> float:
+        """
+        Calculates the optimal number of bits for a Bloom Filter holding the given number of items at the given false
+        positive rate.
+
+        :param expected_items: The expected number of items in the filter.
+        :param false_positive_rate: The false positive rate of the filter.
+        :returns: The number of bits.
+        """
+        return -expected_items * math.log(false_positive_rate) / _LN_2 ** 2
+
+    def _get_bit_budget(self, number_of_filters: int, filter_type: str) -> typing.Optional[int]:
+        """
+        Helper method which calculates the number of bits available to each filter under the policy.
+
+        :param number_of_filters: The total number of filters in the template.
+        :param filter_type: The type of the filters.
+        :returns: The number of bits available to each filter, or None if the policy does not bound the filter size.
+        """
+        budgets = []
+        if self.target_bits_per_template is not None:
+            budgets.append(self.target_bits_per_template // max(1, number_of_filters))
+        if self.max_bytes_per_filter is not None:
+            budgets.append(self.max_bytes_per_filter * 8)
+        if not budgets:
+            return None
+        if filter_type == bloom_bits.BLOCKED_FILTER_TYPE:
+            # Blocked filters are stored as whole blocks, so at least one block is always used.
+            block_size = bloom_bits.BLOCK_SIZE_IN_BITS
+            return max(block_size, min(budgets) // block_size * block_size)
+        # Filters are stored as whole bytes, so at least one byte is always used.
+        return max(8, min(budgets))
+
+
+@dataclasses.dataclass
+class FilterFootprint:
+    """
+    Simple container describing the memory footprint of a single Bloom Filter.
+    """
+    size_in_bits: int
+    number_of_hashes: int
+    bits_set: int
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Calculates the number of bytes used by the filter's bit array.
+
+        :returns: The number of bytes.
+        """
+        return self.size_in_bits // 8
+
+    @property
+    def fill_ratio(self) -> float:
+        """
+        Calculates the ratio of set bits in the filter.
+
+        :returns: The fill ratio.
+        """
+        return self.bits_set / self.size_in_bits
+
+    @property
+    def estimated_false_positive_rate(self) -> float:
+        """
+        Estimates the false positive rate of the filter, based on its current fill ratio.
+
+        :returns: The estimated false positive rate.
+        """
+        return self.fill_ratio ** self.number_of_hashes
+
+    @classmethod
+    def from_bloom_filter(cls, bloom_filter: rbloom.Bloom) -> 'FilterFootprint':
+        """
+        Measures the footprint of the given Bloom Filter.
+
+        :param bloom_filter: The Bloom Filter to measure.
+        :returns: The footprint of the filter.
+        """
+        number_of_hashes, bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+        return cls(
+            size_in_bits=bloom_filter.size_in_bits,
+            number_of_hashes=number_of_hashes,
+            bits_set=bloom_bits.count_set_bits(bits)
+        )
+
+
+@dataclasses.dataclass
+class TemplateFootprint:
+    """
+    Simple container describing the memory footprint of the Bloom Filters in a template.
+    """
+    filters: typing.List[FilterFootprint]
+
+    @property
+    def bytes_per_filter(self) -> typing.List[int]:
+        """
+        Lists the number of bytes used by each filter in the template.
+
+        :returns: The number of bytes of each filter.
+        """
+        return [filter_footprint.nbytes for filter_footprint in self.filters]
+
+    @property
+    def total_bytes(self) -> int:
+        """
+        Calculates the total number of bytes used by the filters in the template.
+
+        :returns: The total number of bytes.
+        """
+        return sum(self.bytes_per_filter)
+
+    @property
+    def fill_ratio(self) -> float:
+        """
+        Calculates the ratio of set bits over all filters in the template.
+
+        :returns: The fill ratio.
+        """
+        total_bits = sum(filter_footprint.size_in_bits for filter_footprint in self.filters)
+        if total_bits == 0:
+            return 0.0
+        return sum(filter_footprint.bits_set for filter_footprint in self.filters) / total_bits
+
+    @classmethod
+    def from_bloom_filters(cls, bloom_filters: typing.List[rbloom.Bloom]) -> 'TemplateFootprint':
+        """
+        Measures the footprint of the given list of Bloom Filters.
+
+        :param bloom_filters: The Bloom Filters to measure.
+        :returns: The footprint of the filters.
+        """
+        return cls(filters=[FilterFootprint.from_bloom_filter(bloom_filter) for bloom_filter in bloom_filters])
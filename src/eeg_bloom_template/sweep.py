@@ -0,0 +1,257 @@
+import concurrent.futures
+import dataclasses
+import itertools
+import typing
+import numpy as np
+
+from . import backend, comparison, engine, evaluation, hash_cache, template
+from .utils import bloom_bits
+
+
+@dataclasses.dataclass(frozen=True)
+class SweepConfiguration:
+    """
+    A single combination of template parameters evaluated by a parameter sweep.
+    """
+    backend_name: str
+    segment_ratio: float
+    false_positive_ratio: float
+    row_wise: bool
+
+
+@dataclasses.dataclass
+class SweepResult:
+    """
+    Simple container for the evaluation results of a single sweep configuration.
+    """
+    configuration: SweepConfiguration
+    equal_error_rate: float
+    equal_error_threshold: float
+    genuine_mean_score: float
+    impostor_mean_score: float
+    mean_template_bytes: float
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Flattens the result into a dictionary, i.e., a row of a tidy results table.
+
+        :returns: The result, as a dictionary.
+        """
+        row = dataclasses.asdict(self.configuration)
+        row.update({
+            'equal_error_rate': self.equal_error_rate,
+            'equal_error_threshold': self.equal_error_threshold,
+            'genuine_mean_score': self.genuine_mean_score,
+            'impostor_mean_score': self.impostor_mean_score,
+            'mean_template_bytes': self.mean_template_bytes
+        })
+        return row
+
+
+class ParameterSweep:
+    """
+    Evaluates a grid of template parameters (hash backend, segment ratio, false positive ratio and orientation) over a
+    fixed set of enrollment and probe sessions. Intermediate stages are cached and shared between configurations: the
+    segment means of each enrollment session are computed once per segment ratio and orientation, the hash codes of the
+    segment means are computed once per hash backend, and each probe is prepared once, so that it is hashed once per
+    hash backend. Cached stages are kept between runs of the same sweep. Optionally, an on-disk cache of hash codes can
+    be given, so that the hash codes of the sessions are also kept between sweeps (e.g., in separate jobs over the same
+    recordings).
+    """
+    def __init__(self,
+                 enrollment_data: typing.Sequence[typing.List[np.ndarray]],
+                 enrollment_labels: typing.Sequence[typing.Hashable],
+                 probe_data: typing.Sequence[typing.List[np.ndarray]],
+                 probe_labels: typing.Sequence[typing.Hashable],
+                 backends: typing.Mapping[str, backend.BaseBloomFilterHashBackend],
+                 hash_code_cache: typing.Optional[hash_cache.HashCodeDiskCache] = None):
+        if len(enrollment_data) != len(enrollment_labels):
+            raise ValueError(f'Expected {len(enrollment_data)} enrollment labels, got {len(enrollment_labels)}.')
+        if len(probe_data) != len(probe_labels):
+            raise ValueError(f'Expected {len(probe_data)} probe labels, got {len(probe_labels)}.')
+        self._enrollment_data = list(enrollment_data)
+        self._enrollment_labels = list(enrollment_labels)
+        self._probes = [comparison.PreparedProbe(data, hash_code_cache=hash_code_cache) for data in probe_data]
+        self._probe_labels = list(probe_labels)
+        self._backends = dict(backends)
+        self._hash_code_cache = hash_code_cache
+        self._segment_means: typing.Dict[tuple, typing.List[np.ndarray]] = {}
+        self._mean_hash_codes: typing.Dict[tuple, typing.List[np.ndarray]] = {}
+
+    def run(self,
+            segment_ratios: typing.Iterable[float],
+            false_positive_ratios: typing.Iterable[float],
+            row_wise: typing.Iterable[bool] = (True,),
+            backend_names: typing.Optional[typing.Iterable[str]] = None,
+            processes: typing.Optional[int] = None) -> typing.List[SweepResult]:
+        """
+        Evaluates every combination of the given parameters.
+
+        :param segment_ratios: The segment ratios to evaluate.
+        :param false_positive_ratios: The false positive ratios to evaluate.
+        :param row_wise: The orientations to evaluate.
+        :param backend_names: The names of the hash backends to evaluate. By default, all backends of the sweep.
+        :param processes: The number of worker processes to use. By default, the sweep runs in this process. Each
+                          worker process computes the scores of a share of the configurations, against every probe.
+        :returns: The result of each configuration, in grid order.
+        """
+        if backend_names is None:
+            backend_names = list(self._backends)
+        configurations = [
+            SweepConfiguration(backend_name, segment_ratio, false_positive_ratio, orientation)
+            for backend_name, segment_ratio, false_positive_ratio, orientation in itertools.product(
+                backend_names, segment_ratios, false_positive_ratios, row_wise
+            )
+        ]
+        for configuration in configurations:
+            if configuration.backend_name not in self._backends:
+                raise ValueError(f'No backend named "{configuration.backend_name}" in the sweep.')
+
+        if processes is None or processes <= 1 or len(configurations) <= 1:
+            scores = self.compute_scores(configurations)
+        else:
+            scores = self._compute_scores_in_processes(configurations, processes)
+
+        return [self._summarize(configuration, *scores[configuration]) for configuration in configurations]
+
+    def compute_scores(self,
+                       configurations: typing.Sequence[SweepConfiguration],
+                       probe_indexes: typing.Optional[typing.Iterable[int]] = None
+                       ) -> typing.Dict[SweepConfiguration, tuple]:
+        """
+        Computes the score matrix of each of the given configurations, against the given probes.
+
+        :param configurations: The configurations to score.
+        :param probe_indexes: The indexes of the probes to score against. By default, every probe of the sweep.
+        :returns: The score matrix and mean template size of each configuration.
+        """
+        if probe_indexes is None:
+            probe_indexes = range(len(self._probes))
+        probe_indexes = list(probe_indexes)
+        scores = {}
+        for configuration in configurations:
+            templates = self.make_templates(configuration)
+            gallery = evaluation.TemplateGallery(templates)
+            score_matrix = np.zeros((len(templates), len(probe_indexes)), dtype=np.float64)
+            for column, probe_idx in enumerate(probe_indexes):
+                score_matrix[:, column] = gallery.score(self._probes[probe_idx])
+            template_bytes = np.mean([template_data.footprint().total_bytes for template_data in templates])
+            scores[configuration] = (score_matrix, float(template_bytes))
+        return scores
+
+    def make_templates(self, configuration: SweepConfiguration) -> typing.List[template.EEGTemplate]:
+        """
+        Creates the templates of every enrollment session for the given configuration, using cached segment means and
+        hash codes when available.
+
+        :param configuration: The configuration.
+        :returns: The templates, in enrollment order.
+        """
+        hash_backend = self._backends[configuration.backend_name]
+        data_engine = engine.EEGBloomFilterTemplateEngine(
+            hash_backend, configuration.segment_ratio, configuration.false_positive_ratio
+        )
+        templates = []
+        for enrollment_idx, enrollment_data in enumerate(self._enrollment_data):
+            means_key = (enrollment_idx, configuration.segment_ratio, configuration.row_wise)
+            if means_key not in self._segment_means:
+                self._segment_means[means_key] = data_engine.compute_segment_means(
+                    enrollment_data, row_wise=configuration.row_wise
+                )
+            hash_key = (hash_backend.identity,) + means_key
+            if hash_key not in self._mean_hash_codes:
+                self._mean_hash_codes[hash_key] = self._hash_segment_means(hash_backend, self._segment_means[means_key])
+            bloom_filters = data_engine.create_template_data_from_hash_codes(self._mean_hash_codes[hash_key])
+            templates.append(template.EEGTemplate(
+                bloom_filters=bloom_filters, segment_ratio=configuration.segment_ratio, row_wise=configuration.row_wise
+            ))
+        return templates
+
+    def _hash_segment_means(self,
+                            hash_backend: backend.BaseBloomFilterHashBackend,
+                            segment_means: typing.List[np.ndarray]) -> typing.List[np.ndarray]:
+        """
+        Helper method which hashes the segment means of an enrollment session, through the on-disk cache of the sweep
+        if it has one.
+
+        :param hash_backend: The hash backend.
+        :param segment_means: The segment means of the session.
+        :returns: The hash codes of each segment mean.
+        """
+        if self._hash_code_cache is None or not segment_means:
+            return [bloom_bits.hash_values(hash_backend, segment_mean) for segment_mean in segment_means]
+        return list(self._hash_code_cache.get_hash_codes(hash_backend, np.stack(segment_means)))
+
+    def _compute_scores_in_processes(self,
+                                     configurations: typing.Sequence[SweepConfiguration],
+                                     processes: int) -> typing.Dict[SweepConfiguration, tuple]:
+        """
+        Helper method which computes the score matrix of each configuration, sharding the configurations across a pool
+        of worker processes, so that the templates of each configuration are only made by one worker. Configurations
+        which only differ by their false positive ratio share their segment means and hash codes, so they are scored
+        by the same task, unless there are fewer such groups than worker processes.
+
+        :param configurations: The configurations to score.
+        :param processes: The number of worker processes.
+        :returns: The score matrix and mean template size of each configuration.
+        """
+        configuration_groups: typing.Dict[tuple, typing.List[SweepConfiguration]] = {}
+        for configuration in configurations:
+            group_key = (configuration.backend_name, configuration.segment_ratio, configuration.row_wise)
+            configuration_groups.setdefault(group_key, []).append(configuration)
+        tasks = list(configuration_groups.values())
+        if len(tasks) < processes:
+            tasks = [[configuration] for configuration in configurations]
+        worker_pool = concurrent.futures.ProcessPoolExecutor(
+            processes, initializer=_initialize_worker, initargs=(self,)
+        )
+        scores = {}
+        with worker_pool as pool:
+            for task_scores in pool.map(_compute_task_scores, tasks):
+                scores.update(task_scores)
+        return scores
+
+    def _summarize(self, configuration: SweepConfiguration, score_matrix: np.ndarray, template_bytes: float):
+        """
+        Helper method which summarizes the score matrix of a configuration into a sweep result.
+
+        :param configuration: The configuration.
+        :param score_matrix: The score matrix of the configuration.
+        :param template_bytes: The mean size of the templates of the configuration, in bytes.
+        :returns: The sweep result.
+        """
+        genuine_scores, impostor_scores = evaluation.split_scores(
+            score_matrix, self._enrollment_labels, self._probe_labels
+        )
+        error_rates = evaluation.compute_error_rates(genuine_scores, impostor_scores)
+        return SweepResult(
+            configuration=configuration,
+            equal_error_rate=error_rates.equal_error_rate,
+            equal_error_threshold=error_rates.equal_error_threshold,
+            genuine_mean_score=float(np.mean(genuine_scores)),
+            impostor_mean_score=float(np.mean(impostor_scores)),
+            mean_template_bytes=template_bytes
+        )
+
+
+_worker_sweep: typing.Optional[ParameterSweep] = None
+
+
+def _initialize_worker(sweep: ParameterSweep):
+    """
+    Initializes a worker process with the parameter sweep to compute scores for.
+
+    :param sweep: The parameter sweep.
+    """
+    global _worker_sweep
+    _worker_sweep = sweep
+
+
+def _compute_task_scores(configurations: typing.Sequence[SweepConfiguration]) -> typing.Dict[SweepConfiguration, tuple]:
+    """
+    Computes the score matrices of a share of the configurations of the worker's parameter sweep, against every probe.
+
+    :param configurations: The configurations to score.
+    :returns: The score matrix and mean template size of each configuration.
+    """
+    return _worker_sweep.compute_scores(configurations)
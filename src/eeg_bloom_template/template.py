@@ -1,7 +1,10 @@
+import concurrent.futures
+import pickle
 import typing
 import numpy as np
 
-from . import base, engine, comparison, backend, serialization
+from . import base, engine, comparison, backend, hash_cache, serialization, sharing, signature, sizing
+from .utils import bloom_bits
 
 
 class EEGTemplate(base.BaseEEGTemplateData):
@@ -11,13 +14,25 @@ class EEGTemplate(base.BaseEEGTemplateData):
     def __str__(self):
         return f'Template: {len(self.bloom_filters)} filters; {self.segment_ratio} segment ratio'
 
+    def __reduce_ex__(self, protocol: int):
+        # Templates are pickled as their layout plus the concatenated bytes of their Bloom Filters. With protocol 5,
+        # the bytes are given as a pickle buffer, which can be transferred out of band.
+        layout, filter_bytes = sharing.TemplateLayout.from_template(self)
+        if protocol >= 5:
+            return sharing.load_template, (layout, pickle.PickleBuffer(filter_bytes))
+        return sharing.load_template, (layout, filter_bytes)
+
     @classmethod
     def make_template(cls,
                       feature_data: typing.List[np.ndarray],
                       hash_backend: backend.BaseBloomFilterHashBackend,
                       segment_ratio: float,
                       false_positive_ratio: float,
-                      row_wise=True) -> 'EEGTemplate':
+                      row_wise=True,
+                      sizing_policy: sizing.BloomFilterSizingPolicy = None,
+                      filter_type: str = bloom_bits.STANDARD_FILTER_TYPE,
+                      signature_size: int = 0,
+                      hash_code_cache: typing.Optional[hash_cache.HashCodeDiskCache] = None) -> 'EEGTemplate':
         """
         Generates an EEG template instance using given feature data, a hashing backend, segment ratio, and false
         positive rate.
@@ -27,33 +42,152 @@ class EEGTemplate(base.BaseEEGTemplateData):
         :param segment_ratio: The segment ratio to use in the template.
         :param false_positive_ratio: The false positive rate to use in the Bloom Filters.
         :param row_wise: Flag indicating whether to use row wise or column wise analysis.
+        :param sizing_policy: The policy used to size the Bloom Filters in the template. By default, each filter is
+                              sized to hold twice the number of items it is given.
+        :param filter_type: The type of Bloom Filters to use, either 'standard' or 'blocked'. Blocked filters are
+                            faster to check, at the cost of a slightly higher false positive rate (see
+                            blocked_bloom.BlockedBloomFilter).
+        :param signature_size: The size of the signature stored with the template, used to shortlist the template in
+                               identification searches (see identification.SignatureIndex, and
+                               signature.DEFAULT_SIGNATURE_SIZE for a typical size). By default, no signature is
+                               stored, which makes enrollment cheaper for backends which do not hash whole arrays
+                               natively (see BaseBloomFilterHashBackend.hashes_arrays_natively).
+        :param hash_code_cache: Optional on-disk cache of hash codes, in which case the segment averages are only
+                                hashed if their hash codes are not cached yet (e.g., when re-enrolling the same
+                                recording).
         :returns: The template instance.
         """
         if not 0 < false_positive_ratio < 1:
             raise ValueError(f'False positive ratio must be between 0 and 1 (got {false_positive_ratio}).')
-        data_engine = engine.EEGBloomFilterTemplateEngine(hash_backend, segment_ratio, false_positive_ratio)
-        template_data = data_engine.create_template_data(feature_data, row_wise)
-        return cls(bloom_filters=template_data, segment_ratio=segment_ratio, row_wise=row_wise)
+        data_engine = engine.EEGBloomFilterTemplateEngine(
+            hash_backend, segment_ratio, false_positive_ratio, sizing_policy=sizing_policy, filter_type=filter_type
+        )
+        if not signature_size and hash_code_cache is None and not hash_backend.hashes_arrays_natively:
+            # Without a signature, the hash codes are only needed by the Bloom Filters, and backends hashing values
+            # one by one are cheaper to use by inserting the segment averages through rbloom.
+            template_data = data_engine.create_template_data(feature_data, row_wise)
+            return cls(bloom_filters=template_data, segment_ratio=segment_ratio, row_wise=row_wise)
+        # The segment averages are hashed once, for both the Bloom Filters and the signature of the template.
+        segment_means = data_engine.compute_segment_means(feature_data, row_wise)
+        if hash_code_cache is not None and segment_means:
+            hash_codes = list(hash_code_cache.get_hash_codes(hash_backend, np.stack(segment_means)))
+        else:
+            hash_codes = [bloom_bits.hash_values(hash_backend, segment_mean) for segment_mean in segment_means]
+        template_data = data_engine.create_template_data_from_hash_codes(hash_codes)
+        template_signature = None
+        if signature_size:
+            template_signature = signature.compute_signature(hash_codes, signature_size)
+        return cls(bloom_filters=template_data, segment_ratio=segment_ratio, row_wise=row_wise,
+                   signature=template_signature)
+
+    @classmethod
+    def merge(cls, *templates: 'EEGTemplate', mode: str = 'union') -> 'EEGTemplate':
+        """
+        Merges templates enrolled from separate sessions into a single template, combining their Bloom Filters segment
+        by segment. In union mode, the merged filters contain the items of any of the templates (i.e., the result is
+        the same as adding the segment averages of every session to the same filters); in intersection mode, the
+        merged filters only keep the bits set in all the templates.
+
+        :param templates: The templates to merge, which must share the same hash backend, segment ratio, orientation
+                          and filter parameters.
+        :param mode: The merge mode, either 'union' or 'intersection'.
+        :returns: The merged template.
+        :raises ValueError: If the templates cannot be merged.
+        """
+        merge_operations = {'union': np.bitwise_or, 'intersection': np.bitwise_and}
+        if mode not in merge_operations:
+            raise ValueError(f'Merge mode must be one of {list(merge_operations)} (got "{mode}").')
+        if not templates:
+            raise ValueError('Expected at least one template to merge.')
+        first_template = templates[0]
+        for other_template in templates[1:]:
+            if other_template.segment_ratio != first_template.segment_ratio:
+                raise ValueError(
+                    f'Cannot merge templates with segment ratios {first_template.segment_ratio} and '
+                    f'{other_template.segment_ratio}.'
+                )
+            if other_template.row_wise != first_template.row_wise:
+                raise ValueError('Cannot merge row wise and column wise templates.')
+            if len(other_template.bloom_filters) != len(first_template.bloom_filters):
+                raise ValueError(
+                    f'Cannot merge templates with {len(first_template.bloom_filters)} and '
+                    f'{len(other_template.bloom_filters)} filters.'
+                )
+
+        merged_filters = []
+        for segment_filters in zip(*(merge_template.bloom_filters for merge_template in templates)):
+            filter_layouts = set()
+            filter_bits = []
+            for bloom_filter in segment_filters:
+                if not isinstance(bloom_filter.hash_func, backend.BaseBloomFilterHashBackend):
+                    raise ValueError(
+                        f'Bloom filter hash backends not derived from {backend.BaseBloomFilterHashBackend.__name__} '
+                        f'are not supported for merging.'
+                    )
+                number_of_hashes, bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+                filter_layouts.add((
+                    type(bloom_filter), bloom_filter.hash_func.identity, number_of_hashes, bloom_filter.size_in_bits
+                ))
+                filter_bits.append(bits)
+            if len(filter_layouts) > 1:
+                raise ValueError(
+                    'Cannot merge filters using different filter types, hash backends, sizes or numbers of hashes.'
+                )
+            (filter_class, _, number_of_hashes, _), = filter_layouts
+            merged_bits = merge_operations[mode].reduce(np.stack(filter_bits), axis=0)
+            merged_filters.append(filter_class.load_bytes(
+                bloom_bits.join_filter_bytes(number_of_hashes, merged_bits), segment_filters[0].hash_func
+            ))
+        # Signatures can only be merged in union mode, as the smallest values of an intersection may not be part of
+        # the signatures of the templates.
+        merged_signature = None
+        if mode == 'union' and all(merge_template.signature is not None for merge_template in templates):
+            merged_signature = signature.merge_signatures([merge_template.signature for merge_template in templates])
+        return cls(bloom_filters=merged_filters, segment_ratio=first_template.segment_ratio,
+                   row_wise=first_template.row_wise, signature=merged_signature)
 
-    def compare(self, data: typing.List[np.ndarray]) -> comparison.ComparisonResult:
+    def compare(self,
+                data: typing.Union[typing.List[np.ndarray], comparison.PreparedProbe],
+                executor: typing.Optional[concurrent.futures.Executor] = None,
+                min_parallel_segments: int = 8,
+                max_workers: typing.Optional[int] = None) -> comparison.ComparisonResult:
         """
         Compares the current template against a given matrix of EEG feature data. This is essentially a wrapper
         around the EEG template data checker class implementation.
 
-        :param data: The EEG feature data to compare the template against.
+        :param data: The EEG feature data to compare the template against. When comparing the same data against
+                     several templates, a prepared probe can be given instead, so the data is only hashed once.
+        :param executor: Optional executor (thread or process pool) used to check the segments of long probes
+                         concurrently.
+        :param min_parallel_segments: The minimum number of segments a comparison must cover to use the executor,
+                                      which is also the minimum number of segments checked by each task.
+        :param max_workers: The number of workers of the executor, i.e., the maximum number of tasks a comparison is
+                            split into (by default, the number of CPUs).
         :returns: The comparison result.
         """
-        checker = comparison.EEGTemplateDataChecker(self)
+        checker = comparison.EEGTemplateDataChecker(
+            self, executor=executor, min_parallel_segments=min_parallel_segments, max_workers=max_workers
+        )
         return checker.check(data)
 
-    def serialize(self) -> str:
+    def footprint(self) -> sizing.TemplateFootprint:
+        """
+        Reports the memory footprint of the Bloom Filters in the current template, including the bytes used by each
+        filter, the total bytes used and the ratio of set bits.
+
+        :returns: The footprint of the template.
+        """
+        return sizing.TemplateFootprint.from_bloom_filters(self.bloom_filters)
+
+    def serialize(self, compress=False) -> str:
         """
         Wrapper around the instantiation and usage of a serializer class, which returns the current EEG template
         in a serialized string format.
 
+        :param compress: Flag indicating whether to compress the Bloom Filter data in the serialized string.
         :returns: The EEG template, as a string.
         """
-        serializer = serialization.EEGTemplateDataSerializer(self.__class__)
+        serializer = serialization.EEGTemplateDataSerializer(self.__class__, compress=compress)
         return serializer.serialize(self)
 
     @classmethod
@@ -68,3 +202,17 @@ class EEGTemplate(base.BaseEEGTemplateData):
         """
         serializer = serialization.EEGTemplateDataSerializer(cls)
         return serializer.deserialize(data)
+
+    @classmethod
+    def peek_metadata(cls, data: str) -> serialization.TemplateMetadata:
+        """
+        Wrapper around the instantiation and usage of a serializer class, which reads the metadata of a serialized
+        EEG template (hash backends, segment ratio, orientation, filter sizes and content digest) without decoding its
+        Bloom Filters.
+
+        :param data: The data string containing serialized EEG template data.
+        :returns: The metadata of the template.
+        :raises InvalidSerializationFormat: If the data string is in the wrong format for deserialization.
+        """
+        serializer = serialization.EEGTemplateDataSerializer(cls)
+        return serializer.peek_metadata(data)
@@ -0,0 +1,229 @@
+import typing
+import numpy as np
+
+if typing.TYPE_CHECKING:
+    from ..backend import BaseBloomFilterHashBackend
+
+
+# Bloom Filters store the number of hash functions (k) as a little-endian unsigned 64-bit prefix to their bit array.
+K_PREFIX_SIZE = 8
+
+# Standard filters (rbloom) spread the bits of an item across the whole bit array, while blocked filters keep all the
+# bits of an item within a single block the size of a cache line.
+STANDARD_FILTER_TYPE = 'standard'
+BLOCKED_FILTER_TYPE = 'blocked'
+BLOCK_SIZE_IN_BITS = 512
+
+
+def split_filter_bytes(filter_bytes: bytes) -> typing.Tuple[int, np.ndarray]:
+    """
+    Splits the saved bytes of a Bloom Filter into the number of hash functions used by the filter and its bit array.
+
+    :param filter_bytes: The bytes of the filter, as produced by its save_bytes method.
+    :returns: The number of hash functions and the bit array of the filter (as an array of unsigned bytes).
+    """
+    if len(filter_bytes) < K_PREFIX_SIZE:
+        raise ValueError(f'Expected at least {K_PREFIX_SIZE} bytes of filter data, got {len(filter_bytes)}.')
+    number_of_hashes = int.from_bytes(filter_bytes[:K_PREFIX_SIZE], 'little')
+    bits = np.frombuffer(filter_bytes, dtype=np.uint8, offset=K_PREFIX_SIZE)
+    return number_of_hashes, bits
+
+
+def join_filter_bytes(number_of_hashes: int, bits: np.ndarray) -> bytes:
+    """
+    Inverse of split_filter_bytes, combines a number of hash functions and a bit array into the byte format used to
+    load a Bloom Filter.
+
+    :param number_of_hashes: The number of hash functions used by the filter.
+    :param bits: The bit array of the filter (as an array of unsigned bytes).
+    :returns: The bytes of the filter.
+    """
+    return number_of_hashes.to_bytes(K_PREFIX_SIZE, 'little') + np.ascontiguousarray(bits, dtype=np.uint8).tobytes()
+
+
+def count_set_bits(bits: np.ndarray) -> int:
+    """
+    Counts the number of set bits in the given bit array.
+
+    :param bits: The bit array (as an array of unsigned bytes).
+    :returns: The number of set bits.
+    """
+    return int(np.unpackbits(np.asarray(bits, dtype=np.uint8)).sum())
+
+
+# Bloom Filters derive the bit indexes of an item from its 128-bit hash code using a linear congruential generator
+# (LCG), where each index is the middle 64 bits of the generator state modulo the size of the filter.
+_LCG_MULTIPLIER = 47026247687942121848144207491837418733
+_MASK_32 = np.uint64(0xFFFFFFFF)
+_SHIFT_32 = np.uint64(32)
+_MULTIPLIER_LIMBS = tuple(np.uint64((_LCG_MULTIPLIER >> (32 * i)) & 0xFFFFFFFF) for i in range(4))
+
+
+def hash_codes_to_array(hash_codes: typing.Iterable[int]) -> np.ndarray:
+    """
+    Converts the given signed 128-bit hash codes into an array of unsigned 64-bit integer pairs, holding the low and
+    high 64 bits of the two's complement of each hash code.
+
+    :param hash_codes: The hash codes to convert.
+    :returns: An array of shape (n, 2), holding the low and high bits of each hash code.
+    """
+    code_bytes = b''.join(hash_code.to_bytes(16, 'little', signed=True) for hash_code in hash_codes)
+    return np.frombuffer(code_bytes, dtype='<u8').astype(np.uint64).reshape(-1, 2)
+
+
+def hash_values(hash_backend: 'BaseBloomFilterHashBackend', values: np.ndarray) -> np.ndarray:
+    """
+    Hashes every value of the given array, in the same way a Bloom Filter using the given hash backend would. Values
+    are hashed as 32-bit floats, and each distinct value is only hashed once.
+
+    :param hash_backend: The hash backend used by the Bloom Filter(s).
+    :param values: The array of values to hash.
+    :returns: An array with the shape of the values, plus a trailing dimension of 2 holding the hash codes.
+    """
+    float_values = np.asarray(values, dtype=np.float32)
+    unique_values, inverse = np.unique(float_values.view(np.uint32), return_inverse=True)
+    hash_codes = hash_backend.hash_code_array(unique_values.view(np.float32))
+    return hash_codes[inverse.reshape(-1)].reshape(float_values.shape + (2,))
+
+
+def generate_indexes(hash_codes: np.ndarray, number_of_hashes: int, size_in_bits: int) -> np.ndarray:
+    """
+    Generates the bit indexes used by a Bloom Filter for each of the given hash codes.
+
+    :param hash_codes: An array of hash codes, as produced by hash_codes_to_array (trailing dimension of 2).
+    :param number_of_hashes: The number of hash functions (i.e., bit indexes per item) used by the filter.
+    :param size_in_bits: The size of the filter in bits.
+    :returns: An array with the shape of the hash codes, where the trailing dimension holds the bit indexes. Indexes
+              are stored as unsigned 32-bit integers when the filter size allows it.
+    """
+    low = hash_codes[..., 0]
+    high = hash_codes[..., 1]
+    state = [low & _MASK_32, low >> _SHIFT_32, high & _MASK_32, high >> _SHIFT_32]
+    size = np.uint64(size_in_bits)
+    index_type = np.uint32 if size_in_bits <= 2**32 else np.uint64
+    indexes = np.empty(hash_codes.shape[:-1] + (number_of_hashes,), dtype=index_type)
+    for i in range(number_of_hashes):
+        state = _advance_state(state)
+        indexes[..., i] = (state[1] | (state[2] << _SHIFT_32)) % size
+    return indexes
+
+
+def generate_blocked_indexes(hash_codes: np.ndarray, number_of_hashes: int, size_in_bits: int) -> np.ndarray:
+    """
+    Computes the bit indexes set by each of the given hash codes in a blocked Bloom Filter of the given size. The high
+    64 bits of a hash code select a block, and the low 64 bits are split into a start offset and an (odd) step, which
+    give the offsets of the bits within the block (i.e., double hashing modulo the block size).
+
+    :param hash_codes: An array of hash codes, as produced by hash_codes_to_array (trailing dimension of 2).
+    :param number_of_hashes: The number of hash functions (i.e., bit indexes per item) used by the filter.
+    :param size_in_bits: The size of the filter in bits (a multiple of the block size).
+    :returns: An array with the shape of the hash codes, where the trailing dimension holds the bit indexes.
+    """
+    low = hash_codes[..., 0, np.newaxis]
+    high = hash_codes[..., 1, np.newaxis]
+    number_of_blocks = np.uint64(size_in_bits // BLOCK_SIZE_IN_BITS)
+    block_starts = (high % number_of_blocks) * np.uint64(BLOCK_SIZE_IN_BITS)
+    hash_numbers = np.arange(number_of_hashes, dtype=np.uint64)
+    offsets = ((low & _MASK_32) + hash_numbers * ((low >> _SHIFT_32) | np.uint64(1))) % np.uint64(BLOCK_SIZE_IN_BITS)
+    index_type = np.uint32 if size_in_bits <= 2**32 else np.uint64
+    return (block_starts + offsets).astype(index_type)
+
+
+def generate_filter_indexes(filter_type: str,
+                            hash_codes: np.ndarray,
+                            number_of_hashes: int,
+                            size_in_bits: int) -> np.ndarray:
+    """
+    Computes the bit indexes set by each of the given hash codes, for a Bloom Filter of the given type.
+
+    :param filter_type: The type of the filter (see get_filter_type).
+    :param hash_codes: An array of hash codes, as produced by hash_codes_to_array (trailing dimension of 2).
+    :param number_of_hashes: The number of hash functions (i.e., bit indexes per item) used by the filter.
+    :param size_in_bits: The size of the filter in bits.
+    :returns: An array with the shape of the hash codes, where the trailing dimension holds the bit indexes.
+    """
+    if filter_type == STANDARD_FILTER_TYPE:
+        return generate_indexes(hash_codes, number_of_hashes, size_in_bits)
+    if filter_type == BLOCKED_FILTER_TYPE:
+        return generate_blocked_indexes(hash_codes, number_of_hashes, size_in_bits)
+    raise ValueError(f'Unknown Bloom Filter type "{filter_type}".')
+
+
+def get_filter_type(bloom_filter) -> str:
+    """
+    Retrieves the type of the given Bloom Filter, which determines how the bit indexes of its items are computed.
+
+    :param bloom_filter: The Bloom Filter.
+    :returns: The type of the filter.
+    """
+    return getattr(bloom_filter, 'filter_type', STANDARD_FILTER_TYPE)
+
+
+def _advance_state(state: typing.List[np.ndarray]) -> typing.List[np.ndarray]:
+    """
+    Helper function which advances the 128-bit LCG state, held as four 32-bit limbs (least significant first), by one
+    step. The state is multiplied by the LCG multiplier and incremented, modulo 2^128.
+
+    :param state: The current state.
+    :returns: The next state.
+    """
+    columns = [np.ones_like(state[0]), np.zeros_like(state[0]), np.zeros_like(state[0]), np.zeros_like(state[0])]
+    for i in range(4):
+        for j in range(4 - i):
+            product = state[i] * _MULTIPLIER_LIMBS[j]
+            columns[i + j] += product & _MASK_32
+            if i + j + 1 < 4:
+                columns[i + j + 1] += product >> _SHIFT_32
+    next_state = []
+    carry = np.zeros_like(state[0])
+    for column in columns:
+        column = column + carry
+        next_state.append(column & _MASK_32)
+        carry = column >> _SHIFT_32
+    return next_state
+
+
+def contains_indexes(bits: np.ndarray, indexes: np.ndarray) -> np.ndarray:
+    """
+    Checks which items are contained by one or more Bloom Filters, given the bit indexes of the items.
+
+    :param bits: The bit array of a filter, or a 2D array of bit arrays from filters of the same size.
+    :param indexes: An array of bit indexes, where the trailing dimension holds the indexes of each item.
+    :returns: A boolean array indicating which items are contained, with a leading dimension per filter if a 2D array
+              of bit arrays was given.
+    """
+    byte_indexes = (indexes >> 3).astype(np.intp)
+    bit_offsets = (indexes & 7).astype(np.uint8)
+    selected_bytes = np.take(bits, byte_indexes, axis=-1)
+    return np.all((selected_bytes >> bit_offsets) & 1, axis=-1)
+
+
+def contains_paired_indexes(bits: np.ndarray, indexes: np.ndarray) -> np.ndarray:
+    """
+    Checks which items are contained by the Bloom Filter paired with them, i.e., the items of each row of the indexes
+    are checked against the filter of the same row of the bit arrays.
+
+    :param bits: A 2D array of bit arrays from filters of the same size.
+    :param indexes: An array of bit indexes, with a leading dimension per filter, and a trailing dimension holding the
+                    indexes of each item.
+    :returns: A boolean array indicating which items are contained, with the shape of the indexes minus the trailing
+              dimension.
+    """
+    flat_indexes = indexes.reshape(len(bits), -1)
+    byte_indexes = (flat_indexes >> 3).astype(np.intp)
+    bit_offsets = (flat_indexes & 7).astype(np.uint8)
+    selected_bytes = np.take_along_axis(bits, byte_indexes, axis=1)
+    return np.all(((selected_bytes >> bit_offsets) & 1).reshape(indexes.shape), axis=-1)
+
+
+def set_indexes(bits: np.ndarray, indexes: np.ndarray):
+    """
+    Sets the given bit indexes in the given (writable) bit array of a Bloom Filter.
+
+    :param bits: The bit array of the filter.
+    :param indexes: An array of bit indexes to set.
+    """
+    flat_indexes = indexes.reshape(-1)
+    byte_indexes = (flat_indexes >> 3).astype(np.intp)
+    bit_values = np.left_shift(1, (flat_indexes & 7).astype(np.uint8)).astype(np.uint8)
+    np.bitwise_or.at(bits, byte_indexes, bit_values)
@@ -23,3 +23,16 @@ def test(c):
     Runs unit tests on the project.
     """
     c.run('python -m unittest discover -s tests -p test*.py')
+
+
+@invoke.task
+def loadtest(c, rate=50.0, duration=10.0, concurrency=4, subprocess=False, trace_memory=False):
+    """
+    Runs a load test of the template operations, and prints its report. Tracing memory inflates latencies.
+    """
+    subprocess_flag = ' --subprocess' if subprocess else ''
+    trace_memory_flag = ' --trace-memory' if trace_memory else ''
+    c.run(
+        f'python -m eeg_bloom_template.loadtest --rate {rate} --duration {duration} --concurrency {concurrency}'
+        f'{subprocess_flag}{trace_memory_flag}'
+    )
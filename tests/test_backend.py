@@ -1,10 +1,15 @@
 import unittest
 import unittest.mock
 import struct
+import rbloom
+import numpy as np
 
 from eeg_bloom_template.backend.fnv_backend import FNVBloomFilterBackend
 from eeg_bloom_template.backend.mmh3_backend import MMH3BloomFilterBackend
+from eeg_bloom_template.backend.splitmix_backend import SplitMixBloomFilterBackend
 from eeg_bloom_template.backend.token_backend import TokenBackend
+from eeg_bloom_template.backend import BaseBloomFilterHashBackend
+from eeg_bloom_template.utils import bloom_bits
 
 
 class BackendTestCase(unittest.TestCase):
@@ -57,3 +62,77 @@ class BackendTestCase(unittest.TestCase):
 
         self.assertTrue(cached_called)
         self.assertTrue(normalizer_called)
+
+    def test_backend_identity(self):
+        self.assertEqual(MMH3BloomFilterBackend(seed=1).identity, MMH3BloomFilterBackend(seed=1).identity)
+        self.assertNotEqual(MMH3BloomFilterBackend(seed=1).identity, MMH3BloomFilterBackend(seed=2).identity)
+        self.assertNotEqual(TokenBackend('a').identity, TokenBackend('b').identity)
+        self.assertNotIn('secret', TokenBackend('secret').identity)
+        self.assertTrue(FNVBloomFilterBackend().identity.startswith('fnvbloomfilterbackend:'))
+
+    def test_backend_hash_array(self):
+        values = np.random.rand(3, 4)
+        for backend in (FNVBloomFilterBackend(), MMH3BloomFilterBackend(seed=3), TokenBackend('token'),
+                        SplitMixBloomFilterBackend(seed=3)):
+            expected = [backend(float(value)) for value in values.reshape(-1)]
+            self.assertEqual(backend.hash_array(values), expected)
+
+
+class SplitMixBackendTestCase(unittest.TestCase):
+    def test_splitmix_backend(self):
+        backend = SplitMixBloomFilterBackend(seed=11)
+        values = np.random.rand(200).astype(np.float32)
+
+        hash_codes = backend.hash_code_array(values)
+
+        self.assertEqual(hash_codes.shape, (200, 2))
+        self.assertTrue(np.array_equal(hash_codes, bloom_bits.hash_codes_to_array(backend(float(v)) for v in values)))
+        self.assertNotEqual(backend.run_hash_function(b'1'), backend.run_hash_function(b'1\x00'))
+        self.assertNotEqual(backend(1.5), SplitMixBloomFilterBackend(seed=12)(1.5))
+        self.assertIs(BaseBloomFilterHashBackend.get_implementation('splitmixbloomfilterbackend'),
+                      SplitMixBloomFilterBackend)
+
+    def test_splitmix_bloom_filter_compatibility(self):
+        backend = SplitMixBloomFilterBackend(seed=5)
+        values = np.random.rand(100).astype(np.float32)
+        bloom_filter = rbloom.Bloom(200, 0.01, backend)
+        bloom_filter.update(values.tolist())
+
+        number_of_hashes, bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+        indexes = bloom_bits.generate_indexes(
+            bloom_bits.hash_values(backend, values), number_of_hashes, bloom_filter.size_in_bits
+        )
+
+        self.assertTrue(bloom_bits.contains_indexes(bits, indexes).all())
+
+    def test_splitmix_avalanche(self):
+        backend = SplitMixBloomFilterBackend(seed=1)
+        rng = np.random.default_rng(0)
+        words = rng.integers(0, 2**32, 4000, dtype=np.uint64).astype(np.uint32)
+        base_codes = backend.hash_code_array(words.view(np.float32))
+
+        flip_ratios = []
+        for bit in range(32):
+            flipped_words = words ^ np.uint32(1 << bit)
+            flipped_codes = backend.hash_code_array(flipped_words.view(np.float32))
+            changed_bits = np.unpackbits((base_codes ^ flipped_codes).view(np.uint8).reshape(len(words), -1), axis=1)
+            flip_ratios.append(changed_bits.mean(axis=0))
+
+        # Flipping any input bit should flip each of the 128 output bits with probability 1/2.
+        flip_ratios = np.array(flip_ratios)
+        self.assertAlmostEqual(flip_ratios.mean(), 0.5, delta=0.005)
+        self.assertLess(np.abs(flip_ratios - 0.5).max(), 0.05)
+
+    def test_splitmix_collisions(self):
+        backend = SplitMixBloomFilterBackend()
+        words = np.arange(2**20, dtype=np.uint32)
+
+        hash_codes = backend.hash_code_array(words.view(np.float32))
+
+        # Hash codes are unique, as is each 64-bit half, and the number of collisions of the low 32 bits is close to
+        # the expected number for a random function (n^2 / 2^33, i.e. 128).
+        self.assertEqual(len(np.unique(hash_codes, axis=0)), len(words))
+        for lane in range(2):
+            self.assertEqual(len(np.unique(hash_codes[:, lane])), len(words))
+        low_collisions = len(words) - len(np.unique(hash_codes[:, 0] & np.uint64(0xFFFFFFFF)))
+        self.assertLess(abs(low_collisions - 128), 60)
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+
+from eeg_bloom_template.backend import MMH3BloomFilterBackend
+from eeg_bloom_template.blocked_bloom import BlockedBloomFilter, get_filter_class
+from eeg_bloom_template.evaluation import TemplateGallery
+from eeg_bloom_template.template import EEGTemplate
+from eeg_bloom_template.utils import bloom_bits
+
+
+class BlockedBloomFilterTestCase(unittest.TestCase):
+    def test_membership(self):
+        hash_backend = MMH3BloomFilterBackend()
+        items = np.random.rand(500).astype(np.float32)
+        non_members = np.random.rand(20000).astype(np.float32) + 2
+        bloom_filter = BlockedBloomFilter(500, 0.01, hash_backend)
+
+        bloom_filter.update(items.tolist())
+
+        self.assertEqual(bloom_filter.size_in_bits % bloom_bits.BLOCK_SIZE_IN_BITS, 0)
+        for item in items[:50]:
+            self.assertIn(float(item), bloom_filter)
+        self.assertTrue(bloom_filter.contains_hash_codes(bloom_bits.hash_values(hash_backend, items)).all())
+        false_positives = bloom_filter.contains_hash_codes(bloom_bits.hash_values(hash_backend, non_members))
+        self.assertLess(false_positives.mean(), 0.03)
+
+    def test_single_and_vectorized_insertion_match(self):
+        hash_backend = MMH3BloomFilterBackend(seed=3)
+        items = np.random.rand(50).tolist()
+        single_filter = BlockedBloomFilter(100, 0.01, hash_backend)
+        vectorized_filter = BlockedBloomFilter(100, 0.01, hash_backend)
+
+        for item in items:
+            single_filter.add(item)
+        vectorized_filter.update(items)
+
+        self.assertEqual(single_filter.save_bytes(), vectorized_filter.save_bytes())
+        restored = BlockedBloomFilter.load_bytes(single_filter.save_bytes(), hash_backend)
+        self.assertEqual(restored.number_of_hashes, single_filter.number_of_hashes)
+        self.assertTrue(all(item in restored for item in items))
+        with self.assertRaises(ValueError):
+            BlockedBloomFilter.load_bytes(single_filter.save_bytes()[:-1], hash_backend)
+
+    def test_blocked_template(self):
+        hash_backend = MMH3BloomFilterBackend()
+        data = np.random.rand(20, 8)
+        probe = list(np.repeat(data.reshape(4, 5, 8).mean(axis=1), 5, axis=0)[:15]) + list(np.random.rand(5, 8))
+
+        eeg_template = EEGTemplate.make_template(list(data), hash_backend, 0.25, 0.01, filter_type='blocked')
+        serialized = eeg_template.serialize()
+        restored = EEGTemplate.deserialize(serialized)
+
+        self.assertIsInstance(restored.bloom_filters[0], BlockedBloomFilter)
+        self.assertEqual(EEGTemplate.peek_metadata(serialized).filter_type, 'blocked')
+        self.assertEqual(restored.compare(probe), eeg_template.compare(probe))
+        self.assertGreaterEqual(eeg_template.compare(probe).hits, 120)
+        standard_template = EEGTemplate.make_template(list(data), hash_backend, 0.25, 0.01)
+        gallery = TemplateGallery([eeg_template, standard_template])
+        self.assertEqual(gallery.compare(probe), [eeg_template.compare(probe), standard_template.compare(probe)])
+        merged = EEGTemplate.merge(eeg_template, restored)
+        self.assertEqual(merged.bloom_filters[0].save_bytes(), eeg_template.bloom_filters[0].save_bytes())
+        with self.assertRaises(ValueError):
+            EEGTemplate.merge(eeg_template, standard_template)
+
+    def test_unknown_filter_type(self):
+        with self.assertRaises(ValueError):
+            get_filter_class('cuckoo')
@@ -0,0 +1,89 @@
+import concurrent.futures
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from eeg_bloom_template import backend, bulk, exceptions
+from eeg_bloom_template.template import EEGTemplate
+
+
+class BulkTemplateIOTestCase(unittest.TestCase):
+    FORMATS = [
+        (bulk.JsonLinesTemplateWriter, bulk.JsonLinesTemplateReader, io.StringIO),
+        (bulk.BinaryTemplateWriter, bulk.BinaryTemplateReader, io.BytesIO)
+    ]
+
+    def setUp(self):
+        data = np.random.rand(10, 4)
+        self.probe = np.repeat(data.reshape(2, 5, 4).mean(axis=1), 5, axis=0)
+        self.templates = [
+            (f'user-{template_idx}', EEGTemplate.make_template(
+                list(np.random.rand(10, 4)), backend.MMH3BloomFilterBackend(), 0.5, 0.01
+            ))
+            for template_idx in range(7)
+        ]
+        self.templates.append((42, EEGTemplate.make_template(list(data), backend.FNVBloomFilterBackend(), 0.5, 0.01)))
+
+    def _assert_templates_equal(self, actual: list, expected: list):
+        self.assertEqual([template_id for template_id, _ in actual], [template_id for template_id, _ in expected])
+        for (_, actual_template), (_, expected_template) in zip(actual, expected):
+            self.assertEqual(actual_template.serialize(), expected_template.serialize())
+
+    def test_round_trip(self):
+        for writer_class, reader_class, buffer_class in self.FORMATS:
+            for compress in (False, True):
+                buffer = buffer_class()
+                written = writer_class(buffer, compress=compress, chunk_size=3).write(iter(self.templates))
+                buffer.seek(0)
+
+                restored = list(reader_class(buffer, chunk_size=2).read())
+
+                self.assertEqual(written, len(self.templates))
+                self._assert_templates_equal(restored, self.templates)
+                self.assertEqual(restored[-1][1].compare(list(self.probe)).hit_ratio, 1)
+
+    def test_resume_from_offset(self):
+        for writer_class, reader_class, buffer_class in self.FORMATS:
+            buffer = buffer_class()
+            writer_class(buffer, chunk_size=3).write(self.templates[:5])
+            # Writing more templates resumes the collection.
+            writer_class(buffer, chunk_size=3).write(self.templates[5:])
+
+            for offset in (0, 3, 4, 8, 20):
+                buffer.seek(0)
+                restored = list(reader_class(buffer, chunk_size=3).read(offset=offset))
+                self._assert_templates_equal(restored, self.templates[offset:])
+
+    def test_append_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'templates.bin')
+            for templates in (self.templates[:4], self.templates[4:]):
+                with open(path, 'ab') as file:
+                    bulk.BinaryTemplateWriter(file).write(templates)
+
+            with open(path, 'rb') as file:
+                self._assert_templates_equal(list(bulk.BinaryTemplateReader(file).read()), self.templates)
+
+    def test_parallel_round_trip(self):
+        for executor_class in (concurrent.futures.ThreadPoolExecutor, concurrent.futures.ProcessPoolExecutor):
+            with executor_class(max_workers=2) as executor:
+                for writer_class, reader_class, buffer_class in self.FORMATS:
+                    buffer = buffer_class()
+                    writer_class(buffer, executor=executor, chunk_size=4, batch_size=3).write(self.templates)
+                    buffer.seek(0)
+
+                    restored = list(reader_class(buffer, executor=executor, chunk_size=4, batch_size=3).read())
+
+                    self._assert_templates_equal(restored, self.templates)
+
+    def test_invalid_data(self):
+        with self.assertRaises(exceptions.InvalidSerializationFormat):
+            list(bulk.BinaryTemplateReader(io.BytesIO(b'not a container')).read())
+        buffer = io.BytesIO()
+        bulk.BinaryTemplateWriter(buffer).write(self.templates)
+        with self.assertRaises(exceptions.InvalidSerializationFormat):
+            list(bulk.BinaryTemplateReader(io.BytesIO(buffer.getvalue()[:-10])).read())
+        with self.assertRaises(exceptions.InvalidSerializationFormat):
+            list(bulk.JsonLinesTemplateReader(io.StringIO('{"id": 1}\n')).read())
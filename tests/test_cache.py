@@ -0,0 +1,127 @@
+import unittest
+import threading
+import rbloom
+import numpy as np
+
+from eeg_bloom_template.backend import BaseBloomFilterHashBackend
+from eeg_bloom_template.cache import TemplateCache
+from eeg_bloom_template.template import EEGTemplate
+
+
+class DummyBloomFilterHashBackend(BaseBloomFilterHashBackend):
+    def run_hash_function(self, data: bytes) -> int:
+        return hash(data)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TemplateCacheTestCase(unittest.TestCase):
+    def test_put_and_get(self):
+        cache = TemplateCache()
+        template = self._make_template()
+
+        cache.put('a', template)
+
+        self.assertIs(cache.get('a'), template)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.statistics.hits, 1)
+        self.assertEqual(cache.statistics.misses, 1)
+        self.assertEqual(cache.statistics.hit_ratio, 0.5)
+
+    def test_loader_on_miss(self):
+        template = self._make_template()
+        calls = []
+
+        def loader(key):
+            calls.append(key)
+            return template
+
+        cache = TemplateCache(loader=loader)
+
+        self.assertIs(cache.get('a'), template)
+        self.assertIs(cache.get('a'), template)
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(cache.statistics.loads, 1)
+
+    def test_lru_eviction_by_size(self):
+        template_size = TemplateCache.get_template_size(self._make_template())
+        cache = TemplateCache(max_bytes=template_size * 2)
+
+        cache.put('a', self._make_template())
+        cache.put('b', self._make_template())
+        cache.get('a')
+        cache.put('c', self._make_template())
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.current_bytes, template_size * 2)
+        self.assertEqual(cache.statistics.evictions, 1)
+
+    def test_oversized_template_not_cached(self):
+        cache = TemplateCache(max_bytes=1)
+
+        cache.put('a', self._make_template())
+
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl_expiration(self):
+        clock = FakeClock()
+        cache = TemplateCache(ttl=10, clock=clock)
+        cache.put('a', self._make_template())
+
+        clock.now = 5
+        self.assertIsNotNone(cache.get('a'))
+        clock.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.statistics.expirations, 1)
+        self.assertEqual(cache.current_bytes, 0)
+
+    def test_invalidate(self):
+        cache = TemplateCache()
+        cache.put('a', self._make_template())
+
+        self.assertTrue(cache.invalidate('a'))
+        self.assertFalse(cache.invalidate('a'))
+        self.assertNotIn('a', cache)
+
+    def test_get_serialized(self):
+        data = [np.random.rand(5) for _ in range(10)]
+        serialized = EEGTemplate.make_template(data, DummyBloomFilterHashBackend(), 0.5, 0.01).serialize()
+        cache = TemplateCache()
+
+        first = cache.get_serialized(serialized)
+        second = cache.get_serialized(serialized)
+
+        self.assertIsInstance(first, EEGTemplate)
+        self.assertIs(first, second)
+        self.assertIn(TemplateCache.get_content_key(serialized), cache)
+
+    def test_concurrent_access(self):
+        cache = TemplateCache(max_bytes=TemplateCache.get_template_size(self._make_template()) * 4)
+        template = self._make_template()
+
+        def worker(offset):
+            for i in range(200):
+                key = (offset + i) % 8
+                if cache.get(key) is None:
+                    cache.put(key, template)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(len(cache), 4)
+        self.assertEqual(cache.current_bytes, len(cache) * TemplateCache.get_template_size(template))
+
+    @staticmethod
+    def _make_template() -> EEGTemplate:
+        return EEGTemplate([rbloom.Bloom(100, 0.01, DummyBloomFilterHashBackend())], 1)
@@ -1,16 +1,37 @@
+import concurrent.futures
 import unittest
 import rbloom
 import typing
 import numpy as np
 
+from eeg_bloom_template.backend import FNVBloomFilterBackend, MMH3BloomFilterBackend, SplitMixBloomFilterBackend
 from eeg_bloom_template.base import BaseEEGTemplateData
-from eeg_bloom_template.comparison import EEGTemplateDataChecker
+from eeg_bloom_template.engine import EEGBloomFilterTemplateEngine
+from eeg_bloom_template.comparison import EEGTemplateDataChecker, PreparedProbe
+from eeg_bloom_template.template import EEGTemplate
 
 
 class DummyEEGTemplateData(BaseEEGTemplateData):
     pass
 
 
+class CountingMMH3BloomFilterBackend(MMH3BloomFilterBackend):
+    hashed_values = 0
+
+    def hash_array(self, data: np.ndarray) -> typing.List[int]:
+        # Counted on the class, as the attributes of a backend make up its identity.
+        type(self).hashed_values += np.size(data)
+        return super().hash_array(data)
+
+
+class CountingThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
 class EEGTemplateDataCheckerTestCase(unittest.TestCase):
     def test_equal_data(self):
         test_data = np.random.rand(5)
@@ -61,9 +82,146 @@ class EEGTemplateDataCheckerTestCase(unittest.TestCase):
 
         self.assertEqual(equality_check.hit_ratio, 0.5)
 
+    def test_prepared_probe_matches_element_checks(self):
+        hash_backend = MMH3BloomFilterBackend(seed=11)
+        test_data_a = np.random.rand(12)
+        test_data_b = [np.concatenate((test_data_a[0:6], np.random.rand(6))) for _ in range(4)]
+        test_bloom_filters = self._make_test_bloom_filter(test_data_a, hash_backend)
+        expected_hits = sum(element in test_bloom_filters[0] for vector in test_data_b for element in vector)
+
+        for row_wise in (True, False):
+            test_template = DummyEEGTemplateData(test_bloom_filters, 0.5, row_wise=row_wise)
+            checker = EEGTemplateDataChecker(test_template)
+
+            equality_check = checker.check(PreparedProbe(test_data_b))
+
+            self.assertEqual(equality_check.hits, expected_hits)
+            self.assertEqual(equality_check.elements_total, 48)
+
+    def test_prepared_probe_reused_across_templates(self):
+        test_data = [np.random.rand(5) for _ in range(2)]
+        probe = PreparedProbe(test_data)
+        templates = [
+            DummyEEGTemplateData(self._make_test_bloom_filter(test_data[0], FNVBloomFilterBackend()), 1),
+            DummyEEGTemplateData(self._make_test_bloom_filter(test_data[1], FNVBloomFilterBackend()), 1),
+            DummyEEGTemplateData(self._make_test_bloom_filter(test_data[0], MMH3BloomFilterBackend(seed=1)), 1),
+        ]
+
+        results = [EEGTemplateDataChecker(template).check(probe) for template in templates]
+
+        for result in results:
+            self.assertEqual(result.hit_ratio, 0.5)
+        # The FNV filters share the same backend identity, so the probe is only hashed once for them.
+        self.assertEqual(len(probe._hash_codes), 2)
+
+    def test_prepared_probe_float_matrix(self):
+        test_data = np.random.rand(4, 3)
+        probe = PreparedProbe(list(test_data))
+
+        float_matrix = probe.get_float_matrix()
+
+        self.assertEqual(float_matrix.dtype, np.float32)
+        self.assertEqual(probe.get_matrix().dtype, np.float64)
+        np.testing.assert_array_equal(float_matrix, test_data.astype(np.float32))
+        # The data is only cast once, whichever the orientation.
+        self.assertIs(probe.get_float_matrix(row_wise=False).base, float_matrix)
+
+    def test_prepared_probe_invalid_data(self):
+        probe = PreparedProbe([1, 2, 3])
+        test_template = DummyEEGTemplateData(self._make_test_bloom_filter(np.random.rand(3)), 1)
+
+        result = EEGTemplateDataChecker(test_template).check(probe)
+
+        self.assertFalse(probe.is_valid)
+        self.assertEqual(result.elements_total, 0)
+
+    def test_unprepared_data_matches_prepared_probe(self):
+        enrollment_data = np.random.rand(40, 6)
+        probe_data = list(np.concatenate([enrollment_data[:20], np.random.rand(20, 6)]))
+        for hash_backend in (MMH3BloomFilterBackend(seed=3), SplitMixBloomFilterBackend()):
+            for filter_type in ('standard', 'blocked'):
+                for row_wise in (True, False):
+                    data_engine = EEGBloomFilterTemplateEngine(hash_backend, 0.1, 0.01, filter_type=filter_type)
+                    test_template = DummyEEGTemplateData(
+                        data_engine.create_template_data(list(enrollment_data), row_wise=row_wise), 0.1, row_wise
+                    )
+                    checker = EEGTemplateDataChecker(test_template)
+
+                    self.assertEqual(checker.check(probe_data), checker.check(PreparedProbe(probe_data)))
+
+    def test_filter_bits_cached(self):
+        test_data = np.random.rand(5)
+        test_template = DummyEEGTemplateData(self._make_test_bloom_filter(test_data, MMH3BloomFilterBackend()), 1)
+        number_of_hashes, bits = test_template.get_filter_bits(0)
+
+        self.assertIs(test_template.get_filter_bits(0)[1], bits)
+        self.assertEqual(EEGTemplateDataChecker(test_template).check(PreparedProbe([test_data])).hit_ratio, 1)
+        # Filters which are replaced are read again.
+        test_template.bloom_filters[0] = self._make_test_bloom_filter(np.random.rand(5), MMH3BloomFilterBackend())[0]
+        self.assertIsNot(test_template.get_filter_bits(0)[1], bits)
+        self.assertLess(EEGTemplateDataChecker(test_template).check(PreparedProbe([test_data])).hit_ratio, 1)
+
+    def test_parallel_check_matches_sequential_check(self):
+        enrollment_data = np.random.rand(200, 6)
+        probe_data = np.concatenate([enrollment_data[:100], np.random.rand(100, 6)])
+        for row_wise in (True, False):
+            data_engine = EEGBloomFilterTemplateEngine(MMH3BloomFilterBackend(seed=4), 0.02, 0.01)
+            test_template = DummyEEGTemplateData(
+                data_engine.create_template_data(list(enrollment_data), row_wise=row_wise), 0.02, row_wise
+            )
+            expected = EEGTemplateDataChecker(test_template).check(list(probe_data))
+
+            for executor_type in (concurrent.futures.ThreadPoolExecutor, concurrent.futures.ProcessPoolExecutor):
+                with executor_type(2) as executor:
+                    checker = EEGTemplateDataChecker(test_template, executor=executor, min_parallel_segments=4)
+                    result = checker.check(list(probe_data))
+                self.assertEqual(result, expected)
+
+    def test_parallel_check_of_deserialized_template(self):
+        enrollment_data = np.random.rand(200, 6)
+        probe_data = np.concatenate([enrollment_data[:100], np.random.rand(100, 6)])
+        original = EEGTemplate.make_template(list(enrollment_data), MMH3BloomFilterBackend(seed=4), 0.02, 0.01)
+        test_template = EEGTemplate.deserialize(original.serialize())
+        expected = EEGTemplateDataChecker(test_template).check(list(probe_data))
+
+        with CountingThreadPoolExecutor(4) as executor:
+            checker = EEGTemplateDataChecker(test_template, executor=executor, min_parallel_segments=4, max_workers=4)
+            result = checker.check(list(probe_data))
+
+        self.assertEqual(result, expected)
+        self.assertEqual(executor.submitted, 4)
+
+    def test_parallel_check_of_prepared_probe(self):
+        hash_backend = CountingMMH3BloomFilterBackend()
+        enrollment_data = np.random.rand(200, 8)
+        probe = PreparedProbe(list(np.concatenate([enrollment_data[:100], np.random.rand(100, 8)])))
+        for row_wise in (True, False):
+            test_template = EEGTemplate.make_template(list(enrollment_data), hash_backend, 0.02, 0.01, row_wise)
+            expected = EEGTemplateDataChecker(test_template).check(probe)
+            hashed_values = hash_backend.hashed_values
+
+            with CountingThreadPoolExecutor(2) as executor:
+                checker = EEGTemplateDataChecker(test_template, executor=executor, min_parallel_segments=4,
+                                                 max_workers=2)
+                result = checker.check(probe)
+
+            self.assertEqual(result, expected)
+            self.assertEqual(executor.submitted, 2)
+            # The workers are given the cached hash codes of the probe, rather than hashing it again.
+            self.assertEqual(hash_backend.hashed_values, hashed_values)
+
+    def test_invalid_max_workers(self):
+        test_template = DummyEEGTemplateData(self._make_test_bloom_filter(np.random.rand(3)), 1)
+
+        with self.assertRaises(ValueError):
+            EEGTemplateDataChecker(test_template, max_workers=0)
+
     @staticmethod
-    def _make_test_bloom_filter(data: np.ndarray) -> typing.List[rbloom.Bloom]:
-        bloom_filter = rbloom.Bloom(len(data) * 2, 0.01)
+    def _make_test_bloom_filter(data: np.ndarray, hash_backend=None) -> typing.List[rbloom.Bloom]:
+        if hash_backend is None:
+            bloom_filter = rbloom.Bloom(len(data) * 2, 0.01)
+        else:
+            bloom_filter = rbloom.Bloom(len(data) * 2, 0.01, hash_backend)
 
         for element in data:
             bloom_filter.add(element)
@@ -0,0 +1,46 @@
+import unittest
+import os
+
+from eeg_bloom_template.compression import BaseFilterCodec, RawFilterCodec, SparseFilterCodec, ZlibFilterCodec
+from eeg_bloom_template.exceptions import InvalidImplementation
+
+
+class FilterCodecTestCase(unittest.TestCase):
+    def test_codecs_round_trip(self):
+        data = bytes(300) + b'\x01\x80' + bytes(200) + b'\xff'
+
+        for codec_type in (RawFilterCodec, ZlibFilterCodec, SparseFilterCodec):
+            codec = codec_type()
+            self.assertEqual(codec.decode(codec.encode(data)), data)
+
+    def test_sparse_codec_empty_data(self):
+        codec = SparseFilterCodec()
+
+        self.assertEqual(codec.decode(codec.encode(b'')), b'')
+        self.assertEqual(codec.decode(codec.encode(bytes(10))), bytes(10))
+
+    def test_sparse_codec_invalid_data(self):
+        codec = SparseFilterCodec()
+
+        self.assertRaises(ValueError, codec.decode, b'\x02\x05\x01')
+        self.assertRaises(ValueError, codec.decode, b'\x80')
+
+    def test_encode_smallest_prefers_compression(self):
+        data = bytes(1000) + b'\x01'
+
+        codec_key, encoded = BaseFilterCodec.encode_smallest(data)
+
+        self.assertNotEqual(codec_key, RawFilterCodec.codec_key)
+        self.assertLess(len(encoded), len(data))
+        self.assertEqual(BaseFilterCodec.get_implementation(codec_key)().decode(encoded), data)
+
+    def test_encode_smallest_keeps_random_data_raw(self):
+        data = os.urandom(64)
+
+        codec_key, encoded = BaseFilterCodec.encode_smallest(data)
+
+        self.assertEqual(codec_key, RawFilterCodec.codec_key)
+        self.assertEqual(encoded, data)
+
+    def test_unknown_codec(self):
+        self.assertRaises(InvalidImplementation, BaseFilterCodec.get_implementation, 'unknown')
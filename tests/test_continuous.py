@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+
+from eeg_bloom_template import backend
+from eeg_bloom_template.continuous import SlidingWindowScorer
+from eeg_bloom_template.template import EEGTemplate
+
+
+class SlidingWindowScorerTestCase(unittest.TestCase):
+    def _check_windows(self, eeg_template: EEGTemplate, feed: np.ndarray, window: int, step: int):
+        scorer = SlidingWindowScorer(eeg_template, window, step)
+        results = []
+        for chunk_start in range(0, len(feed), 3):
+            results += scorer.update(feed[chunk_start:chunk_start + 3])
+
+        expected = [
+            eeg_template.compare(list(feed[start:start + window])) for start in range(0, len(feed) - window + 1, step)
+        ]
+        self.assertEqual(results, expected)
+        self.assertEqual(scorer.rows_seen, len(feed))
+
+    def test_windows_match_comparison(self):
+        data = np.random.rand(20, 6)
+        segment_means = np.repeat(data.reshape(4, 5, 6).mean(axis=1), 5, axis=0)
+        feed = np.concatenate([segment_means, np.random.rand(10, 6), segment_means])
+        for row_wise in (True, False):
+            eeg_template = EEGTemplate.make_template(
+                list(data), backend.MMH3BloomFilterBackend(), 0.25, 0.01, row_wise=row_wise
+            )
+            for window, step in ((20, 1), (20, 4), (8, 11)):
+                self._check_windows(eeg_template, feed, window, step)
+
+    def test_update_single_rows(self):
+        data = np.random.rand(10, 4)
+        eeg_template = EEGTemplate.make_template(list(data), backend.FNVBloomFilterBackend(), 0.5, 0.01)
+        scorer = SlidingWindowScorer(eeg_template, window=4, step=2)
+
+        results = [scorer.update(row) for row in data]
+
+        self.assertEqual([len(window_results) for window_results in results], [0, 0, 0, 1, 0, 1, 0, 1, 0, 1])
+        self.assertEqual(results[-1][0], eeg_template.compare(list(data[6:])))
+        with self.assertRaises(ValueError):
+            scorer.update(np.random.rand(2, 5))
+        scorer.reset()
+        self.assertEqual(scorer.rows_seen, 0)
+        self.assertEqual(scorer.update(np.random.rand(4, 5))[0].elements_total, 20)
+
+    def test_invalid_parameters(self):
+        eeg_template = EEGTemplate.make_template(list(np.random.rand(4, 4)), backend.FNVBloomFilterBackend(), 0.5, 0.01)
+        with self.assertRaises(ValueError):
+            SlidingWindowScorer(eeg_template, window=0)
+        with self.assertRaises(ValueError):
+            SlidingWindowScorer(eeg_template, window=4, step=0)
@@ -39,3 +39,24 @@ class BloomFilterTemplateEngineTestCase(unittest.TestCase):
         self.assertEqual(len(filters), 4)
         for bloom_filter in filters:
             self.assertIsInstance(bloom_filter, rbloom.Bloom)
+
+    def test_matches_per_item_bloom_filters(self):
+        data_frames = [np.random.rand(12) for _ in range(16)]
+        backend = DummyBloomFilterHashBackend()
+        engine = EEGBloomFilterTemplateEngine(backend, 0.25, 0.1)
+
+        filters = engine.create_template_data(data_frames)
+
+        matrix = np.array(data_frames)
+        for segment_idx, bloom_filter in enumerate(filters):
+            segment_mean = matrix[segment_idx * 4:(segment_idx + 1) * 4].mean(axis=0)
+            expected = rbloom.Bloom(24, 0.1, backend)
+            expected.update(segment_mean.tolist())
+            self.assertEqual(bloom_filter.save_bytes(), expected.save_bytes())
+
+    def test_segment_means_are_single_precision(self):
+        data_frames = [np.random.rand(12) for _ in range(16)]
+        engine = EEGBloomFilterTemplateEngine(DummyBloomFilterHashBackend(), 0.25, 0.1)
+
+        for segment_mean in engine.compute_segment_means(data_frames):
+            self.assertEqual(segment_mean.dtype, np.float32)
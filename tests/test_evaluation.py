@@ -0,0 +1,101 @@
+import unittest
+import rbloom
+import numpy as np
+
+from eeg_bloom_template import evaluation
+from eeg_bloom_template.backend import FNVBloomFilterBackend, MMH3BloomFilterBackend
+from eeg_bloom_template.template import EEGTemplate
+
+
+class TemplateGalleryTestCase(unittest.TestCase):
+    def test_scores_match_template_comparison(self):
+        enrollment = [[np.random.rand(8) for _ in range(12)] for _ in range(3)]
+        templates = [
+            EEGTemplate.make_template(enrollment[0], FNVBloomFilterBackend(), 0.25, 0.1),
+            EEGTemplate.make_template(enrollment[1], MMH3BloomFilterBackend(seed=3), 0.5, 0.1, row_wise=False),
+            EEGTemplate.make_template(enrollment[2], MMH3BloomFilterBackend(), 0.5, 0.3),
+        ]
+        probes = [self._make_probe(template_data) for template_data in enrollment]
+        gallery = evaluation.TemplateGallery(templates)
+
+        scores = gallery.score_matrix(probes)
+
+        self.assertTrue(gallery.is_vectorized)
+        self.assertEqual(scores.shape, (3, 3))
+        for template_idx, template in enumerate(templates):
+            for probe_idx, probe in enumerate(probes):
+                self.assertEqual(scores[template_idx, probe_idx], template.compare(probe).hit_ratio)
+
+    def test_falls_back_for_builtin_hash(self):
+        data = np.random.rand(5)
+        bloom_filter = rbloom.Bloom(10, 0.01)
+        for element in data:
+            bloom_filter.add(element)
+        gallery = evaluation.TemplateGallery([EEGTemplate([bloom_filter], 1)])
+
+        scores = gallery.score([data])
+
+        self.assertFalse(gallery.is_vectorized)
+        self.assertEqual(scores[0], 1)
+
+    def test_invalid_probe(self):
+        template = EEGTemplate.make_template([np.random.rand(4)], FNVBloomFilterBackend(), 1, 0.1)
+        gallery = evaluation.TemplateGallery([template])
+
+        results = gallery.compare([1, 2, 3])
+
+        self.assertEqual(results[0].elements_total, 0)
+
+    def test_score_matrix_across_processes(self):
+        enrollment = [[np.random.rand(6) for _ in range(8)] for _ in range(2)]
+        templates = [EEGTemplate.make_template(data, FNVBloomFilterBackend(), 0.5, 0.1) for data in enrollment]
+        probes = [self._make_probe(data) for data in enrollment] * 2
+
+        expected = evaluation.compute_score_matrix(templates, probes)
+        actual = evaluation.compute_score_matrix(templates, probes, processes=2)
+
+        self.assertTrue(np.array_equal(expected, actual))
+
+    @staticmethod
+    def _make_probe(template_data, rows_per_segment=3):
+        # Half of the rows are the segment means used by the template, so the probe partially matches.
+        matrix = np.array(template_data)
+        means = [matrix[i:i + rows_per_segment].mean(axis=0) for i in range(0, len(matrix), rows_per_segment)]
+        return means + [np.random.rand(matrix.shape[1]) for _ in range(len(means))]
+
+
+class ErrorRateTestCase(unittest.TestCase):
+    def test_error_rates(self):
+        curve = evaluation.compute_error_rates(np.array([0.6, 0.8, 0.9]), np.array([0.1, 0.2, 0.7]))
+
+        self.assertEqual(curve.false_accept_rates[0], 1)
+        self.assertEqual(curve.false_reject_rates[0], 0)
+        self.assertEqual(curve.false_accept_rates[-1], 0)
+        self.assertEqual(curve.false_reject_rates[-1], 1)
+        self.assertAlmostEqual(curve.equal_error_rate, 1 / 3)
+
+    def test_perfect_separation(self):
+        curve = evaluation.compute_error_rates(np.array([0.8, 0.9]), np.array([0.1, 0.2]))
+
+        self.assertEqual(curve.equal_error_rate, 0)
+        far, tar = curve.roc_curve
+        far_deviates, frr_deviates = curve.det_curve
+        self.assertEqual(len(far), len(tar))
+        self.assertTrue(np.all(np.isfinite(far_deviates)))
+        self.assertTrue(np.all(np.isfinite(frr_deviates)))
+
+    def test_requires_both_score_types(self):
+        self.assertRaises(ValueError, evaluation.compute_error_rates, np.array([]), np.array([0.5]))
+
+    def test_evaluate(self):
+        enrollment = [[np.random.rand(6) for _ in range(8)] for _ in range(3)]
+        templates = [EEGTemplate.make_template(data, FNVBloomFilterBackend(), 0.5, 0.1) for data in enrollment]
+        probes = [TemplateGalleryTestCase._make_probe(data, rows_per_segment=4) for data in enrollment]
+
+        result = evaluation.evaluate(templates, ['a', 'b', 'c'], probes, ['a', 'b', 'c'])
+        genuine, impostor = evaluation.split_scores(result.score_matrix, ['a', 'b', 'c'], ['a', 'b', 'c'])
+
+        self.assertEqual(result.score_matrix.shape, (3, 3))
+        self.assertEqual(len(genuine), 3)
+        self.assertEqual(len(impostor), 6)
+        self.assertLess(result.equal_error_rate, 0.5)
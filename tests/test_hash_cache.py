@@ -0,0 +1,126 @@
+import os
+import pickle
+import tempfile
+import unittest
+import unittest.mock
+import numpy as np
+
+from eeg_bloom_template import backend, comparison, hash_cache
+from eeg_bloom_template.template import EEGTemplate
+from eeg_bloom_template.utils import bloom_bits
+
+
+class HashCodeDiskCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_get_hash_codes(self):
+        cache = hash_cache.HashCodeDiskCache(self.directory.name)
+        values = np.random.rand(6, 4)
+        hash_backend = backend.MMH3BloomFilterBackend()
+
+        first = cache.get_hash_codes(hash_backend, values)
+        second = cache.get_hash_codes(hash_backend, values)
+        # A new cache over the same directory reads the stored hash codes.
+        third = hash_cache.HashCodeDiskCache(self.directory.name).get_hash_codes(hash_backend, values)
+
+        expected = bloom_bits.hash_values(hash_backend, values)
+        for hash_codes in (first, second, third):
+            np.testing.assert_array_equal(hash_codes, expected)
+        self.assertIsInstance(second, np.memmap)
+        self.assertEqual((cache.statistics.hits, cache.statistics.misses), (1, 1))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get_hash_codes(hash_backend, np.empty((0, 4))).shape, (0, 4, 2))
+
+    def test_backend_identity(self):
+        cache = hash_cache.HashCodeDiskCache(self.directory.name)
+        values = np.random.rand(6, 4)
+
+        for seed in (0, 1):
+            hash_backend = backend.MMH3BloomFilterBackend(seed=seed)
+            np.testing.assert_array_equal(
+                cache.get_hash_codes(hash_backend, values), bloom_bits.hash_values(hash_backend, values)
+            )
+        cache.get_hash_codes(backend.MMH3BloomFilterBackend(), values.reshape(4, 6))
+
+        self.assertEqual(cache.statistics.misses, 3)
+        self.assertEqual(len(cache), 3)
+
+    def test_eviction(self):
+        values = [np.random.rand(8, 8) for _ in range(3)]
+        hash_backend = backend.SplitMixBloomFilterBackend()
+        unbounded_cache = hash_cache.HashCodeDiskCache(self.directory.name)
+        unbounded_cache.get_hash_codes(hash_backend, values[0])
+        file_size = unbounded_cache.current_bytes
+        cache = hash_cache.HashCodeDiskCache(self.directory.name, max_bytes=2 * file_size)
+        paths = [
+            os.path.join(self.directory.name, cache.get_file_name(hash_backend, np.float32(data))) for data in values
+        ]
+        os.utime(paths[0], (0, 0))
+
+        cache.get_hash_codes(hash_backend, values[1])
+        os.utime(paths[1], (1, 1))
+        cache.get_hash_codes(hash_backend, values[0])
+        cache.get_hash_codes(hash_backend, values[2])
+
+        self.assertEqual(cache.statistics.evictions, 1)
+        self.assertEqual([os.path.exists(path) for path in paths], [True, False, True])
+        self.assertLessEqual(cache.current_bytes, 2 * file_size)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        with self.assertRaises(ValueError):
+            hash_cache.HashCodeDiskCache(self.directory.name, max_bytes=0)
+
+    def test_eviction_only_scans_when_over_limit(self):
+        values = [np.random.rand(8, 8) for _ in range(4)]
+        hash_backend = backend.SplitMixBloomFilterBackend()
+        unbounded_cache = hash_cache.HashCodeDiskCache(self.directory.name)
+        unbounded_cache.get_hash_codes(hash_backend, values[0])
+        file_size = unbounded_cache.current_bytes
+        cache = hash_cache.HashCodeDiskCache(self.directory.name, max_bytes=3 * file_size)
+
+        with unittest.mock.patch.object(cache, '_list_files', wraps=cache._list_files) as list_files:
+            cache.get_hash_codes(hash_backend, values[1])
+            cache.get_hash_codes(hash_backend, values[2])
+            self.assertEqual(list_files.call_count, 0)
+            cache.get_hash_codes(hash_backend, values[3])
+            self.assertEqual(list_files.call_count, 1)
+
+        self.assertEqual(cache.statistics.evictions, 1)
+        self.assertEqual(cache.current_bytes, 3 * file_size)
+
+    def test_file_names_do_not_reveal_backend(self):
+        values = np.random.rand(6, 4)
+        hash_backend = backend.MMH3BloomFilterBackend(seed=7)
+        caches = [hash_cache.HashCodeDiskCache(self.directory.name) for _ in range(2)]
+        other_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(other_directory.cleanup)
+
+        caches[0].get_hash_codes(hash_backend, values)
+
+        file_name = caches[0].get_file_name(hash_backend, np.float32(values))
+        fingerprint = hash_backend.identity.split(':')[-1]
+        self.assertNotIn(fingerprint, file_name)
+        self.assertNotIn(fingerprint, ''.join(os.listdir(self.directory.name)))
+        # Caches over the same directory share its key, while other directories use their own.
+        self.assertEqual(caches[1].get_file_name(hash_backend, np.float32(values)), file_name)
+        self.assertNotEqual(
+            hash_cache.HashCodeDiskCache(other_directory.name).get_file_name(hash_backend, np.float32(values)),
+            file_name
+        )
+
+    def test_template_and_probe(self):
+        cache = pickle.loads(pickle.dumps(hash_cache.HashCodeDiskCache(self.directory.name)))
+        data = np.random.rand(10, 4)
+        hash_backend = backend.FNVBloomFilterBackend()
+        expected = EEGTemplate.make_template(list(data), hash_backend, 0.5, 0.01)
+        probe = list(np.repeat(data.reshape(2, 5, 4).mean(axis=1), 5, axis=0))
+
+        for _ in range(2):
+            eeg_template = EEGTemplate.make_template(list(data), hash_backend, 0.5, 0.01, hash_code_cache=cache)
+            self.assertEqual(eeg_template.serialize(), expected.serialize())
+            result = eeg_template.compare(comparison.PreparedProbe(probe, hash_code_cache=cache))
+            self.assertEqual(result.hit_ratio, 1)
+
+        self.assertEqual((cache.statistics.hits, cache.statistics.misses), (2, 2))
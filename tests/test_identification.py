@@ -0,0 +1,148 @@
+import unittest
+import numpy as np
+
+from eeg_bloom_template.backend import MMH3BloomFilterBackend, TokenBackend
+from eeg_bloom_template.identification import (
+    InProcessShardTransport, ProcessShardTransport, ShardedIdentificationService, SignatureIndex
+)
+from eeg_bloom_template.comparison import PreparedProbe
+from eeg_bloom_template.template import EEGTemplate
+
+
+class ShardedIdentificationServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        hash_backend = MMH3BloomFilterBackend()
+        self.enrollment = {f'user-{i}': np.random.rand(8, 6) for i in range(7)}
+        self.templates = {
+            template_id: EEGTemplate.make_template(list(data), hash_backend, 0.25, 0.05)
+            for template_id, data in self.enrollment.items()
+        }
+
+    def test_identify_matches_direct_comparison(self):
+        probe = list(np.concatenate([self._make_probe(self.enrollment['user-3'])[:6], np.random.rand(2, 6)]))
+        expected = sorted(
+            ((enrolled.compare(probe).hit_ratio, template_id) for template_id, enrolled in self.templates.items()),
+            reverse=True
+        )
+
+        with ShardedIdentificationService(InProcessShardTransport(3)) as service:
+            service.add_templates(self.templates)
+            matches = service.identify(probe, top_k=3)
+
+        self.assertEqual(service.shard_sizes, [3, 2, 2])
+        self.assertEqual(matches[0].template_id, 'user-3')
+        self.assertEqual([match.score for match in matches], [score for score, _ in expected[:3]])
+
+    def test_process_transport(self):
+        probe = list(self._make_probe(self.enrollment['user-5']))
+
+        with ShardedIdentificationService(ProcessShardTransport(2)) as service:
+            service.add_templates(self.templates)
+            matches = service.identify(probe, top_k=2)
+            service.remove_templates(['user-5'])
+            remaining_matches = service.identify(probe, top_k=len(self.templates))
+
+        self.assertEqual(matches[0].template_id, 'user-5')
+        self.assertEqual(matches[0].score, 1.0)
+        self.assertEqual(len(remaining_matches), len(self.templates) - 1)
+        self.assertNotIn('user-5', [match.template_id for match in remaining_matches])
+
+    def test_keyed_backends(self):
+        probe = list(self._make_probe(self.enrollment['user-2']))
+        for hash_backend in (MMH3BloomFilterBackend(seed=7), TokenBackend('secret')):
+            templates = {
+                template_id: EEGTemplate.make_template(list(data), hash_backend, 0.25, 0.05)
+                for template_id, data in self.enrollment.items()
+            }
+            expected = sorted(enrolled.compare(probe).hit_ratio for enrolled in templates.values())[::-1]
+
+            for transport in (InProcessShardTransport(3), ProcessShardTransport(2)):
+                with ShardedIdentificationService(transport) as service:
+                    service.add_templates(templates)
+                    matches = service.identify(probe, top_k=len(templates))
+
+                self.assertEqual(matches[0].template_id, 'user-2')
+                self.assertEqual(matches[0].score, 1.0)
+                self.assertEqual([match.score for match in matches], expected)
+
+    def test_rebalance_after_removal(self):
+        service = ShardedIdentificationService(InProcessShardTransport(3))
+        service.add_templates(self.templates)
+
+        service.remove_templates(['user-1', 'user-4', 'user-unknown'], rebalance=False)
+        self.assertEqual(service.shard_sizes, [3, 0, 2])
+        moved = service.rebalance()
+
+        self.assertEqual(moved, 1)
+        self.assertEqual(service.shard_sizes, [2, 1, 2])
+        matches = service.identify(list(self._make_probe(self.enrollment['user-0'])), top_k=len(self.templates))
+        self.assertEqual(len(matches), 5)
+        self.assertEqual(matches[0].template_id, 'user-0')
+
+    def test_invalid_probe(self):
+        service = ShardedIdentificationService(InProcessShardTransport(2))
+        service.add_templates(self.templates)
+
+        self.assertEqual(service.identify([1, 2, 3]), [])
+        with self.assertRaises(ValueError):
+            service.identify(list(self.enrollment['user-0']), top_k=0)
+
+    @staticmethod
+    def _make_probe(data: np.ndarray) -> np.ndarray:
+        # Templates hold the mean of each segment (of 2 rows), so a genuine probe repeats them.
+        return np.repeat(data.reshape(4, 2, -1).mean(axis=1), 2, axis=0)
+
+
+class SignatureIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        hash_backend = MMH3BloomFilterBackend()
+        self.enrollment = {f'user-{i}': np.random.rand(8, 6) for i in range(7)}
+        self.templates = {
+            template_id: EEGTemplate.make_template(list(data), hash_backend, 0.25, 0.05, signature_size=32)
+            for template_id, data in self.enrollment.items()
+        }
+
+    def test_search(self):
+        genuine_probe = ShardedIdentificationServiceTestCase._make_probe(self.enrollment['user-3'])
+        probe = list(np.concatenate([genuine_probe[:4], np.random.rand(4, 6)]))
+        index = SignatureIndex(self.templates)
+
+        scores = index.score(PreparedProbe(probe))
+        matches = index.search(probe, top_k=3)
+
+        self.assertEqual(len(index), len(self.templates))
+        self.assertGreater(scores[3], 0)
+        self.assertEqual(np.count_nonzero(scores), 1)
+        self.assertEqual(index.shortlist(PreparedProbe(probe)), ['user-3'])
+        self.assertEqual([match.template_id for match in matches], ['user-3'])
+        self.assertEqual(matches[0].result, self.templates['user-3'].compare(probe))
+        self.assertEqual(len(index.search(probe, top_k=3, min_score=-1)), 3)
+        self.assertEqual(index.search(list(np.random.rand(8, 6))), [])
+
+    def test_shortlist_limits(self):
+        probe = PreparedProbe(list(np.concatenate([
+            ShardedIdentificationServiceTestCase._make_probe(self.enrollment[template_id])[:2]
+            for template_id in ('user-1', 'user-2', 'user-5', 'user-6')
+        ])))
+        index = SignatureIndex(self.templates)
+
+        scores = index.score(probe)
+        shortlist = index.shortlist(probe, max_candidates=2)
+
+        self.assertEqual(len(shortlist), 2)
+        self.assertEqual(shortlist, [f'user-{i}' for i in np.argsort(-scores, kind='stable')[:2]])
+        self.assertEqual(index.shortlist(probe, max_candidates=0), [])
+        self.assertEqual(index.shortlist(probe, min_score=1), [])
+
+    def test_templates_without_signature(self):
+        templates = dict(self.templates)
+        templates['user-legacy'] = EEGTemplate.make_template(list(self.enrollment['user-0']), MMH3BloomFilterBackend(),
+                                                             0.25, 0.05)
+        probe = list(ShardedIdentificationServiceTestCase._make_probe(self.enrollment['user-0']))
+        index = SignatureIndex(templates)
+
+        self.assertTrue(np.isnan(index.score(PreparedProbe(probe))[-1]))
+        self.assertEqual(index.shortlist(PreparedProbe(probe), max_candidates=0), ['user-legacy'])
+        self.assertEqual(
+            [match.template_id for match in index.search(probe, top_k=2)], ['user-0', 'user-legacy']
+        )
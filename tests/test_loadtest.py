@@ -0,0 +1,57 @@
+import contextlib
+import io
+import json
+import unittest
+
+from eeg_bloom_template import loadtest
+
+
+class LoadGeneratorTestCase(unittest.TestCase):
+    def _make_configuration(self, **kwargs) -> loadtest.LoadTestConfiguration:
+        return loadtest.LoadTestConfiguration(
+            rate=40, duration=0.5, concurrency=2, number_of_subjects=3, feature_vectors=10, features=4,
+            segment_ratio=0.5, sample_interval=0.2, **kwargs
+        )
+
+    def test_run(self):
+        for subprocess in (False, True):
+            configuration = self._make_configuration(subprocess=subprocess, trace_memory=True)
+
+            report = loadtest.LoadGenerator(configuration).run()
+
+            self.assertEqual(report.completed, 20)
+            self.assertEqual(sum(statistics.count for statistics in report.operations.values()), 20)
+            self.assertEqual(set(report.operations), set(loadtest.OPERATIONS))
+            for statistics in report.operations.values():
+                self.assertEqual(statistics.errors, 0)
+                self.assertLessEqual(statistics.latency_percentiles[50], statistics.latency_percentiles[99])
+                self.assertLessEqual(statistics.latency_percentiles[99], statistics.max_latency)
+            self.assertGreaterEqual(len(report.samples), 3)
+            self.assertEqual(report.samples[-1].completed, 20)
+            self.assertTrue(report.memory_traced)
+            self.assertGreater(report.samples[-1].peak_traced_memory_bytes, 0)
+            self.assertGreater(report.samples[-1].rss_bytes, 0)
+            self.assertGreaterEqual(report.samples[-1].peak_rss_bytes, report.samples[-1].rss_bytes)
+
+    def test_mix(self):
+        configuration = self._make_configuration(mix={loadtest.VERIFY_OPERATION: 1.0})
+
+        report = loadtest.LoadGenerator(configuration).run()
+
+        self.assertEqual(list(report.operations), [loadtest.VERIFY_OPERATION])
+        self.assertEqual(report.operations[loadtest.VERIFY_OPERATION].count, 20)
+        # Memory is not traced by default, as tracing inflates latencies.
+        self.assertFalse(report.memory_traced)
+        self.assertEqual(report.samples[-1].traced_memory_bytes, 0)
+        with self.assertRaises(ValueError):
+            self._make_configuration(mix={'identify': 1.0})
+        with self.assertRaises(ValueError):
+            self._make_configuration(mix={loadtest.VERIFY_OPERATION: 0.0})
+
+    def test_main(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            loadtest.main(['--rate', '20', '--duration', '0.2', '--concurrency', '1', '--trace-memory'])
+
+        self.assertEqual(json.loads(output.getvalue())['completed'], 4)
+        self.assertTrue(json.loads(output.getvalue())['memory_traced'])
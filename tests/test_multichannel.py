@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+
+from eeg_bloom_template import backend, exceptions, multichannel
+from eeg_bloom_template.template import EEGTemplate
+from eeg_bloom_template.utils import bloom_bits
+
+
+class MultiChannelEEGTemplateTestCase(unittest.TestCase):
+    def test_make_template_matches_channel_templates(self):
+        data = np.random.rand(3, 20, 6)
+        hash_backend = backend.MMH3BloomFilterBackend()
+        for row_wise in (True, False):
+            multi_template = multichannel.MultiChannelEEGTemplate.make_template(
+                data, hash_backend, 0.25, 0.01, row_wise=row_wise, signature_size=8
+            )
+
+            self.assertEqual(len(multi_template), 3)
+            for channel_data, channel_template in zip(data, multi_template.channel_templates):
+                expected = EEGTemplate.make_template(
+                    list(channel_data), hash_backend, 0.25, 0.01, row_wise=row_wise, signature_size=8
+                )
+                self.assertEqual([bloom_filter.save_bytes() for bloom_filter in channel_template.bloom_filters],
+                                 [bloom_filter.save_bytes() for bloom_filter in expected.bloom_filters])
+                np.testing.assert_array_equal(channel_template.signature, expected.signature)
+                self.assertEqual(channel_template.serialize(), expected.serialize())
+
+        unsigned_template = multichannel.MultiChannelEEGTemplate.make_template(data, hash_backend, 0.25, 0.01)
+        self.assertEqual([channel_template.signature for channel_template in unsigned_template.channel_templates],
+                         [None] * 3)
+
+    def test_compare(self):
+        data = np.random.rand(4, 20, 6)
+        probe = np.concatenate([
+            np.repeat(data[:2].reshape(2, 4, 5, 6).mean(axis=2), 5, axis=1), np.random.rand(2, 20, 6)
+        ])
+        for filter_type in (bloom_bits.STANDARD_FILTER_TYPE, bloom_bits.BLOCKED_FILTER_TYPE):
+            multi_template = multichannel.MultiChannelEEGTemplate.make_template(
+                data, backend.SplitMixBloomFilterBackend(), 0.25, 0.01, filter_type=filter_type
+            )
+
+            result = multi_template.compare(probe)
+
+            expected = [
+                channel_template.compare(list(channel_probe))
+                for channel_template, channel_probe in zip(multi_template.channel_templates, probe)
+            ]
+            self.assertEqual(result.channel_results, expected)
+            self.assertEqual([channel_result.hit_ratio for channel_result in result.channel_results[:2]], [1, 1])
+            self.assertEqual(result.fused.elements_total, 4 * 20 * 6)
+            self.assertEqual(result.fused.hits, sum(channel_result.hits for channel_result in expected))
+        with self.assertRaises(ValueError):
+            multi_template.compare(probe[:3])
+
+    def test_compare_mixed_layouts(self):
+        data = np.random.rand(2, 10, 4)
+        channel_templates = [
+            EEGTemplate.make_template(list(data[0]), backend.MMH3BloomFilterBackend(), 0.5, 0.01),
+            EEGTemplate.make_template(list(data[1]), backend.FNVBloomFilterBackend(), 0.5, 0.1)
+        ]
+        multi_template = multichannel.MultiChannelEEGTemplate(channel_templates)
+
+        result = multi_template.compare(data)
+
+        self.assertEqual(result.channel_results, [
+            channel_template.compare(list(channel_data))
+            for channel_template, channel_data in zip(channel_templates, data)
+        ])
+        with self.assertRaises(ValueError):
+            multichannel.MultiChannelEEGTemplate([
+                channel_templates[0],
+                EEGTemplate.make_template(list(data[1]), backend.FNVBloomFilterBackend(), 0.25, 0.1)
+            ])
+
+    def test_serialization(self):
+        data = np.random.rand(3, 10, 4)
+        multi_template = multichannel.MultiChannelEEGTemplate.make_template(
+            data, backend.MMH3BloomFilterBackend(), 0.5, 0.01
+        )
+
+        restored = multichannel.MultiChannelEEGTemplate.deserialize(multi_template.serialize(compress=True))
+
+        self.assertEqual(restored.compare(data), multi_template.compare(data))
+        with self.assertRaises(exceptions.InvalidSerializationFormat):
+            multichannel.MultiChannelEEGTemplate.deserialize('{"channels": []}')
@@ -1,8 +1,12 @@
+import dataclasses
 import unittest
 import rbloom
+import json
+import numpy as np
 
-from eeg_bloom_template.backend import BaseBloomFilterHashBackend
+from eeg_bloom_template.backend import BaseBloomFilterHashBackend, MMH3BloomFilterBackend, TokenBackend
 from eeg_bloom_template.base import BaseEEGTemplateData
+from eeg_bloom_template.exceptions import InvalidSerializationFormat
 from eeg_bloom_template.serialization import EEGTemplateDataSerializer
 
 
@@ -34,3 +38,129 @@ class EEGTemplateDataSerializerTestCase(unittest.TestCase):
         b: rbloom.Bloom
         for a, b in zip(template.bloom_filters, restored.bloom_filters):
             self.assertEqual(a.hash_func, b.hash_func)
+
+    def test_serialize_compressed_data(self):
+        bloom_filter = rbloom.Bloom(1000, 0.01, DummyBloomFilterHashBackend())
+        for element in range(10):
+            bloom_filter.add(element)
+        template = DummyEEGTemplateData([bloom_filter], 0.5)
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData, compress=True)
+
+        data_string = serializer.serialize(template)
+        uncompressed_string = EEGTemplateDataSerializer(DummyEEGTemplateData).serialize(template)
+        restored = serializer.deserialize(data_string)
+
+        self.assertLess(len(data_string), len(uncompressed_string))
+        self.assertEqual(len(json.loads(data_string)['filters'][0].split(':')), 3)
+        self.assertEqual(restored.bloom_filters[0].save_bytes(), bloom_filter.save_bytes())
+
+    def test_uncompressed_format_unchanged(self):
+        template = DummyEEGTemplateData([rbloom.Bloom(10, 0.01, DummyBloomFilterHashBackend())], 0.5)
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData)
+
+        data_string = serializer.serialize(template)
+
+        self.assertEqual(len(json.loads(data_string)['filters'][0].split(':')), 2)
+
+    def test_serialize_backend_key_with_digits(self):
+        template = DummyEEGTemplateData([rbloom.Bloom(10, 0.01, MMH3BloomFilterBackend())], 0.5)
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData)
+
+        restored = serializer.deserialize(serializer.serialize(template))
+
+        self.assertIsInstance(restored.bloom_filters[0].hash_func, MMH3BloomFilterBackend)
+
+    def test_peek_metadata(self):
+        bloom_filters = [
+            rbloom.Bloom(10, 0.01, MMH3BloomFilterBackend()),
+            rbloom.Bloom(100, 0.01, MMH3BloomFilterBackend())
+        ]
+        bloom_filters[1].add(1.5)
+        template = DummyEEGTemplateData(bloom_filters, 0.5, row_wise=False)
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData)
+        data_string = serializer.serialize(template)
+
+        metadata = serializer.peek_metadata(data_string)
+
+        self.assertTrue(data_string.startswith('{"metadata": '))
+        self.assertEqual(metadata.hash_backends, ['mmh3bloomfilterbackend'] * 2)
+        self.assertEqual(metadata.segment_ratio, 0.5)
+        self.assertFalse(metadata.row_wise)
+        self.assertEqual(metadata.filter_count, 2)
+        self.assertEqual(metadata.filter_sizes, [bloom_filter.size_in_bits for bloom_filter in bloom_filters])
+        # The digest depends on the filter contents only, not on how the filters are encoded.
+        compressed_string = EEGTemplateDataSerializer(DummyEEGTemplateData, compress=True).serialize(template)
+        self.assertEqual(serializer.peek_metadata(compressed_string).content_digest, metadata.content_digest)
+        template.bloom_filters[0].add(2.5)
+        self.assertNotEqual(serializer.peek_metadata(serializer.serialize(template)).content_digest,
+                            metadata.content_digest)
+
+    def test_metadata_header_shared_values(self):
+        bloom_filters = [rbloom.Bloom(10, 0.01, MMH3BloomFilterBackend()) for _ in range(3)]
+        template = DummyEEGTemplateData(bloom_filters, 0.5)
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData)
+        data_string = serializer.serialize(template)
+        metadata = serializer.peek_metadata(data_string)
+
+        header = json.loads(data_string)['metadata']
+        self.assertEqual(header['hash_backend'], 'mmh3bloomfilterbackend')
+        self.assertEqual(header['filter_size'], bloom_filters[0].size_in_bits)
+        self.assertNotIn('filter_sizes', header)
+        self.assertEqual(metadata.hash_backends, ['mmh3bloomfilterbackend'] * 3)
+        self.assertEqual(metadata.filter_sizes, [bloom_filters[0].size_in_bits] * 3)
+        self.assertEqual(metadata.number_of_hashes, [header['filter_hashes']] * 3)
+        # Headers storing every field as is are still supported.
+        legacy_data = json.loads(data_string)
+        legacy_data['metadata'] = dataclasses.asdict(metadata)
+        self.assertEqual(serializer.peek_metadata(json.dumps(legacy_data)), metadata)
+
+    def test_peek_metadata_without_header(self):
+        template = DummyEEGTemplateData([rbloom.Bloom(10, 0.01, MMH3BloomFilterBackend())], 0.25)
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData, compress=True)
+        data_string = serializer.serialize(template)
+        legacy_data = json.loads(data_string)
+        del legacy_data['metadata']
+
+        self.assertEqual(serializer.peek_metadata(json.dumps(legacy_data)), serializer.peek_metadata(data_string))
+        self.assertEqual(len(serializer.deserialize(json.dumps(legacy_data)).bloom_filters), 1)
+
+    def test_serialize_backend_parameters(self):
+        bloom_filter = rbloom.Bloom(10, 0.01, TokenBackend('token', generator_version=2))
+        bloom_filter.add(1.5)
+        template = DummyEEGTemplateData([bloom_filter], 0.5)
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData)
+        data_string = serializer.serialize(template)
+
+        restored = serializer.deserialize(data_string, backend_kwargs={'token': 'token'})
+
+        self.assertEqual(json.loads(data_string)['backend_parameters'], {'generator_version': 2})
+        self.assertNotIn('token', json.dumps(json.loads(data_string)['backend_parameters']))
+        self.assertEqual(serializer.peek_metadata(data_string).hash_backend_parameters, {'generator_version': 2})
+        self.assertEqual(restored.bloom_filters[0].hash_func.identity, bloom_filter.hash_func.identity)
+        self.assertIn(1.5, restored.bloom_filters[0])
+        # Templates serialized before backend parameters were recorded use the legacy generator.
+        legacy_data = json.loads(data_string)
+        del legacy_data['backend_parameters']
+        legacy_backend = serializer.deserialize(json.dumps(legacy_data), {'token': 'token'}).bloom_filters[0].hash_func
+        self.assertEqual(legacy_backend.identity, TokenBackend('token').identity)
+        self.assertNotIn('backend_parameters', json.loads(serializer.serialize(
+            DummyEEGTemplateData([rbloom.Bloom(10, 0.01, MMH3BloomFilterBackend())], 0.5)
+        )))
+
+    def test_serialize_signature(self):
+        bloom_filter = rbloom.Bloom(10, 0.01, MMH3BloomFilterBackend())
+        bloom_filter.add(1.5)
+        template = DummyEEGTemplateData([bloom_filter], 0.5, signature=np.array([3, 1 << 31, 2**32 - 1], np.uint32))
+        serializer = EEGTemplateDataSerializer(DummyEEGTemplateData)
+        data_string = serializer.serialize(template)
+
+        restored = serializer.deserialize(data_string)
+
+        self.assertEqual(restored.signature.tolist(), [3, 1 << 31, 2**32 - 1])
+        unsigned_string = serializer.serialize(DummyEEGTemplateData([bloom_filter], 0.5))
+        self.assertNotIn('signature', json.loads(unsigned_string))
+        self.assertIsNone(serializer.deserialize(unsigned_string).signature)
+        invalid_data = json.loads(data_string)
+        invalid_data['signature'] = 'AAA'
+        with self.assertRaises(InvalidSerializationFormat):
+            serializer.deserialize(json.dumps(invalid_data))
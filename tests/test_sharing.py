@@ -0,0 +1,67 @@
+import concurrent.futures
+import pickle
+import unittest
+import numpy as np
+
+from eeg_bloom_template import backend, sharing
+from eeg_bloom_template.template import EEGTemplate
+
+
+def _compare_shared_templates(handle: sharing.SharedTemplateHandle, probe: np.ndarray) -> list:
+    return [eeg_template.compare(list(probe)) for eeg_template in handle.load()]
+
+
+class TemplateSharingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.probe = np.random.rand(20, 6)
+        self.templates = [
+            EEGTemplate.make_template(list(np.random.rand(20, 6)), backend.MMH3BloomFilterBackend(seed=7), 0.25, 0.01,
+                                      signature_size=8),
+            EEGTemplate.make_template(list(self.probe), backend.FNVBloomFilterBackend(), 0.5, 0.01, row_wise=False),
+            EEGTemplate.make_template(list(self.probe), backend.MMH3BloomFilterBackend(), 0.25, 0.01,
+                                      filter_type='blocked')
+        ]
+        self.expected = [eeg_template.compare(list(self.probe)) for eeg_template in self.templates]
+
+    def test_pickle_template(self):
+        for protocol in (4, 5):
+            restored = [pickle.loads(pickle.dumps(eeg_template, protocol)) for eeg_template in self.templates]
+
+            self.assertEqual([eeg_template.compare(list(self.probe)) for eeg_template in restored], self.expected)
+            self.assertEqual(restored[1].row_wise, False)
+            self.assertEqual(restored[0].signature.tolist(), self.templates[0].signature.tolist())
+            # Unlike serialization, pickling keeps the parameters of the hash backend.
+            self.assertEqual(restored[0].bloom_filters[0].hash_func.identity,
+                             self.templates[0].bloom_filters[0].hash_func.identity)
+
+    def test_pickle_out_of_band(self):
+        buffers = []
+        data = pickle.dumps(self.templates[0], protocol=5, buffer_callback=buffers.append)
+
+        restored = pickle.loads(data, buffers=buffers)
+
+        self.assertEqual(len(buffers), 1)
+        self.assertEqual(buffers[0].raw().nbytes, sum(
+            len(bloom_filter.save_bytes()) for bloom_filter in self.templates[0].bloom_filters
+        ))
+        self.assertEqual(restored.compare(list(self.probe)), self.expected[0])
+
+    def test_shared_template_set(self):
+        with sharing.SharedTemplateSet(self.templates) as shared_templates:
+            handle = pickle.loads(pickle.dumps(shared_templates.handle))
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                worker_results = executor.submit(_compare_shared_templates, handle, self.probe).result()
+            partial = handle.load([2, 0])
+
+        self.assertEqual(worker_results, self.expected)
+        self.assertEqual(len(handle), 3)
+        self.assertEqual([eeg_template.compare(list(self.probe)) for eeg_template in partial],
+                         [self.expected[2], self.expected[0]])
+        with self.assertRaises(FileNotFoundError):
+            handle.load()
+
+    def test_invalid_layout_buffer(self):
+        layout, filter_bytes = sharing.TemplateLayout.from_template(self.templates[0])
+
+        with self.assertRaises(ValueError):
+            layout.load(filter_bytes[:-1])
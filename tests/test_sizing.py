@@ -0,0 +1,93 @@
+import unittest
+import rbloom
+
+from eeg_bloom_template.backend import BaseBloomFilterHashBackend
+from eeg_bloom_template.sizing import BloomFilterSizingPolicy, FilterFootprint, TemplateFootprint
+
+
+class DummyBloomFilterHashBackend(BaseBloomFilterHashBackend):
+    def run_hash_function(self, data: bytes) -> int:
+        return hash(data)
+
+
+class BloomFilterSizingPolicyTestCase(unittest.TestCase):
+    def test_default_policy_matches_unbounded_sizing(self):
+        policy = BloomFilterSizingPolicy()
+        expected = rbloom.Bloom(20, 0.01, DummyBloomFilterHashBackend())
+
+        bloom_filter = policy.make_filter(10, 4, 0.01, DummyBloomFilterHashBackend())
+
+        self.assertEqual(bloom_filter.size_in_bits, expected.size_in_bits)
+
+    def test_capacity_multiplier(self):
+        policy = BloomFilterSizingPolicy(capacity_multiplier=4)
+
+        expected_items, false_positive_rate = policy.get_filter_parameters(10, 1, 0.01)
+
+        self.assertEqual(expected_items, 40)
+        self.assertEqual(false_positive_rate, 0.01)
+
+    def test_max_bytes_per_filter(self):
+        policy = BloomFilterSizingPolicy(max_bytes_per_filter=8)
+
+        bloom_filter = policy.make_filter(100, 1, 0.001, DummyBloomFilterHashBackend())
+
+        self.assertLessEqual(bloom_filter.size_in_bits // 8, 8)
+
+    def test_max_bytes_does_not_grow_filter(self):
+        policy = BloomFilterSizingPolicy(max_bytes_per_filter=1024)
+
+        expected_items, false_positive_rate = policy.get_filter_parameters(10, 1, 0.01)
+
+        self.assertEqual(expected_items, 20)
+        self.assertEqual(false_positive_rate, 0.01)
+
+    def test_target_bits_per_template(self):
+        policy = BloomFilterSizingPolicy(target_bits_per_template=4096)
+        filters = [policy.make_filter(10, 4, 0.01, DummyBloomFilterHashBackend()) for _ in range(4)]
+
+        total_bits = sum(bloom_filter.size_in_bits for bloom_filter in filters)
+
+        self.assertLessEqual(abs(total_bits - 4096), 4 * 8)
+
+    def test_blocked_filter_within_bounds(self):
+        for policy, expected_size in (
+                (BloomFilterSizingPolicy(max_bytes_per_filter=100), 512),
+                (BloomFilterSizingPolicy(max_bytes_per_filter=130), 1024),
+                (BloomFilterSizingPolicy(max_bytes_per_filter=8), 512),
+                (BloomFilterSizingPolicy(target_bits_per_template=1000), 512),
+                (BloomFilterSizingPolicy(target_bits_per_template=4096), 2048)):
+            bloom_filter = policy.make_filter(1000, 2, 0.01, DummyBloomFilterHashBackend(), filter_type='blocked')
+
+            # Filters are bounded to whole blocks, using at least one block.
+            self.assertEqual(bloom_filter.size_in_bits, expected_size)
+
+    def test_bounded_filter_uses_hash_functions(self):
+        policy = BloomFilterSizingPolicy(max_bytes_per_filter=1)
+        backend = DummyBloomFilterHashBackend()
+
+        bloom_filter = policy.make_filter(100, 1, 0.01, backend)
+        footprint = FilterFootprint.from_bloom_filter(bloom_filter)
+
+        self.assertGreaterEqual(footprint.number_of_hashes, 1)
+
+    def test_invalid_policy(self):
+        self.assertRaises(ValueError, BloomFilterSizingPolicy, capacity_multiplier=0)
+        self.assertRaises(ValueError, BloomFilterSizingPolicy, target_bits_per_template=0)
+        self.assertRaises(ValueError, BloomFilterSizingPolicy, max_bytes_per_filter=-1)
+
+
+class TemplateFootprintTestCase(unittest.TestCase):
+    def test_footprint(self):
+        backend = DummyBloomFilterHashBackend()
+        bloom_filter = rbloom.Bloom(10, 0.01, backend)
+        for element in range(5):
+            bloom_filter.add(element)
+
+        footprint = TemplateFootprint.from_bloom_filters([bloom_filter, bloom_filter.copy()])
+
+        self.assertEqual(footprint.bytes_per_filter, [bloom_filter.size_in_bits // 8] * 2)
+        self.assertEqual(footprint.total_bytes, 2 * bloom_filter.size_in_bits // 8)
+        self.assertGreater(footprint.fill_ratio, 0)
+        self.assertLess(footprint.fill_ratio, 1)
+        self.assertLess(footprint.filters[0].estimated_false_positive_rate, 1)
@@ -0,0 +1,82 @@
+import tempfile
+import unittest
+import numpy as np
+
+from eeg_bloom_template.backend import FNVBloomFilterBackend, MMH3BloomFilterBackend
+from eeg_bloom_template.engine import EEGBloomFilterTemplateEngine
+from eeg_bloom_template.hash_cache import HashCodeDiskCache
+from eeg_bloom_template.sweep import ParameterSweep, SweepConfiguration
+
+
+class ParameterSweepTestCase(unittest.TestCase):
+    def setUp(self):
+        self.enrollment = [[np.random.rand(6) for _ in range(8)] for _ in range(3)]
+        self.probes = [self._make_probe(data) for data in self.enrollment]
+        self.backends = {'fnv': FNVBloomFilterBackend(), 'mmh3': MMH3BloomFilterBackend(seed=5)}
+        self.sweep = ParameterSweep(self.enrollment, [0, 1, 2], self.probes, [0, 1, 2], self.backends)
+
+    def test_templates_match_direct_generation(self):
+        configuration = SweepConfiguration('mmh3', 0.25, 0.05, False)
+
+        templates = self.sweep.make_templates(configuration)
+
+        # The reference filters are made by inserting the segment means through rbloom, rather than from hash codes.
+        data_engine = EEGBloomFilterTemplateEngine(self.backends['mmh3'], 0.25, 0.05)
+        for template, data in zip(templates, self.enrollment):
+            expected_filters = data_engine.create_template_data(data, row_wise=False)
+            self.assertEqual(len(template.bloom_filters), len(expected_filters))
+            for actual_filter, expected_filter in zip(template.bloom_filters, expected_filters):
+                self.assertEqual(actual_filter.save_bytes(), expected_filter.save_bytes())
+
+    def test_run_grid(self):
+        results = self.sweep.run([0.25, 0.5], [0.01, 0.1], row_wise=(True, False))
+
+        self.assertEqual(len(results), 2 * 2 * 2 * 2)
+        rows = [result.as_dict() for result in results]
+        self.assertEqual(rows[0]['backend_name'], 'fnv')
+        self.assertIn('equal_error_rate', rows[0])
+        self.assertIn('mean_template_bytes', rows[0])
+        for row in rows:
+            self.assertGreaterEqual(row['equal_error_rate'], 0)
+            self.assertLessEqual(row['equal_error_rate'], 1)
+
+    def test_scores_match_template_comparison(self):
+        configuration = SweepConfiguration('fnv', 0.5, 0.1, True)
+        templates = self.sweep.make_templates(configuration)
+
+        score_matrix, _ = self.sweep.compute_scores([configuration], range(len(self.probes)))[configuration]
+
+        for template_idx, template in enumerate(templates):
+            for probe_idx, probe in enumerate(self.probes):
+                self.assertEqual(score_matrix[template_idx, probe_idx], template.compare(probe).hit_ratio)
+
+    def test_run_in_processes(self):
+        # Configurations are either grouped by backend and segment ratio, or scored one by one if there are fewer
+        # groups than processes.
+        for segment_ratios, backend_names in (([0.25, 0.5], None), ([0.5], ['fnv'])):
+            expected = self.sweep.run(segment_ratios, [0.01, 0.1], backend_names=backend_names)
+            actual = self.sweep.run(segment_ratios, [0.01, 0.1], backend_names=backend_names, processes=2)
+
+            self.assertEqual([result.as_dict() for result in expected], [result.as_dict() for result in actual])
+
+    def test_run_with_hash_cache(self):
+        expected = self.sweep.run([0.5], [0.1])
+        with tempfile.TemporaryDirectory() as directory:
+            cache = HashCodeDiskCache(directory)
+            for _ in range(2):
+                sweep = ParameterSweep(self.enrollment, [0, 1, 2], self.probes, [0, 1, 2], self.backends, cache)
+                actual = sweep.run([0.5], [0.1])
+                self.assertEqual([result.as_dict() for result in expected], [result.as_dict() for result in actual])
+
+            # The enrollment and probe sessions are only hashed by the first sweep, once per backend.
+            self.assertEqual(cache.statistics.misses, 2 * (len(self.enrollment) + len(self.probes)))
+            self.assertEqual(cache.statistics.hits, cache.statistics.misses)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, self.sweep.run, [0.5], [0.1], backend_names=['unknown'])
+
+    @staticmethod
+    def _make_probe(template_data):
+        matrix = np.array(template_data)
+        means = [matrix[i:i + 4].mean(axis=0) for i in range(0, len(matrix), 4)]
+        return means + [np.random.rand(matrix.shape[1]) for _ in range(len(means))]
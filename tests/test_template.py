@@ -2,7 +2,8 @@ import unittest
 import rbloom
 import numpy as np
 
-from eeg_bloom_template import template, backend, comparison
+from eeg_bloom_template import template, backend, comparison, sizing
+from eeg_bloom_template.utils import bloom_bits
 
 
 class DummyHashBackend(backend.BaseBloomFilterHashBackend):
@@ -40,6 +41,31 @@ class EEGTemplateTestCase(unittest.TestCase):
         self.assertIsInstance(eeg_template.bloom_filters, list)
         self.assertEqual(len(eeg_template.bloom_filters), 2)
 
+    def test_make_template_with_sizing_policy(self):
+        dummy_data = [np.random.rand(50) for _ in range(10)]
+        hash_backend = DummyHashBackend()
+        policy = sizing.BloomFilterSizingPolicy(max_bytes_per_filter=16)
+
+        eeg_template = template.EEGTemplate.make_template(
+            dummy_data, hash_backend, 0.5, 0.001, sizing_policy=policy
+        )
+
+        for bloom_filter in eeg_template.bloom_filters:
+            self.assertLessEqual(bloom_filter.size_in_bits // 8, 16)
+
+    def test_footprint(self):
+        dummy_data = [np.random.rand(5) for _ in range(10)]
+        hash_backend = DummyHashBackend()
+        eeg_template = template.EEGTemplate.make_template(
+            dummy_data, hash_backend, 0.5, 0.01
+        )
+
+        footprint = eeg_template.footprint()
+
+        self.assertEqual(len(footprint.bytes_per_filter), 2)
+        self.assertEqual(footprint.total_bytes, sum(footprint.bytes_per_filter))
+        self.assertGreater(footprint.fill_ratio, 0)
+
     def test_comparison(self):
         dummy_data = [np.random.rand(5)]
         bloom_filter = rbloom.Bloom(10, 0.01)
@@ -53,6 +79,93 @@ class EEGTemplateTestCase(unittest.TestCase):
         self.assertEqual(comparison_result.elements_total, 5)
         self.assertEqual(comparison_result.hit_ratio, 1)
 
+    def test_comparison_with_prepared_probe(self):
+        dummy_data = [np.random.rand(5) for _ in range(10)]
+        eeg_template = template.EEGTemplate.make_template(
+            dummy_data, backend.FNVBloomFilterBackend(), 0.5, 0.01
+        )
+        probe = comparison.PreparedProbe(dummy_data)
+
+        prepared_result = eeg_template.compare(probe)
+        raw_result = eeg_template.compare(dummy_data)
+
+        self.assertEqual(prepared_result, raw_result)
+
+    def test_merge(self):
+        hash_backend = backend.MMH3BloomFilterBackend()
+        sessions = [np.random.rand(10, 5) for _ in range(3)]
+        session_templates = [
+            template.EEGTemplate.make_template(list(data), hash_backend, 0.5, 0.01) for data in sessions
+        ]
+
+        merged = template.EEGTemplate.merge(*session_templates)
+        intersection = template.EEGTemplate.merge(*session_templates, mode='intersection')
+
+        for segment_idx, merged_filter in enumerate(merged.bloom_filters):
+            expected = rbloom.Bloom(10, 0.01, hash_backend)
+            for data in sessions:
+                expected.update(data[segment_idx * 5:(segment_idx + 1) * 5].mean(axis=0).tolist())
+            self.assertEqual(merged_filter.save_bytes(), expected.save_bytes())
+            expected_intersection = session_templates[0].bloom_filters[segment_idx].copy()
+            for session_template in session_templates[1:]:
+                expected_intersection &= session_template.bloom_filters[segment_idx]
+            self.assertEqual(intersection.bloom_filters[segment_idx].save_bytes(), expected_intersection.save_bytes())
+        for data in sessions:
+            probe = np.repeat(data.reshape(2, 5, 5).mean(axis=1), 5, axis=0)
+            self.assertEqual(merged.compare(list(probe)).hit_ratio, 1)
+
+    def test_make_template_signature(self):
+        data = np.random.rand(10, 5)
+        # Without a signature, MMH3 templates are built by inserting through rbloom, and SplitMix ones from hash codes.
+        for hash_backend in (backend.MMH3BloomFilterBackend(), backend.SplitMixBloomFilterBackend()):
+            for filter_type in (bloom_bits.STANDARD_FILTER_TYPE, bloom_bits.BLOCKED_FILTER_TYPE):
+                eeg_template = template.EEGTemplate.make_template(
+                    list(data), hash_backend, 0.5, 0.01, filter_type=filter_type, signature_size=4
+                )
+                unsigned_template = template.EEGTemplate.make_template(
+                    list(data), hash_backend, 0.5, 0.01, filter_type=filter_type
+                )
+
+                self.assertEqual(len(eeg_template.signature), 4)
+                self.assertTrue(np.all(np.diff(eeg_template.signature.astype(np.int64)) > 0))
+                self.assertIsNone(unsigned_template.signature)
+                self.assertEqual([bloom_filter.save_bytes() for bloom_filter in eeg_template.bloom_filters],
+                                 [bloom_filter.save_bytes() for bloom_filter in unsigned_template.bloom_filters])
+
+    def test_merge_signatures(self):
+        hash_backend = backend.MMH3BloomFilterBackend()
+        sessions = [np.random.rand(10, 5) for _ in range(3)]
+        session_templates = [
+            template.EEGTemplate.make_template(list(data), hash_backend, 0.5, 0.01, signature_size=8)
+            for data in sessions
+        ]
+        combined_template = template.EEGTemplate.make_template(
+            list(np.concatenate(sessions)), hash_backend, 1 / 6, 0.01, signature_size=8
+        )
+
+        merged = template.EEGTemplate.merge(*session_templates)
+        intersection = template.EEGTemplate.merge(*session_templates, mode='intersection')
+
+        self.assertEqual(len(merged.signature), 8)
+        self.assertIsNone(intersection.signature)
+        # The merged signature matches the signature of a template holding the values of every session.
+        self.assertEqual(merged.signature.tolist(), combined_template.signature.tolist())
+
+    def test_merge_incompatible_templates(self):
+        data = [np.random.rand(5) for _ in range(10)]
+        hash_backend = backend.MMH3BloomFilterBackend()
+        eeg_template = template.EEGTemplate.make_template(data, hash_backend, 0.5, 0.01)
+
+        with self.assertRaises(ValueError):
+            template.EEGTemplate.merge(eeg_template, template.EEGTemplate.make_template(data, hash_backend, 0.25, 0.01))
+        with self.assertRaises(ValueError):
+            template.EEGTemplate.merge(eeg_template, template.EEGTemplate.make_template(data, hash_backend, 0.5, 0.1))
+        seeded_template = template.EEGTemplate.make_template(data, backend.MMH3BloomFilterBackend(seed=1), 0.5, 0.01)
+        with self.assertRaises(ValueError):
+            template.EEGTemplate.merge(eeg_template, seeded_template)
+        with self.assertRaises(ValueError):
+            template.EEGTemplate.merge(eeg_template, eeg_template, mode='xor')
+
     def test_serialization(self):
         dummy_data = [np.random.rand(5) for _ in range(10)]
         hash_backend = DummyHashBackend()
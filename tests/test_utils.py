@@ -1,8 +1,11 @@
 import unittest
 import string
 import random
+import rbloom
 import numpy as np
 
+from eeg_bloom_template.backend import FNVBloomFilterBackend, MMH3BloomFilterBackend
+from eeg_bloom_template.utils import bloom_bits
 from eeg_bloom_template.utils.iteration import iter_ratio_slices
 from eeg_bloom_template.utils.number_values import convert_unsigned_128_to_signed
 from eeg_bloom_template.utils.orthonormalization import TokenDataGenerator, TokenMatrixNormalization, normalize_cached
@@ -72,6 +75,21 @@ class UtilsTestCase(unittest.TestCase):
 
         self.assertEqual(matrix.shape, (4, 4))
 
+    def test_versioned_matrix_generation(self):
+        token = ''.join(random.choice(string.ascii_lowercase) for _ in range(32))
+        legacy_matrix = TokenDataGenerator(token).generate_matrix(8)
+        matrix = TokenDataGenerator(token, version=2).generate_matrix(8)
+
+        self.assertTrue(np.array_equal(legacy_matrix, TokenDataGenerator(token, version=1).generate_matrix(8)))
+        self.assertTrue(np.array_equal(matrix, TokenDataGenerator(token, version=2).generate_matrix(8)))
+        self.assertFalse(np.allclose(matrix, legacy_matrix))
+        self.assertFalse(np.allclose(matrix, TokenDataGenerator(token + 'a', version=2).generate_matrix(8)))
+        self.assertTrue(np.allclose(matrix @ matrix.T, np.eye(8)))
+        expected_vector = TokenMatrixNormalization.mix_token_matrix(np.ones(8), matrix)
+        self.assertTrue(np.array_equal(normalize_cached(token, np.ones(8), version=2), expected_vector))
+        with self.assertRaises(ValueError):
+            TokenDataGenerator(token, version=3)
+
     def test_cached_result_same(self):
         token = ''.join(random.choice(string.ascii_lowercase) for _ in range(32))
         generator = TokenDataGenerator(token)
@@ -83,3 +101,44 @@ class UtilsTestCase(unittest.TestCase):
 
         for actual, expected in zip(result_a, result_b):
             self.assertEqual(actual, expected)
+
+    def test_bloom_bits_split_and_join(self):
+        bloom_filter = rbloom.Bloom(10, 0.01, FNVBloomFilterBackend())
+        bloom_filter.add(1.5)
+        filter_bytes = bloom_filter.save_bytes()
+
+        number_of_hashes, bits = bloom_bits.split_filter_bytes(filter_bytes)
+
+        self.assertGreater(number_of_hashes, 0)
+        self.assertEqual(len(bits) * 8, bloom_filter.size_in_bits)
+        self.assertEqual(bloom_bits.join_filter_bytes(number_of_hashes, bits), filter_bytes)
+
+    def test_bloom_bits_match_filter_implementation(self):
+        for hash_backend in (FNVBloomFilterBackend(), MMH3BloomFilterBackend(seed=7)):
+            values = np.random.rand(20)
+            probe_values = np.concatenate((values, np.random.rand(200)))
+            bloom_filter = rbloom.Bloom(40, 0.01, hash_backend)
+            for value in values:
+                bloom_filter.add(value)
+            number_of_hashes, expected_bits = bloom_bits.split_filter_bytes(bloom_filter.save_bytes())
+
+            bits = np.zeros_like(expected_bits)
+            indexes = bloom_bits.generate_indexes(
+                bloom_bits.hash_values(hash_backend, values), number_of_hashes, bloom_filter.size_in_bits
+            )
+            bloom_bits.set_indexes(bits, indexes)
+            probe_indexes = bloom_bits.generate_indexes(
+                bloom_bits.hash_values(hash_backend, probe_values), number_of_hashes, bloom_filter.size_in_bits
+            )
+            contained = bloom_bits.contains_indexes(expected_bits, probe_indexes)
+
+            self.assertTrue(np.array_equal(bits, expected_bits))
+            self.assertListEqual(contained.tolist(), [value in bloom_filter for value in probe_values])
+
+    def test_bloom_bits_negative_hash_codes(self):
+        hash_codes = bloom_bits.hash_codes_to_array([-1, 2**127 - 1, -(2**127)])
+
+        self.assertEqual(hash_codes.dtype, np.uint64)
+        self.assertListEqual(hash_codes[0].tolist(), [2**64 - 1, 2**64 - 1])
+        self.assertListEqual(hash_codes[1].tolist(), [2**64 - 1, 2**63 - 1])
+        self.assertListEqual(hash_codes[2].tolist(), [0, 2**63])